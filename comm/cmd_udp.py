@@ -1,14 +1,42 @@
 # comm/cmd_udp.py
+import asyncio
 import socket
 import json
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
+
+
+def _parse(data: bytes) -> Optional[Dict[str, Any]]:
+    if not data:
+        return None
+    try:
+        obj = json.loads(data.decode("utf-8", errors="ignore"))
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
+
+
+class _CmdProtocol(asyncio.DatagramProtocol):
+    def __init__(self, rx: "CmdUdpRx", on_msg: Optional[Callable[[Dict[str, Any]], None]]):
+        self.rx = rx
+        self.on_msg = on_msg
+
+    def datagram_received(self, data, addr):
+        obj = _parse(data)
+        if obj is None:
+            return
+        self.rx._store(obj)
+        if self.on_msg is not None:
+            self.on_msg(obj)
 
 
 class CmdUdpRx:
     """
     UDP receiver for dashboard->controller bridge commands.
     Non-blocking poll via poll_latest().
+    run_asyncio(on_msg): asyncio datagram endpoint on the same socket instead;
+    every message is stored as it arrives (+ on_msg(obj) on the loop) and
+    poll_latest() then only returns the newest one.
     """
 
     def __init__(self, host: str, port: int):
@@ -20,6 +48,7 @@ class CmdUdpRx:
 
         self._latest: Optional[Dict[str, Any]] = None
         self._last_ts: float = 0.0
+        self._transport = None
 
         print(f"[CmdUdpRx] binding to {self.addr}")
 
@@ -27,6 +56,9 @@ class CmdUdpRx:
         """
         Drain socket; return newest message (dict) if any.
         """
+        if self._transport is not None:
+            return self._latest  # datagram endpoint owns the socket
+
         latest = None
         while True:
             try:
@@ -36,23 +68,30 @@ class CmdUdpRx:
             except Exception:
                 break
 
-            if not data:
-                continue
-
-            try:
-                obj = json.loads(data.decode("utf-8", errors="ignore"))
-            except Exception:
-                continue
-
-            if isinstance(obj, dict):
+            obj = _parse(data)
+            if obj is not None:
                 latest = obj
 
         if latest is not None:
-            self._latest = latest
-            self._last_ts = time.time()
+            self._store(latest)
 
         return self._latest
-    
+
+    def _store(self, obj: Dict[str, Any]):
+        self._latest = obj
+        self._last_ts = time.time()
+
+    async def run_asyncio(self, on_msg: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Serve the socket from the running loop until cancelled."""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _CmdProtocol(self, on_msg), sock=self.sock)
+        self._transport = transport
+        try:
+            await loop.create_future()
+        finally:
+            self._transport = None
+            transport.close()
+
     def close(self):
         try:
             self.sock.close()
@@ -0,0 +1,124 @@
+# comm/rx_buffer.py
+import threading
+from typing import Any, List, Optional, Tuple
+
+
+class FrameReader:
+    """
+    Delimiter-based frame splitter on a preallocated bytearray.
+    - feed(): copies raw bytes in (compacts the partial tail when full)
+    - next_frame(): returns one complete frame (without delimiter) or None
+    Bytes are scanned once with bytearray.find; only complete frames are copied out.
+    """
+
+    def __init__(self, delim: bytes = b"\n", capacity: int = 4096):
+        self.delim = delim
+        self._buf = bytearray(capacity)
+        self._mv = memoryview(self._buf)
+        self._head = 0   # start of unconsumed data
+        self._tail = 0   # end of data
+        self._scan = 0   # next position to search for delim
+        self.overflows = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    @property
+    def free(self) -> int:
+        return len(self._buf) - (self._tail - self._head)
+
+    def reset(self):
+        self._head = self._tail = self._scan = 0
+
+    def feed(self, data) -> None:
+        n = len(data)
+        if n == 0:
+            return
+        cap = len(self._buf)
+        if self._tail + n > cap:
+            used = self._tail - self._head
+            if used + n > cap:
+                # frame longer than buffer: drop partial data, keep the newest bytes
+                self.overflows += 1
+                self.reset()
+                if n > cap:
+                    data = data[n - cap:]
+                    n = cap
+            else:
+                # move the partial frame to the front
+                self._mv[0:used] = self._mv[self._head:self._tail]
+                self._scan -= self._head
+                self._head = 0
+                self._tail = used
+        self._mv[self._tail:self._tail + n] = data
+        self._tail += n
+
+    def next_frame(self) -> Optional[bytes]:
+        idx = self._buf.find(self.delim, self._scan, self._tail)
+        if idx < 0:
+            self._scan = self._tail
+            return None
+        out = bytes(self._mv[self._head:idx])
+        self._head = self._scan = idx + len(self.delim)
+        if self._head == self._tail:
+            self._head = self._tail = self._scan = 0
+        return out
+
+
+class LatestSlot:
+    """
+    Single-slot latest-wins mailbox + bounded history.
+    - put(): store newest record, assign sequence number
+    - take_latest(): newest record if not taken yet, else None
+    - read_all_since(seq): every record with seq > `seq` still in history
+    Records overwritten before anyone took them are counted in `dropped`.
+    """
+
+    def __init__(self, history: int = 256):
+        self._lock = threading.Lock()
+        self._latest: Any = None
+        self._latest_seq = 0
+        self._taken_seq = 0
+
+        self._hist: List[Optional[Tuple[int, Any]]] = [None] * max(1, history)
+
+        self.seq = 0
+        self.dropped = 0
+        self.history_overruns = 0
+
+    def put(self, obj: Any) -> int:
+        with self._lock:
+            if self._latest_seq > self._taken_seq:
+                self.dropped += 1
+            self.seq += 1
+            self._latest = obj
+            self._latest_seq = self.seq
+            self._hist[self.seq % len(self._hist)] = (self.seq, obj)
+            return self.seq
+
+    def take_latest(self) -> Optional[Any]:
+        with self._lock:
+            if self._latest_seq <= self._taken_seq:
+                return None
+            self._taken_seq = self._latest_seq
+            return self._latest
+
+    def peek(self) -> Tuple[int, Any]:
+        with self._lock:
+            return self._latest_seq, self._latest
+
+    def read_all_since(self, seq: int) -> List[Tuple[int, Any]]:
+        """Return [(seq, obj), ...] newer than `seq`, oldest first."""
+        with self._lock:
+            newest = self.seq
+            n = len(self._hist)
+            oldest = max(seq + 1, newest - n + 1, 1)
+            if seq + 1 < oldest:
+                self.history_overruns += 1
+            out = []
+            for s in range(oldest, newest + 1):
+                rec = self._hist[s % n]
+                if rec is not None and rec[0] == s:
+                    out.append(rec)
+            return out
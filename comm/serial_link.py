@@ -1,61 +1,330 @@
 # comm/serial_link.py
+import json
 import threading
 import time
-from queue import Queue, Empty
-from typing import Optional, Dict, Any
+from collections import deque
+from typing import Optional, Dict, Any, Callable, List, Tuple
 
 import serial
 
+from comm.rx_buffer import FrameReader, LatestSlot
+from core.histogram import Histogram
+from messages import frame
+from messages.delta import DeltaEncoder
 from messages.pack import loads_line
 
+# written on close() so the robot never keeps the last drive command
+SAFE_STOP_CMD: Dict[str, Any] = {
+    "cmd": "set",
+    "mode": "safe",
+    "estop": True,
+    "drive": {"th": 0.0, "st": 0.0},
+    "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
+}
+
 
 class SerialLink:
     """
-    Serial USB link to Arduino using line-delimited JSON.
-    - send(): writes one JSON per line
+    Serial USB link to Arduino.
+    - send(): writes one command (JSON line or binary frame)
     - recv_latest(): returns newest telemetry (drops older)
+    - read_all_since(seq): every telemetry record after `seq` (bounded history)
+    - close(): flushes a final safe-stop command, then closes the port
+    - on_rx: optional callback after every telemetry record, on the rx
+      thread (keep it short, e.g. loop.call_soon_threadsafe)
+
+    Protocols:
+      "json" : line-delimited JSON (original firmware)
+      "bin"  : COBS/CRC16 binary frames (messages/frame.py); the hello
+               handshake is still sent (firmware switches on it) and open()
+               raises if it is not answered, unless the board already sends frames
+      "auto" : handshake on open(); falls back to JSON if firmware doesn't answer
+
+    async_write=True:
+      send() never touches the port. Commands go into a latest-wins slot and a
+      writer thread flushes them. A newer command replaces the unsent one;
+      an unsent estop is only ever replaced by a newer estop, so the queue
+      holds at most [estop, normal]. close() drops what is queued and hands
+      the safe-stop command to the writer as its last frame.
+
+    delta=True (JSON protocol only):
+      "set" commands go out as periodic keyframes + changed-fields deltas
+      (messages/delta.py). Firmware answers {"type":"resync"} on a sequence
+      gap and the next command is sent as a keyframe.
+
+    Latency:
+      every "set" carries a u16 sequence ("s" in JSON, frame header in binary).
+      Firmware echoes the last applied one as "ack" in telemetry; the match
+      gives the round trip from send() to the Arduino acting on it.
+      stats() reports RTT, RTT jitter and one-way (RX transit) jitter.
+
+    Startup / re-plug:
+      open() keeps DTR low (no_reset=True) so boards that auto-reset on DTR
+      stay up, then returns as soon as a boot banner or the first valid
+      telemetry arrives (ready_timeout_s caps the wait). If the port goes away
+      the rx thread keeps reopening it, renegotiates the protocol and forces a
+      delta keyframe; send() drops commands while the link is down.
+      Nothing is printed once open() returns (curses TUI): disconnects,
+      reconnects and time to first command show up in stats() ("last_event").
     """
 
-    def __init__(self, port: str, baudrate: int):
+    def __init__(
+        self,
+        port: str,
+        baudrate: int,
+        protocol: str = "auto",
+        handshake_timeout_s: float = 0.5,
+        rx_history: int = 256,
+        async_write: bool = False,
+        delta: bool = False,
+        keyframe_s: float = 1.0,
+        tx_log: Optional[str] = None,
+        no_reset: bool = True,
+        ready_timeout_s: float = 2.0,
+        reconnect: bool = True,
+    ):
+        if protocol not in ("json", "bin", "auto"):
+            raise ValueError("protocol must be json|bin|auto")
         self.port = port
         self.baudrate = baudrate
+        self.protocol = protocol
+        self.handshake_timeout_s = handshake_timeout_s
+        self.no_reset = no_reset
+        self.ready_timeout_s = ready_timeout_s
+        self.reconnect = reconnect
+
+        # negotiated protocol ("json" | "bin"), valid after open()
+        self.proto = "json"
 
         self._ser: Optional[serial.Serial] = None
         self._rx_thread: Optional[threading.Thread] = None
         self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._down_lock = threading.Lock()
+
+        # startup / re-plug metrics
+        self._t_open = 0.0
+        self.ready_s: Optional[float] = None
+        self.ready_by = "-"
+        self.first_cmd_s: Optional[float] = None
+        self.disconnects = 0
+        self.reconnects = 0
+        self.tx_dropped = 0
+        self.last_event: Optional[str] = None
+        self._last_event_t = 0.0
 
-        self.rx_queue: "Queue[Dict[str, Any]]" = Queue()
+        # latest-wins telemetry mailbox (+ history for read_all_since)
+        self.rx_slot = LatestSlot(history=rx_history)
+        self._reader = FrameReader(b"\n")
         self._last_rx_ts = 0.0
 
+        # binary framing counters
+        self._tx_seq = 0  # shared by all "set" encodings
+        self._rx_seq: Optional[int] = None
+        self.rx_frames = 0
+        self.rx_bad_frames = 0
+        self.rx_lost_frames = 0
+
+        # TX (sync or async writer thread)
+        self.async_write = async_write
+        self._tx_thread: Optional[threading.Thread] = None
+        self._tx_cv = threading.Condition()
+        self._tx_pending: "deque[Tuple[Dict[str, Any], float, bool]]" = deque(maxlen=2)
+        self._tx_stop = False
+        self.tx_sent = 0
+        self.tx_coalesced = 0
+        self.tx_errors = 0
+        self.tx_bytes = 0
+        self.tx_write_hist = Histogram()
+        self.tx_queue_age_hist = Histogram()
+
+        # RTT: send time per seq (ring), matched against telemetry "ack"
+        self._sent_seq = [-1] * 1024
+        self._sent_t = [0.0] * 1024
+        self._last_ack: Optional[int] = None
+        self._last_rtt: Optional[float] = None
+        self._last_transit: Optional[float] = None
+        self.rtt_s: Optional[float] = None
+        self.rtt_hist = Histogram()
+        self.rtt_jitter_hist = Histogram()
+        self.rx_jitter_hist = Histogram()
+
+        # delta/keyframe encoding (JSON only)
+        self._delta: Optional[DeltaEncoder] = DeltaEncoder(keyframe_s=keyframe_s) if delta else None
+
+        # optional recording of every command handed to the port (JSONL)
+        self.tx_log_path = tx_log
+        self._tx_log = None
+
+        self.on_rx: Optional[Callable[[], None]] = None
+
     def open(self):
-        self._ser = serial.Serial(self.port, self.baudrate, timeout=0.1)
-        time.sleep(1.5)  # Arduino often resets on serial open
+        self._t_open = time.monotonic()
+        self.first_cmd_s = None
         self._stop.clear()
+        self._connect()
+        print(
+            f"[SerialLink] {self.port} @ {self.baudrate} proto={self.proto} delta={self.delta_active} "
+            f"ready in {self.ready_s:.2f}s ({self.ready_by})"
+        )
+
+        if self.tx_log_path and self._tx_log is None:
+            self._tx_log = open(self.tx_log_path, "a", encoding="utf-8")
+
         self._rx_thread = threading.Thread(target=self._rx_loop, daemon=True)
         self._rx_thread.start()
 
-    def close(self):
+        if self.async_write:
+            self._tx_stop = False
+            self._tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+            self._tx_thread.start()
+
+    def close(self, safe_stop: bool = True):
+        tx = self._tx_thread
+        if tx:
+            # queued commands are stale now; the safe stop is the writer's last frame
+            with self._tx_cv:
+                self.tx_coalesced += len(self._tx_pending)
+                self._tx_pending.clear()
+                if safe_stop:
+                    self._tx_pending.append((SAFE_STOP_CMD, time.perf_counter(), True))
+                self._tx_stop = True
+                self._tx_cv.notify()
+            tx.join(timeout=1.0)
+            self._tx_thread = None
+        elif safe_stop and self.connected:
+            try:
+                self._write(SAFE_STOP_CMD, time.perf_counter())
+            except Exception:
+                pass
+
+        # never touch the port while a stuck writer may still be inside _write()
+        if self.connected and not (tx and tx.is_alive()):
+            try:
+                self._ser.flush()
+            except Exception:
+                pass
+
         self._stop.set()
         if self._rx_thread:
             self._rx_thread.join(timeout=1.0)
-        if self._ser and self._ser.is_open:
-            self._ser.close()
+        self._connected.clear()
+        # a reconnect still in _connect() sees _stop under the same lock
+        with self._down_lock:
+            if self._ser and self._ser.is_open:
+                try:
+                    self._ser.close()
+                except Exception:
+                    pass
+        if self._tx_log is not None:
+            try:
+                self._tx_log.close()
+            except Exception:
+                pass
+            self._tx_log = None
 
     def send(self, msg: Dict[str, Any]):
-        import json
-        if not self._ser or not self._ser.is_open:
+        if not self._connected.is_set():
+            self.tx_dropped += 1
             return
-        line = json.dumps(msg, separators=(",", ":"), ensure_ascii=False)
-        self._ser.write((line + "\n").encode("utf-8"))
+        if not self._tx_thread:
+            try:
+                self._write(msg, time.perf_counter())
+            except (serial.SerialException, OSError):
+                self.tx_errors += 1
+                self._mark_down()
+            return
+
+        urgent = bool(msg.get("estop"))
+        with self._tx_cv:
+            q = self._tx_pending
+            if urgent:
+                # estop supersedes an unsent normal command and replaces an unsent estop
+                while q and not q[-1][2]:
+                    q.pop()
+                    self.tx_coalesced += 1
+                if q:
+                    q.pop()
+                    self.tx_coalesced += 1
+            elif q and not q[-1][2]:
+                # newer normal command replaces the unsent one
+                q.pop()
+                self.tx_coalesced += 1
+            q.append((msg, time.perf_counter(), urgent))
+            self._tx_cv.notify()
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    @property
+    def delta_active(self) -> bool:
+        return self._delta is not None and self.proto == "json"
+
+    def request_keyframe(self):
+        """Send the next "set" command as a full keyframe (delta mode)."""
+        if self._delta is not None:
+            self._delta.request_keyframe()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._tx_cv:
+            pending = len(self._tx_pending)
+        return {
+            "proto": self.proto,
+            "async_write": bool(self._tx_thread),
+            "tx_sent": self.tx_sent,
+            "tx_coalesced": self.tx_coalesced,
+            "tx_errors": self.tx_errors,
+            "tx_pending": pending,
+            "tx_bytes": self.tx_bytes,
+            "tx_dropped": self.tx_dropped,
+            "connected": self.connected,
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "ready_s": self.ready_s,
+            "ready_by": self.ready_by,
+            "first_cmd_s": self.first_cmd_s,
+            "last_event": self.last_event,
+            "last_event_age_s": None if self.last_event is None else round(time.monotonic() - self._last_event_t, 1),
+            "delta": None if not self.delta_active else {
+                "keyframes": self._delta.keyframes,
+                "deltas": self._delta.deltas,
+                "resyncs": self._delta.resyncs,
+            },
+            "tx_write_ms": self.tx_write_hist.summary(1e3),
+            "tx_queue_age_ms": self.tx_queue_age_hist.summary(1e3),
+            "rx_seq": self.rx_slot.seq,
+            "rx_dropped": self.rx_slot.dropped,
+            "rx_bad_frames": self.rx_bad_frames,
+            "rx_lost_frames": self.rx_lost_frames,
+            "rtt_ms": self.rtt_hist.summary(1e3),
+            "rtt_jitter_ms": self.rtt_jitter_hist.summary(1e3),
+            "rx_jitter_ms": self.rx_jitter_hist.summary(1e3),
+        }
+
+    def reset_stats(self):
+        for h in (self.tx_write_hist, self.tx_queue_age_hist, self.rtt_hist, self.rtt_jitter_hist, self.rx_jitter_hist):
+            h.reset()
 
     def recv_latest(self) -> Optional[Dict[str, Any]]:
-        latest = None
-        while True:
-            try:
-                latest = self.rx_queue.get_nowait()
-            except Empty:
-                break
-        return latest
+        """Newest telemetry since the previous call, or None."""
+        return self.rx_slot.take_latest()
+
+    def read_all_since(self, seq: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Every telemetry record received after `seq` (oldest first), for consumers
+        that must not miss records. Use the last returned seq for the next call.
+        """
+        return self.rx_slot.read_all_since(seq)
+
+    @property
+    def rx_seq(self) -> int:
+        return self.rx_slot.seq
+
+    @property
+    def rx_dropped(self) -> int:
+        """Telemetry records overwritten before recv_latest() picked them up."""
+        return self.rx_slot.dropped
 
     @property
     def last_rx_age_s(self) -> float:
@@ -63,27 +332,306 @@ class SerialLink:
             return 999.0
         return time.time() - self._last_rx_ts
 
-    def _rx_loop(self):
+    # ---------- TX ----------
+    def _write(self, msg: Dict[str, Any], t_enq: float):
+        t0 = time.perf_counter()
+        data, seq = self._encode(msg)
+        if seq is not None:
+            # RTT is measured from send(), so async queueing is included
+            i = seq & 1023
+            self._sent_seq[i] = seq
+            self._sent_t[i] = t_enq
+        self._ser.write(data)
+        t1 = time.perf_counter()
+        self.tx_sent += 1
+        self.tx_bytes += len(data)
+        if self.first_cmd_s is None and seq is not None:
+            self.first_cmd_s = time.monotonic() - self._t_open
+            self._event(f"first command after {self.first_cmd_s:.2f}s")
+        if self._tx_log is not None:
+            try:
+                self._tx_log.write(json.dumps({"ts": time.time(), "cmd": msg}, separators=(",", ":")) + "\n")
+            except Exception:
+                pass
+        self.tx_queue_age_hist.record(t0 - t_enq)
+        self.tx_write_hist.record(t1 - t0)
+
+    def _tx_loop(self):
+        while True:
+            with self._tx_cv:
+                while not self._tx_pending and not self._tx_stop:
+                    self._tx_cv.wait()
+                if not self._tx_pending:
+                    return  # stopping and drained
+                msg, t_enq, _urgent = self._tx_pending.popleft()
+            if not self._connected.is_set():
+                self.tx_dropped += 1
+                continue
+            try:
+                self._write(msg, t_enq)
+            except (serial.SerialException, OSError):
+                self.tx_errors += 1
+                self._mark_down()
+            except Exception:
+                self.tx_errors += 1
+                time.sleep(0.05)
+
+    # ---------- Connection ----------
+    def _open_port(self) -> serial.Serial:
+        ser = serial.Serial()
+        ser.port = self.port
+        ser.baudrate = self.baudrate
+        ser.timeout = 0.1
+        # async writer gets a write timeout so a stuck port can't hang close()
+        ser.write_timeout = 0.5 if self.async_write else None
+        if self.no_reset:
+            # DTR low before open: boards with DTR auto-reset don't reboot
+            ser.dsrdtr = False
+            ser.dtr = False
+        ser.open()
+        return ser
+
+    def _connect(self):
+        """Open the port, wait until the board talks, negotiate the protocol."""
+        t0 = time.monotonic()
+        ser = self._open_port()
+        with self._down_lock:
+            if self._stop.is_set():
+                # close() ran while we were opening: don't leave the port open behind it
+                ser.close()
+                raise serial.SerialException("link closed")
+            self._ser = ser
+        self.ready_by = self._wait_ready()
+
+        if self.ready_by == "binary":
+            self.proto = "bin"  # board kept its binary session (no reset on open)
+        elif self.protocol in ("bin", "auto"):
+            ok = self._handshake()
+            if not ok and self.protocol == "bin":
+                ser.close()
+                raise serial.SerialException(f"{self.port}: firmware did not acknowledge the binary protocol")
+            self.proto = "bin" if ok else "json"
+        else:
+            self.proto = "json"
+        self.ready_s = time.monotonic() - t0
+
+        # fresh stream state
+        self._reader.delim = b"\x00" if self.proto == "bin" else b"\n"
+        self._reader.reset()
+        self._rx_seq = None
+        self._last_ack = None
+        self._last_transit = None
+        if self._delta is not None:
+            self._delta.request_keyframe()
+        self._connected.set()
+
+    def _wait_ready(self) -> str:
+        """
+        Wait for a boot banner ({"type":"boot"}) or any valid telemetry record.
+        Returns "banner" | "telemetry" | "binary" | "timeout".
+        """
         assert self._ser is not None
-        buf = ""
-        while not self._stop.is_set():
+        buf = b""
+        t_end = time.monotonic() + self.ready_timeout_s
+        while time.monotonic() < t_end:
+            try:
+                raw = self._ser.read(max(1, self._ser.in_waiting))
+            except Exception:
+                break
+            if not raw:
+                continue
+            buf = (buf + raw)[-1024:]
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                try:
+                    obj = loads_line(line.decode("utf-8", errors="ignore").strip())
+                except Exception:
+                    continue
+                if isinstance(obj, dict):
+                    return "banner" if obj.get("type") == "boot" else "telemetry"
+            if self.protocol != "json" and b"\x00" in buf:
+                # board kept running in binary mode (no reset on open)
+                for chunk in buf.split(b"\x00")[:-1]:
+                    try:
+                        if chunk and frame.parse_frame(chunk) is not None:
+                            return "binary"
+                    except ValueError:
+                        pass
+        return "timeout"
+
+    def _mark_down(self):
+        with self._down_lock:
+            if not self._connected.is_set():
+                return
+            self._connected.clear()
+            self.disconnects += 1
+            try:
+                if self._ser is not None:
+                    self._ser.close()
+            except Exception:
+                pass
+        self._event("disconnected")
+
+    def _reconnect_loop(self):
+        backoff = 0.2
+        while not self._stop.is_set() and not self._connected.is_set():
+            try:
+                self._connect()
+            except Exception:
+                time.sleep(backoff)
+                backoff = min(2.0, backoff * 1.5)
+                continue
+            self.reconnects += 1
+            self._event(f"reconnected proto={self.proto} ready in {self.ready_s:.2f}s ({self.ready_by})")
+
+    def _event(self, msg: str):
+        self.last_event = msg
+        self._last_event_t = time.monotonic()
+
+    # ---------- Encoding ----------
+    def _encode(self, msg: Dict[str, Any]) -> Tuple[bytes, Optional[int]]:
+        """Returns (wire bytes, seq) - seq is None for non-"set" commands."""
+        seq = None
+        if msg.get("cmd") == "set":
+            self._tx_seq = seq = (self._tx_seq + 1) & 0xFFFF
+            if self.proto == "bin":
+                return frame.pack_set(msg, seq), seq
+            if self._delta is not None:
+                msg = self._delta.encode(msg, seq=seq)
+            else:
+                msg = {**msg, "s": seq}
+        # JSON line (also used in bin mode for non-"set" commands)
+        line = json.dumps(msg, separators=(",", ":"), ensure_ascii=False)
+        return (line + "\n").encode("utf-8"), seq
+
+    def _handshake(self) -> bool:
+        """
+        Ask firmware for the binary protocol:
+          Pi      -> {"cmd":"hello","proto":["bin1"]}
+          Arduino -> {"type":"hello","proto":"bin1"}   (new firmware only)
+        Old firmware ignores the unknown cmd and keeps sending JSON telemetry.
+        """
+        assert self._ser is not None
+        try:
+            self._ser.reset_input_buffer()
+            hello = {"cmd": "hello", "proto": [frame.PROTO_NAME]}
+            self._ser.write((json.dumps(hello, separators=(",", ":")) + "\n").encode("utf-8"))
+        except Exception:
+            return False
+
+        buf = b""
+        t_end = time.time() + self.handshake_timeout_s
+        while time.time() < t_end:
             try:
                 raw = self._ser.read(256)
+            except Exception:
+                return False
+            if not raw:
+                continue
+            buf += raw
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                try:
+                    obj = loads_line(line.decode("utf-8", errors="ignore").strip())
+                except Exception:
+                    continue
+                if isinstance(obj, dict) and obj.get("type") == "hello" and obj.get("proto") == frame.PROTO_NAME:
+                    return True
+        return False
+
+    # ---------- RX ----------
+    def _on_frame(self, data: bytes):
+        try:
+            parsed = frame.parse_frame(data)
+        except ValueError:
+            self.rx_bad_frames += 1
+            return
+        if parsed is None:
+            return
+        seq, obj = parsed
+        if self._rx_seq is not None:
+            lost = (seq - self._rx_seq - 1) & 0xFFFF
+            if lost < 0x8000:
+                self.rx_lost_frames += lost
+        self._rx_seq = seq
+        self.rx_frames += 1
+        self._on_telem(obj)
+
+    def _on_line(self, data: bytes):
+        line = data.strip()
+        if not line:
+            return
+        try:
+            obj = loads_line(line.decode("utf-8", errors="ignore"))
+        except Exception:
+            # ignore malformed lines, keep link alive
+            return
+        if self._delta is not None and isinstance(obj, dict) and obj.get("type") == "resync":
+            self._delta.request_keyframe(resync=True)
+            return
+        self._on_telem(obj)
+
+    def _on_telem(self, obj: Any):
+        t_rx = time.perf_counter()
+        if isinstance(obj, dict):
+            self._track_latency(obj, t_rx)
+        self.rx_slot.put(obj)
+        self._last_rx_ts = time.time()
+        if self.on_rx is not None:
+            self.on_rx()
+
+    def _track_latency(self, obj: Dict[str, Any], t_rx: float):
+        ack = obj.get("ack")
+        if isinstance(ack, int) and ack != self._last_ack:
+            self._last_ack = ack
+            i = ack & 1023
+            if self._sent_seq[i] == ack:
+                rtt = t_rx - self._sent_t[i]
+                self.rtt_s = rtt
+                self.rtt_hist.record(rtt)
+                if self._last_rtt is not None:
+                    self.rtt_jitter_hist.record(abs(rtt - self._last_rtt))
+                self._last_rtt = rtt
+
+        # one-way jitter (RFC 3550 style): change in (arrival - Arduino send time)
+        t_ard = obj.get("t")
+        if isinstance(t_ard, (int, float)):
+            transit = t_rx - t_ard / 1000.0
+            if self._last_transit is not None:
+                d = abs(transit - self._last_transit)
+                if d < 5.0:  # Arduino millis() restart / wrap
+                    self.rx_jitter_hist.record(d)
+            self._last_transit = transit
+
+    def _rx_loop(self):
+        reader = self._reader
+        while not self._stop.is_set():
+            if not self._connected.is_set():
+                if self.reconnect:
+                    self._reconnect_loop()
+                else:
+                    time.sleep(0.1)
+                continue
+
+            on_frame = self._on_frame if self.proto == "bin" else self._on_line
+            try:
+                # block for the first byte only, then take whatever is buffered
+                n = min(max(1, self._ser.in_waiting), reader.capacity)
+                raw = self._ser.read(n)
+            except (serial.SerialException, OSError, TypeError, AttributeError):
+                # unplugged (or closed under us)
+                self._mark_down()
+                continue
+            try:
                 if not raw:
                     continue
-                buf += raw.decode("utf-8", errors="ignore")
+                reader.feed(raw)
 
-                while "\n" in buf:
-                    line, buf = buf.split("\n", 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        obj = loads_line(line)
-                        self.rx_queue.put(obj)
-                        self._last_rx_ts = time.time()
-                    except Exception:
-                        # ignore malformed lines, keep link alive
-                        pass
+                while True:
+                    data = reader.next_frame()
+                    if data is None:
+                        break
+                    if data:
+                        on_frame(data)
             except Exception:
                 time.sleep(0.1)
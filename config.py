@@ -1,7 +1,21 @@
-SERIAL_PORT = "/dev/ttyACM0"   # ganti kalau Arduino muncul sebagai /dev/ttyUSB0
+import os
+
+# UG243_SERIAL_PORT bisa diarahkan ke virtual Arduino (tools/virtual_arduino.py)
+SERIAL_PORT = os.environ.get("UG243_SERIAL_PORT", "/dev/ttyACM0")   # ganti kalau Arduino muncul sebagai /dev/ttyUSB0
 BAUDRATE = 115200
+SERIAL_PROTOCOL = "auto"     # "json" | "bin" | "auto" (handshake, fallback ke JSON)
+SERIAL_ASYNC_WRITE = False   # True = send() tidak pernah blok, writer thread yang flush
+SERIAL_DELTA = False         # True = keyframe + delta (JSON saja), hemat bandwidth di CONTROL_HZ tinggi
+SERIAL_KEYFRAME_S = 1.0
+SERIAL_NO_RESET = True       # tahan DTR low saat open -> board tidak auto-reset
+SERIAL_READY_TIMEOUT_S = 2.0 # max tunggu banner/telemetry pertama
+SERIAL_TX_LOG = None         # path JSONL untuk rekam command (tools/bench_delta.py)
 
-CONTROL_HZ = 20
+CONTROL_HZ = 50         # task "control": cmd dashboard + PS4 + mux drive + serial send/recv
+AUTO_HZ = 20            # task "auto": autonomy, periodik saja (rate limit th/st dituning per call @20 Hz)
+CONTROL_HEARTBEAT_HZ = 20  # RUNTIME "asyncio": control periodik (failsafe Arduino 0.5 s), input bangunkan langsung
+CONTROL_WAKE_MIN_S = 0.01  # jarak min antar tick control yang dibangunkan event (serial max ~100 cmd/s)
+TUI_POLL_HZ = 10        # task "tui": baca tombol; redraw tetap dibatasi LiveTUI.refresh_dt
 TELEMETRY_PRINT_HZ = 10
 
 
@@ -12,3 +26,6 @@ DASH_UDP_PORT = 15555
 # Publish rate limiting (optional)
 DASH_PUB_TX_HZ = 2      # max publish TX to dashboard = 10
 DASH_PUB_TELEM_HZ = 5   # max publish telem to dashboard = 20
+DASH_PUB_GRID_HZ = 1    # occupancy grid (sparse occupied cells)
+DASH_PUB_PATH_HZ = 2    # navigasi: goal + path (robot frame) + latency replan
+DASH_PUB_TIMING_HZ = 1  # timing per stage loop (p50/p99/max ms), window reset tiap publish
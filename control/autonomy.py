@@ -2,7 +2,9 @@
 # Rule-based autonomy controller (front 90° only) with:
 # - Emergency stop + lidar timeout fail-safe
 # - Smooth throttle based on front distance
-# - Gap-seeking steering (compare left vs right)
+# - Gap-seeking steering (compare left vs right), or planner="gap":
+#   follow-the-gap on the front polar histogram (control/gap_planner.py), or
+#   planner="dwa": dynamic-window arcs scored on the scan (control/dwa_planner.py)
 # - Hysteresis + commit time to avoid zig-zag
 # - Output rate limiting (throttle/steer)
 # - Simple recovery for "buntu" (stop -> reverse -> rotate)
@@ -19,6 +21,8 @@
 # NOTE:
 # - reverse without rear sensing is risky; this keeps reverse slow + short by default.
 
+import math
+
 
 def clamp(x, lo, hi):
     return lo if x < lo else hi if x > hi else x
@@ -59,6 +63,11 @@ class AutonomyController:
         # Optional side safety (slow down if side very close even if front is clear)
         self.side_safe_dist = 0.55
 
+        # Occupancy grid queries (when compute_drive gets grid=...)
+        self.robot_width = 0.35       # corridor width for clearance (m)
+        self.side_heading_deg = 60.0  # left/right clearance direction (sector centers)
+        self.front_cone_deg = 30.0    # cone for nearest obstacle (emergency stop)
+
         # === Output limits ===
         self.max_th = 0.60  # match your main.py scaling
         self.max_st = 1.00
@@ -66,6 +75,31 @@ class AutonomyController:
         # Reverse safety
         self.max_rev_th = 0.20  # slow reverse
 
+        # Speed-aware braking (when compute_drive gets speed=... in m/s):
+        # stop/slow distances grow by speed * brake_time_s (capped)
+        self.brake_time_s = 0.35
+        self.max_brake_margin = 0.60
+
+        # Time-to-collision (when compute_drive gets ttc=... seconds, front sector):
+        # throttle ramps down from ttc_slow to 0 at ttc_stop
+        self.ttc_stop = 0.8
+        self.ttc_slow = 2.5
+
+        # === Steering planner ===
+        # "rules": left/right sector balance (_steer_from_gap)
+        # "gap"  : follow-the-gap on compute_drive(scan=polar histogram), falls
+        #          back to "rules" when no scan / no admissible gap
+        # "dwa"  : dynamic window (throttle + steer) on the same scan, falls
+        #          back to "rules" when no scan / no admissible arc
+        self.planner = "rules"
+        self.gap_steer_full_deg = 45.0  # heading error that maps to full steer
+        self.gap = None                 # control.gap_planner.GapPlanner (created on first use)
+        self.dwa = None                 # control.dwa_planner.DWAPlanner (created on first use)
+        self.target_rad = 0.0           # preferred heading (rad, + = left), e.g.
+                                        # control.navigator.Navigator.target_rad(); "rules"
+                                        # steers toward it while the front is clear
+        self.speed_scale = 1.0          # throttle cap as a fraction of max_th (e.g. approaching a goal)
+
         # === Anti zig-zag ===
         self.hyst = 0.25         # meters (difference needed to switch turn preference)
         self.commit_time = 0.50  # seconds to "commit" to chosen turn direction
@@ -113,6 +147,46 @@ class AutonomyController:
     def _is_valid_dist(self, d):
         return d is not None and d > 0.0
 
+    def _ttc_limit(self, ttc):
+        """Throttle cap from time-to-collision (max_th when unknown / far)."""
+        if ttc is None or not (ttc < self.ttc_slow):
+            return self.max_th
+        t = (ttc - self.ttc_stop) / (self.ttc_slow - self.ttc_stop)
+        return clamp(t, 0.0, 1.0) * self.max_th
+
+    def _brake_margin(self, speed):
+        if speed is None or not (speed > 0.0):
+            return 0.0
+        return min(self.max_brake_margin, speed * self.brake_time_s)
+
+    def _tighter(self, d, other):
+        """min() that ignores a missing/invalid side."""
+        if not self._is_valid_dist(d):
+            return other
+        if other is None or not (other > 0.0):
+            return d
+        return min(d, other)
+
+    def _plan_gap(self, scan):
+        """Gap planner heading (rad, + = left) or None."""
+        if self.gap is None:
+            # Import lazily (NumPy) so the rules planner works in constrained envs
+            from control.gap_planner import GapPlanner
+            self.gap = GapPlanner(robot_radius=self.robot_width / 2.0)
+        heading, _ = self.gap.plan(scan, self.target_rad)
+        return heading
+
+    def _plan_dwa(self, scan):
+        """(th, st) from the dynamic window around the last output, or None."""
+        if self.dwa is None:
+            from control.dwa_planner import DWAPlanner
+            self.dwa = DWAPlanner(robot_radius=self.robot_width / 2.0)
+        return self.dwa.plan(
+            scan, self._last_th, self._last_st,
+            self.th_rate, self.st_rate, self.max_th * self.speed_scale, self.max_st,
+            target_rad=self.target_rad,
+        )
+
     def _smooth(self, prev, new):
         if prev is None:
             return new
@@ -226,6 +300,10 @@ class AutonomyController:
         now=None,
         lidar_timestamp=None,
         lidar_valid=True,
+        grid=None,
+        speed=None,
+        ttc=None,
+        scan=None,
     ):
         """
         Backward compatible with your original signature:
@@ -250,6 +328,17 @@ class AutonomyController:
           now : monotonic seconds (optional)
           lidar_timestamp : monotonic seconds of last lidar update (optional)
           lidar_valid : set False if data invalid/too few points
+          grid : optional core.occupancy_grid.OccupancyGrid; its corridor
+                 clearances / front cone tighten the sector distances (it also
+                 remembers obstacles that left the scan window)
+          speed : measured forward speed in m/s (e.g. scan-matching odometry);
+                  braking distances are scaled with it
+          ttc : time-to-collision in seconds of the closest approaching obstacle
+                in front (core.obstacle_tracker); brakes earlier/smoother than
+                distance alone when something moves toward us
+          scan : polar min-distance histogram in meters (sector 0 = front,
+                 counter-clockwise, NaN = empty), e.g. lidar.read_polar(180);
+                 used for steering when planner == "gap" / "dwa"
         """
         now = self._now(now)
 
@@ -273,6 +362,14 @@ class AutonomyController:
         rd = right_dist if self._is_valid_dist(right_dist) else avg_right
         fd = front_dist if self._is_valid_dist(front_dist) else min_front  # fallback
 
+        if grid is not None:
+            side = math.radians(self.side_heading_deg)
+            fd = self._tighter(fd, grid.clearance(0.0, self.robot_width))
+            ld = self._tighter(ld, grid.clearance(side, self.robot_width))
+            rd = self._tighter(rd, grid.clearance(-side, self.robot_width))
+            near, _ = grid.nearest_in_cone(0.0, math.radians(self.front_cone_deg))
+            min_front = self._tighter(min_front, near)
+
         # Validate basic numeric inputs
         if not (self._is_valid_dist(min_front) and self._is_valid_dist(ld) and self._is_valid_dist(rd) and self._is_valid_dist(fd)):
             # Invalid ranges -> stop
@@ -299,8 +396,11 @@ class AutonomyController:
         rd_s = self._right_s
         minf_s = self._min_front_s
 
+        # Braking margin grows with measured speed (0 when unknown / reversing)
+        brake = self._brake_margin(speed)
+
         # ----- Priority 1: Emergency stop -----
-        if minf_s < self.stop_dist:
+        if minf_s < self.stop_dist + brake:
             # If looks like bottleneck, enter recovery sequence
             if self._detect_bottleneck(ld_s, fd_s, rd_s):
                 self._state = "RECOVERY_STOP"
@@ -350,22 +450,49 @@ class AutonomyController:
 
         # ----- Normal RUN behavior -----
 
-        # Pick/keep a turn direction using hysteresis + commit time (for stability)
-        self._choose_turn_dir(ld_s, rd_s, now)
-
-        # Steering from gap (continuous, but you can quantize if you prefer)
-        st_target = self._steer_from_gap(ld_s, rd_s, fd_s)
-
-        # Optional: if side too close, bias steering away and reduce speed a bit
-        if ld_s < self.side_safe_dist and rd_s >= ld_s:
-            # left very close -> steer right
-            st_target = max(st_target, +0.35)
-        elif rd_s < self.side_safe_dist and ld_s >= rd_s:
-            # right very close -> steer left
-            st_target = min(st_target, -0.35)
+        if self.planner == "dwa" and scan is not None:
+            cmd = self._plan_dwa(scan)
+            if cmd is not None:
+                # same braking envelope as the rules: ease off before the
+                # emergency-stop distance instead of chattering on it
+                th_target = min(cmd[0], self._ttc_limit(ttc), self._map_front_to_throttle(minf_s - brake, 0.0))
+                th_out, st_out = self._apply_limits_and_rate(th_target, cmd[1])
+                self._last_auto_estop = False
+                return th_out, st_out, False
+            # no admissible arc -> rules below (distance throttle / emergency stop)
+
+        heading = None
+        if self.planner == "gap" and scan is not None:
+            heading = self._plan_gap(scan)
+
+        if heading is not None:
+            # heading + = left (counter-clockwise), steer + = right
+            st_target = clamp(-heading / math.radians(self.gap_steer_full_deg), -1.0, 1.0) * self.max_st
+        else:
+            # Pick/keep a turn direction using hysteresis + commit time (for stability)
+            self._choose_turn_dir(ld_s, rd_s, now)
+
+            # Steering from gap (continuous, but you can quantize if you prefer)
+            st_target = self._steer_from_gap(ld_s, rd_s, fd_s)
+
+            # Goal heading (navigator): full weight with a clear front, fades
+            # out toward stop_dist where the left/right rules take over
+            if self.target_rad:
+                w = clamp((fd_s - brake - self.stop_dist) / (self.clear_dist - self.stop_dist), 0.0, 1.0)
+                st_goal = clamp(-self.target_rad / math.radians(self.gap_steer_full_deg), -1.0, 1.0) * self.max_st
+                st_target = (1.0 - w) * st_target + w * st_goal
+
+            # Optional: if side too close, bias steering away and reduce speed a bit
+            if ld_s < self.side_safe_dist and rd_s >= ld_s:
+                # left very close -> steer right
+                st_target = max(st_target, +0.35)
+            elif rd_s < self.side_safe_dist and ld_s >= rd_s:
+                # right very close -> steer left
+                st_target = min(st_target, -0.35)
 
         # Throttle based on front distance + turning penalty
-        th_target = self._map_front_to_throttle(fd_s, abs(st_target))
+        th_target = self._map_front_to_throttle(fd_s - brake, abs(st_target))
+        th_target = min(th_target, self._ttc_limit(ttc), self.speed_scale * self.max_th)
 
         # Extra slowdown if both sides are close (tight corridor)
         if min(ld_s, rd_s) < self.side_safe_dist:
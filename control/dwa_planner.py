@@ -0,0 +1,223 @@
+# control/dwa_planner.py
+# Dynamic-window planner: sample (throttle, steer) around the current command,
+# roll out constant-curvature arcs for all samples at once and score them
+# against the scan points.
+#
+# INPUT: polar min-distance histogram (same as GapPlanner: meters, NaN = no
+# return, sector 0 = front, counter-clockwise) -> points in the robot frame
+# (x forward, y left).
+#
+# Rollouts are closed form: every (v, w) sample is an arc of curvature w / v
+# evaluated over a fixed lookahead length, so the distance of every scan point
+# to every arc, and the arc length travelled before the robot circle touches
+# it, come from one arcs x points broadcast (no per-step poses). Arc geometry
+# does not depend on speed, so the broadcast runs once per revolution over a
+# fixed curvature table (n_curv arcs) and every control tick only looks its
+# samples up (min of the two neighbouring arcs). Scores per arc:
+#   free    : arc length before contact (admissible only if we can still brake),
+#             scaled by forward speed (turning in place makes no progress)
+#   clear   : closest approach of the swept path to any point
+#   heading : end-of-horizon heading vs target heading
+#   speed   : forward speed
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class DWAPlanner:
+    """
+    plan(polar_m, th0, st0, th_rate, st_rate, max_th, max_st, target_rad=0.0)
+      -> (th, st) best command in the dynamic window, or None (nothing admissible)
+    Window: th0 +- window_ticks * th_rate, st0 +- window_ticks * st_rate
+    (n_th x n_st samples); the caller still rate-limits the output.
+    Motion model = the tank mix of the drive (sim/robot.py):
+      left = th + turn_gain * st, right = th - turn_gain * st (st > 0 = right)
+      v = max_speed * (left + right) / 2, w = max_speed * (right - left) / track_m
+    """
+
+    def __init__(
+        self,
+        n_th: int = 7,
+        n_st: int = 15,
+        window_ticks: int = 5,
+        horizon_s: float = 1.5,
+        lookahead_m: float = 2.0,
+        robot_radius: float = 0.20,
+        safety_m: float = 0.05,
+        max_speed: float = 1.0,
+        turn_gain: float = 0.6,
+        track_m: float = 0.30,
+        decel: float = 1.5,
+        max_range: float = 4.0,
+        w_heading: float = 0.6,
+        w_clear: float = 1.0,
+        w_free: float = 1.0,
+        w_speed: float = 0.8,
+        clear_norm_m: float = 0.6,
+        n_curv: int = 61,
+        max_curv: float = 6.0,
+    ):
+        self.n_th = n_th
+        self.n_st = n_st
+        self.window_ticks = window_ticks
+        self.horizon_s = horizon_s
+        self.lookahead_m = lookahead_m
+        self.robot_radius = robot_radius
+        self.safety_m = safety_m
+        self.max_speed = max_speed
+        self.turn_gain = turn_gain
+        self.track_m = track_m
+        self.decel = decel
+        self.max_range = max_range
+        self.w_heading = w_heading
+        self.w_clear = w_clear
+        self.w_free = w_free
+        self.w_speed = w_speed
+        self.clear_norm_m = clear_norm_m
+        # curvature table, denser around straight ahead
+        u = np.linspace(-1.0, 1.0, n_curv)
+        self.curv = max_curv * np.sinh(3.0 * u) / math.sinh(3.0)
+
+        self._n = 0
+        self._cos = np.zeros(0)
+        self._sin = np.zeros(0)
+        self._last_polar: Optional[np.ndarray] = None
+        self._pts = np.zeros((0, 2))
+        self._table_polar: Optional[np.ndarray] = None
+        self._free_k = np.zeros(0)
+        self._clear_k = np.zeros(0)
+        self.last_scores: Optional[np.ndarray] = None
+
+    # ---------- inputs ----------
+    def points(self, polar_m: np.ndarray) -> np.ndarray:
+        """Polar histogram -> float64[P, 2] points within max_range (cached per array)."""
+        if polar_m is self._last_polar:
+            return self._pts
+        n = len(polar_m)
+        if n != self._n:
+            a = np.arange(n) * (2.0 * math.pi / n)
+            self._n, self._cos, self._sin = n, np.cos(a), np.sin(a)
+        r = np.asarray(polar_m, dtype=np.float64)
+        ok = np.isfinite(r) & (r <= self.max_range)
+        self._pts = np.stack([r[ok] * self._cos[ok], r[ok] * self._sin[ok]], axis=1)
+        self._last_polar = polar_m
+        return self._pts
+
+    def model(self, th: np.ndarray, st: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(throttle, steer) -> (v m/s, w rad/s counter-clockwise)."""
+        left = np.clip(th + self.turn_gain * st, -1.0, 1.0) * self.max_speed
+        right = np.clip(th - self.turn_gain * st, -1.0, 1.0) * self.max_speed
+        return 0.5 * (left + right), (right - left) / self.track_m
+
+    def samples(self, th0, st0, th_rate, st_rate, max_th, max_st) -> Tuple[np.ndarray, np.ndarray]:
+        k = self.window_ticks
+        th = np.linspace(max(0.0, th0 - k * th_rate), max(0.0, min(max_th, th0 + k * th_rate)), self.n_th)
+        st = np.linspace(max(-max_st, st0 - k * st_rate), min(max_st, st0 + k * st_rate), self.n_st)
+        th, st = np.meshgrid(th, st, indexing="ij")
+        return th.ravel(), st.ravel()
+
+    # ---------- rollouts ----------
+    def rollout(self, v: np.ndarray, w: np.ndarray, pts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per sample: (free_m, clear_m)
+          free_m : arc length before the robot circle touches a point (inf = none within lookahead_m)
+          clear_m: closest distance (minus radius) of any point to the swept arc
+        Arcs are evaluated over lookahead_m whatever the speed, so curvature
+        choices differ before an obstacle is inside the stopping distance.
+        """
+        big_r = self.robot_radius + self.safety_m
+        free = np.full(v.shape, np.inf)
+        clear = np.full(v.shape, np.inf)
+        if len(pts):
+            # only points the robot circle can reach within the lookahead
+            pts = pts[np.hypot(pts[:, 0], pts[:, 1]) <= self.lookahead_m + big_r]
+        if not len(pts):
+            return free, clear
+        if ((pts[:, 0] ** 2 + pts[:, 1] ** 2) < big_r * big_r).any():
+            return np.zeros(v.shape), np.zeros(v.shape)  # already touching
+
+        # signed radius (centre at (0, r)); straight = radius 1e4 (2 m arc -> 0.2 mm off a line)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.where(v > 1e-6, w / v, 0.0)
+        k = np.where(np.abs(k) < 1e-4, np.where(k < 0, -1e-4, 1e-4), k)
+        r = (1.0 / k)[:, None]
+        ar = np.abs(r)
+
+        px, py = pts[None, :, 0], pts[None, :, 1]          # [1, P]
+        qy = py - r                                        # [S, P]
+        rho = np.sqrt(px * px + qy * qy)
+        d = np.abs(rho - ar)                               # distance to the circle
+        # angle from the start vector s0 = (0, -r) to q in the travel direction
+        # (counter-clockwise around the centre for r > 0, clockwise for r < 0):
+        # atan2(cross(s0, q), dot(s0, q)) * sign(r) == atan2(|r| px, -|r| qy sign(r))
+        phi = np.mod(np.arctan2(px, -np.sign(r) * qy), 2.0 * math.pi)
+        s = phi * ar                                       # arc length to the point's projection
+
+        near = d < big_r
+        # contact when the centre is `alpha` before the point (law of cosines)
+        cos_a = (rho * rho + ar * ar - big_r * big_r) / (2.0 * rho * ar)
+        s_hit = (phi - np.arccos(np.clip(cos_a, -1.0, 1.0))) * ar
+        hit = near & (s_hit <= self.lookahead_m)
+        free = np.where(hit, np.maximum(s_hit, 0.0), np.inf).min(axis=1)
+        on_path = s <= self.lookahead_m
+        clear = np.where(on_path, d - big_r, np.inf).min(axis=1)
+        return free, clear
+
+    def arcs(self, polar_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(free_m, clear_m) per curvature-table arc (cached per array)."""
+        if polar_m is not self._table_polar:
+            ones = np.ones_like(self.curv)
+            self._free_k, self._clear_k = self.rollout(ones, self.curv, self.points(polar_m))
+            self._table_polar = polar_m
+        return self._free_k, self._clear_k
+
+    def lookup(self, v: np.ndarray, w: np.ndarray, polar_m: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per sample (free_m, clear_m) from the curvature table: the worse of the
+        two table arcs around w / v (61 arcs: at most ~2.5 cm optimistic vs the
+        exact rollout, inside safety_m). Turns tighter than max_curv (spinning
+        in place) use the end of the table.
+        """
+        free_k, clear_k = self.arcs(polar_m)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.where(v > 1e-6, w / v, np.where(w == 0.0, 0.0, np.copysign(np.inf, w)))
+        hi = np.clip(np.searchsorted(self.curv, k), 1, len(self.curv) - 1)
+        lo = hi - 1
+        return np.minimum(free_k[lo], free_k[hi]), np.minimum(clear_k[lo], clear_k[hi])
+
+    def plan(
+        self,
+        polar_m: np.ndarray,
+        th0: float,
+        st0: float,
+        th_rate: float,
+        st_rate: float,
+        max_th: float,
+        max_st: float,
+        target_rad: float = 0.0,
+    ) -> Optional[Tuple[float, float]]:
+        th, st = self.samples(th0, st0, th_rate, st_rate, max_th, max_st)
+        v, w = self.model(th, st)
+        free, clear = self.lookup(v, w, polar_m)
+
+        # admissible: can stop before contact
+        stop_len = np.maximum(v, 0.0) ** 2 / (2.0 * self.decel)
+        ok = free > stop_len
+        if not ok.any():
+            self.last_scores = None
+            return None
+
+        horizon_len = self.lookahead_m
+        # no wrap: turning 300 degrees the wrong way is not "60 degrees off"
+        head_err = np.minimum(np.abs(w * self.horizon_s - target_rad), math.pi)
+        score = (
+            self.w_heading * (1.0 - head_err / math.pi)
+            + self.w_clear * np.minimum(clear, self.clear_norm_m) / self.clear_norm_m
+            + self.w_free * np.minimum(free, horizon_len) / horizon_len * np.maximum(v, 0.0) / self.max_speed
+            + self.w_speed * np.maximum(v, 0.0) / self.max_speed
+        )
+        score = np.where(ok, score, -np.inf)
+        self.last_scores = score
+        i = int(np.argmax(score))
+        return float(th[i]), float(st[i])
@@ -0,0 +1,127 @@
+# control/gap_planner.py
+# Follow-the-gap / VFH-style heading selection on a polar min-distance histogram.
+#
+# INPUT: polar histogram over 360° (meters, NaN = no return), sector 0 centred
+# on the front, counter-clockwise -- i.e. lidar.read_polar(n) or
+# snap.reduce(get_layout(n))[:, S_MIN]. Only the front `fov_deg` is used.
+#
+# 1. inflate: every obstacle bin blocks the bins within asin(R / r) of it
+#    (R = robot radius + safety) and caps their free distance at r - R
+#    (pairwise bins x bins in NumPy; 90 front bins -> ~8k elements)
+# 2. admissible bins: free distance >= clear_m (wide-open gaps preferred),
+#    else >= min_free_m; gaps = runs of admissible bins
+# 3. heading per gap: the target clamped into the gap (edges shrunk by
+#    edge_margin_deg, narrow gaps -> centre), cost = distance to target +
+#    change from the previous heading - clearance; the cheapest gap wins
+# Headings are radians, counter-clockwise (positive = left).
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class GapPlanner:
+    """
+    plan(polar_m, target_rad=0.0) -> (heading_rad or None, free_m along it)
+    None = no admissible gap (caller falls back / stops).
+    The inflated histogram is cached per input array, so calling plan() at
+    the control rate between revolutions only redoes the gap selection.
+    """
+
+    def __init__(
+        self,
+        fov_deg: float = 180.0,
+        robot_radius: float = 0.20,
+        safety_m: float = 0.05,
+        max_range: float = 3.0,
+        clear_m: float = 1.50,
+        min_free_m: float = 0.60,
+        edge_margin_deg: float = 10.0,
+        w_target: float = 1.0,
+        w_prev: float = 0.5,
+        w_clear: float = 0.5,
+    ):
+        self.fov_deg = fov_deg
+        self.robot_radius = robot_radius
+        self.safety_m = safety_m
+        self.max_range = max_range
+        self.clear_m = clear_m
+        self.min_free_m = min_free_m
+        self.edge_margin_deg = edge_margin_deg
+        self.w_target = w_target
+        self.w_prev = w_prev
+        self.w_clear = w_clear
+
+        self._n = 0
+        self._idx = np.zeros(0, dtype=np.int64)
+        self._ang = np.zeros(0)
+        self._dang = np.zeros((0, 0))
+        self._half_bin = 0.0
+
+        self._last_polar: Optional[np.ndarray] = None
+        self._free = np.zeros(0)
+        self.prev_heading = 0.0
+
+    def _geometry(self, n: int):
+        """Front bins (ordered right -> left), their angles and the pairwise angle table."""
+        width = 2.0 * math.pi / n
+        ang = np.arange(n) * width
+        ang = (ang + math.pi) % (2.0 * math.pi) - math.pi
+        keep = np.abs(ang) <= math.radians(self.fov_deg) / 2.0
+        idx = np.flatnonzero(keep)
+        idx = idx[np.argsort(ang[idx])]
+        self._n = n
+        self._idx = idx
+        self._ang = ang[idx]
+        self._dang = np.abs(self._ang[:, None] - self._ang[None, :])
+        self._half_bin = width / 2.0
+
+    def inflate(self, polar_m: np.ndarray) -> np.ndarray:
+        """Free distance (m) per front bin after growing obstacles by the robot radius."""
+        if len(polar_m) != self._n:
+            self._geometry(len(polar_m))
+        r = np.asarray(polar_m, dtype=np.float64)[self._idx]
+        r = np.where(np.isfinite(r), np.minimum(r, self.max_range), self.max_range)
+        big_r = self.robot_radius + self.safety_m
+        obs = r < self.max_range
+        half = np.arcsin(np.clip(big_r / np.maximum(r, 1e-6), 0.0, 1.0)) + self._half_bin
+        block = (self._dang <= half[None, :]) & obs[None, :]  # [i, j]: obstacle j covers bin i
+        free = np.where(block, r[None, :] - big_r, self.max_range).min(axis=1)
+        return np.maximum(free, 0.0)
+
+    def plan(self, polar_m: np.ndarray, target_rad: float = 0.0) -> Tuple[Optional[float], float]:
+        if polar_m is not self._last_polar:
+            self._free = self.inflate(polar_m)
+            self._last_polar = polar_m
+        free = self._free
+        if not free.size:
+            return None, 0.0
+
+        ok = free >= self.clear_m
+        if not ok.any():
+            ok = free >= self.min_free_m
+            if not ok.any():
+                return None, float(free.max())
+
+        edges = np.diff(np.concatenate(([0], ok.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        a0 = self._ang[starts] - self._half_bin
+        a1 = self._ang[ends] + self._half_bin
+        margin = np.minimum(math.radians(self.edge_margin_deg), (a1 - a0) / 2.0)
+        head = np.clip(target_rad, a0 + margin, a1 - margin)
+
+        k = np.clip(np.searchsorted(self._ang, head), 0, len(self._ang) - 1)
+        clear = free[k]
+        cost = (
+            self.w_target * np.abs(head - target_rad)
+            + self.w_prev * np.abs(head - self.prev_heading)
+            - self.w_clear * clear / self.max_range
+        )
+        best = int(np.argmin(cost))
+        self.prev_heading = float(head[best])
+        return self.prev_heading, float(clear[best])
+
+    def reset(self):
+        self._last_polar = None
+        self.prev_heading = 0.0
@@ -0,0 +1,616 @@
+# control/navigator.py
+# Goal-directed navigation on top of the occupancy grid.
+#
+# The OccupancyGrid is robot-centred (it scrolls every revolution), so paths
+# are planned on a separate lattice anchored in the odometry frame: every
+# revolution the grid's occupied cells are rasterized into it (cells outside
+# the grid's view keep their last value), inflated by the robot radius, and
+# diffed against the previous revolution.
+#   incremental=True : D* Lite (backward search from the goal) repairs only
+#                      the cells that changed + the robot's new start cell;
+#                      full search when the lattice is re-anchored, the goal
+#                      cell moves or more than max_changed_frac cells changed
+#   incremental=False: plain A* from scratch every revolution
+# Lattice: 8-connected, one-cell blocked border (no bounds checks in the inner
+# loops), entering a blocked cell costs inf (leaving one is allowed, so a
+# robot inside the inflation still gets out).
+# update() runs on the lidar thread and plans without holding _lock; the
+# result is swapped in at the end (dropped if set_goal / cancel came in
+# meanwhile), so target_rad() / speed_scale() on the control path never wait
+# for a replan.
+#
+# Goals come from the dashboard (/api/tx -> UDP 15556 -> CmdUdpRx):
+#   {"cmd": "goal", "x": 2.0, "y": 0.5, "frame": "robot"}   # meters, x forward, y left
+#   {"cmd": "goal", "frame": "odom", "x": ..., "y": ...}   # odometry frame
+#   {"cmd": "goal", "cancel": true}
+# Goals farther than the lattice allows become a sub-goal on the way; the
+# lattice re-anchors when the robot gets there. A goal inside the inflation
+# (next to a wall) snaps to the nearest free cell within goal_snap_m.
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.histogram import Histogram
+
+SQRT2 = math.sqrt(2.0)
+INF = float("inf")
+
+
+def _offsets(w: int) -> List[Tuple[int, float]]:
+    """8-neighbour (flat offset, step cost) on a row-major lattice `w` cells wide."""
+    return [
+        (-w - 1, SQRT2), (-w, 1.0), (-w + 1, SQRT2),
+        (-1, 1.0), (1, 1.0),
+        (w - 1, SQRT2), (w, 1.0), (w + 1, SQRT2),
+    ]
+
+
+def _octile(a: int, b: int, w: int) -> float:
+    ay, ax = divmod(a, w)
+    by, bx = divmod(b, w)
+    dx = abs(ax - bx)
+    dy = abs(ay - by)
+    return dx + dy + (SQRT2 - 2.0) * min(dx, dy)
+
+
+def astar(blocked: List[bool], w: int, start: int, goal: int, max_expansions: int = 100000) -> Optional[List[int]]:
+    """Forward A* on a padded flat lattice; cells start -> goal, or None."""
+    if blocked[goal]:
+        return None
+    offs = _offsets(w)
+    g = {start: 0.0}
+    parent = {start: start}
+    heap = [(_octile(start, goal, w), start)]
+    closed = set()
+    n = 0
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in closed:
+            continue
+        if u == goal:
+            path = [u]
+            while u != start:
+                u = parent[u]
+                path.append(u)
+            return path[::-1]
+        closed.add(u)
+        n += 1
+        if n > max_expansions:
+            return None
+        gu = g[u]
+        for off, c in offs:
+            v = u + off
+            if blocked[v] or v in closed:
+                continue
+            gv = gu + c
+            if gv < g.get(v, INF):
+                g[v] = gv
+                parent[v] = u
+                heapq.heappush(heap, (gv + _octile(v, goal, w), v))
+    return None
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig & Likhachev) on a padded flat lattice.
+    - compute(): (re)search until the start is consistent
+    - move_start(cell): robot moved (key modifier km, no reset)
+    - update_cells(blocked, changed): new blocked list + cells that flipped
+    - path(): greedy descent of g from the start
+    Lazy-deletion heap: `_open` holds the live key per cell.
+    """
+
+    def __init__(self, blocked: List[bool], w: int, start: int, goal: int):
+        self.w = w
+        self.blocked = blocked
+        self.start = start
+        self.goal = goal
+        self._offs = _offsets(w)
+        edge = np.zeros((len(blocked) // w, w), dtype=bool)
+        edge[0, :] = edge[-1, :] = edge[:, 0] = edge[:, -1] = True
+        self._border = edge.ravel().tolist()  # never expanded (neighbours off the lattice)
+        self._last = start
+        self.km = 0.0
+        n = len(blocked)
+        self.g = [INF] * n
+        self.rhs = [INF] * n
+        self.rhs[goal] = 0.0
+        self._heap: List[Tuple[float, float, int]] = []
+        self._open: Dict[int, Tuple[float, float]] = {}
+        self._push(goal)
+        self.expansions = 0
+
+    def _key(self, u: int) -> Tuple[float, float]:
+        m = min(self.g[u], self.rhs[u])
+        return (m + _octile(self.start, u, self.w) + self.km, m)
+
+    def _push(self, u: int):
+        k = self._key(u)
+        self._open[u] = k
+        heapq.heappush(self._heap, (k[0], k[1], u))
+
+    def _best_rhs(self, u: int) -> float:
+        g, blocked = self.g, self.blocked
+        best = INF
+        for off, c in self._offs:
+            v = u + off
+            if not blocked[v]:
+                x = c + g[v]
+                if x < best:
+                    best = x
+        return best
+
+    def _update(self, u: int):
+        if self.g[u] != self.rhs[u]:
+            if self._open.get(u) != self._key(u):
+                self._push(u)
+        else:
+            self._open.pop(u, None)
+
+    def move_start(self, start: int):
+        if start != self.start:
+            self.km += _octile(self._last, start, self.w)
+            self._last = start
+            self.start = start
+
+    def update_cells(self, blocked: List[bool], changed):
+        """
+        Cells in `changed` flipped blocked state: repair the edges into them.
+        Freed cell -> neighbours can only get cheaper (O(1) each); blocked
+        cell -> only neighbours whose best successor it was are recomputed.
+        """
+        self.blocked = blocked
+        g, rhs, border, goal = self.g, self.rhs, self._border, self.goal
+        lowered = set()
+        raised = set()
+        for v in changed:
+            gv = g[v]
+            if gv == INF:
+                continue  # nobody routed through v and nobody can through it yet
+            if blocked[v]:
+                for off, c in self._offs:
+                    p = v + off
+                    if p != goal and not border[p] and rhs[p] >= c + gv - 1e-9:
+                        raised.add(p)
+            else:
+                for off, c in self._offs:
+                    p = v + off
+                    if p != goal and not border[p] and c + gv < rhs[p]:
+                        rhs[p] = c + gv
+                        lowered.add(p)
+        for p in raised:
+            rhs[p] = self._best_rhs(p)
+        for p in lowered | raised:
+            self._update(p)
+
+    def compute(self, max_expansions: int = 100000) -> bool:
+        """False = expansion budget hit before the start became consistent."""
+        g, rhs, heap, open_ = self.g, self.rhs, self._heap, self._open
+        border = self._border
+        s = self.start
+        n = 0
+        while heap:
+            k1, k2, u = heap[0]
+            if open_.get(u) != (k1, k2):
+                heapq.heappop(heap)  # stale entry
+                continue
+            # strictly past the start's key: cells tied with it (straight runs,
+            # float noise) can sit on the path with a stale g
+            if k1 > self._key(s)[0] + 1e-6 and rhs[s] == g[s]:
+                break
+            n += 1
+            if n > max_expansions:
+                self.expansions += n
+                return False
+            heapq.heappop(heap)
+            k_new = self._key(u)
+            if (k1, k2) < k_new:
+                self._push(u)
+                continue
+            del open_[u]
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                if self.blocked[u]:
+                    continue  # nothing can enter a blocked cell
+                for off, c in self._offs:
+                    p = u + off
+                    if p != self.goal and not border[p]:
+                        x = c + g[u]
+                        if x < rhs[p]:
+                            rhs[p] = x
+                            self._update(p)
+            else:
+                g_old = g[u]
+                g[u] = INF
+                # only cells whose rhs came through u need a recompute
+                into = () if self.blocked[u] else self._offs
+                for off, c in into:
+                    p = u + off
+                    if p != self.goal and not border[p]:
+                        if rhs[p] >= c + g_old - 1e-9:
+                            rhs[p] = self._best_rhs(p)
+                        self._update(p)
+                if u != self.goal:
+                    rhs[u] = self._best_rhs(u)
+                self._update(u)
+        self.expansions += n
+        return True
+
+    def path(self, max_len: Optional[int] = None) -> Optional[List[int]]:
+        g, blocked = self.g, self.blocked
+        u = self.start
+        if g[u] == INF:
+            return None
+        out = [u]
+        max_len = max_len or len(g)
+        while u != self.goal:
+            best, nxt = INF, -1
+            for off, c in self._offs:
+                v = u + off
+                if not blocked[v] and c + g[v] < best:
+                    best, nxt = c + g[v], v
+            if nxt < 0 or best == INF or len(out) > max_len:
+                return None
+            u = nxt
+            out.append(u)
+        return out
+
+
+class Navigator:
+    """
+    set_goal(x, y, frame="robot"|"odom") / cancel()
+    update(grid, pose, ts): once per revolution after the grid update
+      (pose = odometry (x, y, theta), e.g. ScanOdometry.pose)
+    target_rad(): bearing (robot frame, counter-clockwise) of the path point
+      lookahead_m ahead -> AutonomyController.target_rad for "gap" / "dwa"
+    speed_scale(): throttle cap near the goal -> AutonomyController.speed_scale
+    export(): dashboard payload (goal + path in the robot frame, replan stats)
+    status: idle | active | no_path | goal_blocked | reached
+    replan_hist: per-revolution update latency (seconds)
+    """
+
+    def __init__(
+        self,
+        size_m: float = 12.0,
+        res_m: float = 0.10,
+        robot_radius: float = 0.20,
+        safety_m: float = 0.05,
+        goal_tol_m: float = 0.30,
+        lookahead_m: float = 0.80,
+        slow_m: float = 1.0,
+        min_speed_scale: float = 0.35,
+        goal_snap_m: float = 0.5,
+        edge_m: float = 1.0,
+        incremental: bool = True,
+        max_changed_frac: float = 0.05,
+        max_expansions: int = 20000,
+        retry_s: float = 1.0,
+    ):
+        self.res = res_m
+        self.n = int(round(size_m / res_m))
+        self.w = self.n + 2  # padded
+        self.size_m = self.n * res_m
+        self.robot_radius = robot_radius
+        self.safety_m = safety_m
+        self.goal_tol_m = goal_tol_m
+        self.lookahead_m = lookahead_m
+        self.slow_m = slow_m
+        self.min_speed_scale = min_speed_scale
+        self.goal_snap_m = goal_snap_m
+        self.edge_m = edge_m
+        self.incremental = incremental
+        self.max_changed_frac = max_changed_frac
+        self.max_expansions = max_expansions
+        self.retry_s = retry_s
+
+        r = int(math.ceil((robot_radius + safety_m) / res_m))
+        self._disk = [(dy, dx) for dy in range(-r, r + 1) for dx in range(-r, r + 1) if dx * dx + dy * dy <= r * r]
+
+        # published state (goal / pose / status / path): _lock, held only for
+        # reads and swaps; planning below runs without it (lidar thread only)
+        self._lock = threading.Lock()
+        self.goal: Optional[Tuple[float, float]] = None
+        self.pose = (0.0, 0.0, 0.0)
+        self.status = "idle"
+        self.path: List[Tuple[float, float]] = []
+        self._approach_xy: Optional[Tuple[float, float]] = None  # point speed_scale() slows down for
+        self._goal_gen = 0  # bumped by set_goal / cancel -> plans for an older goal are dropped
+
+        self._plan_gen = -1
+        self._origin: Optional[Tuple[float, float]] = None  # odom (x, y) of interior cell (0, 0) corner
+        self._sub_goal: Optional[Tuple[float, float]] = None
+        self._goal_xy: Optional[Tuple[float, float]] = None  # cell actually planned to
+        self._occ = np.zeros((self.n, self.n), dtype=bool)
+        self._blocked_np = np.ones((self.w, self.w), dtype=bool)
+        self._blocked: List[bool] = []
+        self._planner: Optional[DStarLite] = None
+        self._retry_at = 0.0
+
+        self.replan_hist = Histogram()
+        self.replans = 0
+        self.full_replans = 0
+        self.last_replan_ms = 0.0
+        self.last_changed = 0
+        self.last_mode = "idle"
+
+    # ---------- goals ----------
+    def set_goal(self, x: float, y: float, frame: str = "robot"):
+        with self._lock:
+            if frame == "robot":
+                px, py, th = self.pose
+                c, s = math.cos(th), math.sin(th)
+                x, y = px + c * x - s * y, py + s * x + c * y
+            self.goal = (float(x), float(y))
+            self.status = "active"
+            self.path = []
+            self._approach_xy = self.goal
+            self._goal_gen += 1  # re-anchor on the next update
+
+    def cancel(self):
+        with self._lock:
+            self.goal = None
+            self.status = "idle"
+            self.path = []
+            self._approach_xy = None
+            self._goal_gen += 1
+
+    def handle_cmd(self, msg: Dict) -> bool:
+        """Dashboard {"cmd": "goal", ...}; True if it was a goal command."""
+        if msg.get("cmd") != "goal":
+            return False
+        if msg.get("cancel"):
+            self.cancel()
+            return True
+        try:
+            self.set_goal(float(msg["x"]), float(msg["y"]), msg.get("frame", "robot"))
+        except (KeyError, TypeError, ValueError):
+            pass
+        return True
+
+    # ---------- lattice ----------
+    def _cell(self, x: float, y: float) -> int:
+        ix = int(math.floor((x - self._origin[0]) / self.res))
+        iy = int(math.floor((y - self._origin[1]) / self.res))
+        if 0 <= ix < self.n and 0 <= iy < self.n:
+            return (iy + 1) * self.w + ix + 1
+        return -1
+
+    def _xy(self, cell: int) -> Tuple[float, float]:
+        iy, ix = divmod(cell, self.w)
+        return (
+            self._origin[0] + (ix - 0.5) * self.res,
+            self._origin[1] + (iy - 0.5) * self.res,
+        )
+
+    def _anchor(self, pose: Tuple[float, float, float], goal: Tuple[float, float]):
+        """Place the lattice over robot + goal (or a sub-goal toward it)."""
+        px, py, _ = pose
+        gx, gy = goal
+        dx, dy = gx - px, gy - py
+        d = math.hypot(dx, dy)
+        half = self.size_m / 2.0 - self.edge_m
+        if d <= 2.0 * half:
+            cx, cy = px + dx / 2.0, py + dy / 2.0
+            self._sub_goal = None
+        else:
+            ux, uy = dx / d, dy / d
+            cx, cy = px + ux * half, py + uy * half
+            self._sub_goal = (px + ux * 2.0 * half, py + uy * 2.0 * half)
+        self._origin = (cx - self.size_m / 2.0, cy - self.size_m / 2.0)
+        self._occ[:] = False
+        self._planner = None
+
+    def _free_cell(self, x: float, y: float) -> int:
+        """Cell of (x, y), or the nearest unblocked cell within goal_snap_m (-1 = none)."""
+        cell = self._cell(x, y)
+        if cell >= 0 and not self._blocked[cell]:
+            return cell
+        r = int(math.ceil(self.goal_snap_m / self.res))
+        ix = int(math.floor((x - self._origin[0]) / self.res)) + 1
+        iy = int(math.floor((y - self._origin[1]) / self.res)) + 1
+        y0, y1 = max(1, iy - r), min(self.w - 1, iy + r + 1)
+        x0, x1 = max(1, ix - r), min(self.w - 1, ix + r + 1)
+        if y0 >= y1 or x0 >= x1:
+            return -1
+        free = ~self._blocked_np[y0:y1, x0:x1]
+        yy, xx = np.nonzero(free)
+        if not yy.size:
+            return -1
+        d2 = (yy + y0 - iy) ** 2 + (xx + x0 - ix) ** 2
+        i = int(np.argmin(d2))
+        if d2[i] > r * r:
+            return -1
+        return int((yy[i] + y0) * self.w + xx[i] + x0)
+
+    def _rasterize(self, grid, pose: Tuple[float, float, float]) -> np.ndarray:
+        """Grid occupied cells (robot frame) -> lattice, inflated; padded bool[w, w]."""
+        px, py, th = pose
+        gx, gy = grid.occupied_points()
+        c, s = math.cos(th), math.sin(th)
+        wx = px + c * gx - s * gy
+        wy = py + s * gx + c * gy
+        ix = np.floor((wx - self._origin[0]) / self.res).astype(np.int64)
+        iy = np.floor((wy - self._origin[1]) / self.res).astype(np.int64)
+        ok = (ix >= 0) & (ix < self.n) & (iy >= 0) & (iy < self.n)
+
+        # cells the grid can see are replaced, the rest keep their last value
+        n = self.n
+        cy = (py - self._origin[1]) / self.res
+        cx = (px - self._origin[0]) / self.res
+        ry = np.arange(n) + 0.5 - cy
+        rx = np.arange(n) + 0.5 - cx
+        in_view = (ry[:, None] ** 2 + rx[None, :] ** 2) <= (grid.radius_m / self.res) ** 2
+        occ = self._occ & ~in_view
+        occ[iy[ok], ix[ok]] = True
+        self._occ = occ
+
+        blocked = np.ones((self.w, self.w), dtype=bool)
+        inner = np.zeros((n, n), dtype=bool)
+        for dy, dx in self._disk:
+            inner[max(0, dy):n + min(0, dy), max(0, dx):n + min(0, dx)] |= \
+                occ[max(0, -dy):n + min(0, -dy), max(0, -dx):n + min(0, -dx)]
+        blocked[1:-1, 1:-1] = inner
+        return blocked
+
+    # ---------- per revolution ----------
+    def update(self, grid, pose: Tuple[float, float, float], ts: Optional[float] = None):
+        t0 = time.perf_counter()
+        pose = tuple(pose)
+        with self._lock:
+            self.pose = pose
+            goal, gen, status = self.goal, self._goal_gen, self.status
+        if goal is None:
+            self.last_mode = "idle"
+            return
+        if gen != self._plan_gen:
+            # new goal since the last revolution: re-anchor, fresh search
+            self._plan_gen = gen
+            self._origin = None
+            self._goal_xy = None
+            self._planner = None
+
+        px, py, _ = pose
+        snapped = self._sub_goal is None and self._goal_xy is not None
+        if math.hypot(goal[0] - px, goal[1] - py) <= self.goal_tol_m or (
+            snapped and math.hypot(self._goal_xy[0] - px, self._goal_xy[1] - py) <= self.goal_tol_m
+        ):
+            self._planner = None
+            self.last_mode = "idle"
+            self._publish(gen, "reached", [], reached=True)
+            return
+
+        if self._origin is None:
+            self._anchor(pose, goal)
+        start = self._cell(px, py)
+        sub = self._sub_goal
+        near_sub = sub is not None and math.hypot(sub[0] - px, sub[1] - py) <= self.edge_m
+        ix, iy = (start % self.w) - 1, (start // self.w) - 1
+        margin = int(self.edge_m / (2.0 * self.res))
+        at_edge = start < 0 or min(ix, iy, self.n - 1 - ix, self.n - 1 - iy) < margin
+        if near_sub or at_edge:
+            self._anchor(pose, goal)
+            start = self._cell(px, py)
+
+        blocked_np = self._rasterize(grid, pose)
+        changed = np.flatnonzero((blocked_np != self._blocked_np).ravel())
+        self._blocked_np = blocked_np
+        blocked = blocked_np.ravel().tolist()
+        self._blocked = blocked
+        self.last_changed = int(changed.size)
+
+        goal_cell = self._free_cell(*(self._sub_goal or goal))
+        if goal_cell < 0:
+            self._planner = None
+            self._record(t0, "blocked")
+            self._publish(gen, "goal_blocked", [])
+            return
+        self._goal_xy = self._xy(goal_cell)
+        approach = self._goal_xy if self._sub_goal is None else goal
+
+        # no path: a repair would chase the change through the whole
+        # unreachable pocket -> fresh search, at most every retry_s
+        now = time.monotonic() if ts is None else ts
+        if status == "no_path" and now < self._retry_at:
+            self._record(t0, "wait")
+            return
+
+        if not self.incremental:
+            cells = astar(blocked, self.w, start, goal_cell, self.max_expansions)
+            mode = "astar"
+        else:
+            pl = self._planner
+            if pl is None or pl.goal != goal_cell or changed.size > self.max_changed_frac * self.n * self.n:
+                pl = self._planner = DStarLite(blocked, self.w, start, goal_cell)
+                mode = "full"
+                self.full_replans += 1
+            else:
+                pl.move_start(start)
+                pl.update_cells(blocked, changed.tolist())
+                mode = "incremental"
+            cells = pl.path() if pl.compute(self.max_expansions) else None
+
+        if cells is None:
+            self._planner = None
+            self._retry_at = now + self.retry_s
+            self._publish(gen, "no_path", [], approach)
+        else:
+            self._publish(gen, "active", [self._xy(c) for c in cells], approach)
+        self._record(t0, mode)
+
+    def _publish(self, gen: int, status: str, path: List[Tuple[float, float]],
+                 approach: Optional[Tuple[float, float]] = None, reached: bool = False):
+        """Swap in a planning result unless set_goal / cancel came in meanwhile."""
+        with self._lock:
+            if self._goal_gen != gen:
+                return
+            self.status = status
+            self.path = path
+            if approach is not None:
+                self._approach_xy = approach
+            if reached:
+                self.goal = None
+                self._approach_xy = None
+
+    def _record(self, t0: float, mode: str):
+        dt = time.perf_counter() - t0
+        self.replan_hist.record(dt)
+        self.replans += 1
+        self.last_replan_ms = dt * 1e3
+        self.last_mode = mode
+
+    # ---------- outputs ----------
+    def _to_robot(self, x: float, y: float) -> Tuple[float, float]:
+        px, py, th = self.pose
+        c, s = math.cos(th), math.sin(th)
+        dx, dy = x - px, y - py
+        return c * dx + s * dy, -s * dx + c * dy
+
+    def target_rad(self) -> Optional[float]:
+        """Heading to the path point lookahead_m ahead (None = no active path)."""
+        with self._lock:
+            if self.status != "active" or not self.path:
+                return None
+            px, py, _ = self.pose
+            tx, ty = self.path[-1]
+            for x, y in self.path:
+                if math.hypot(x - px, y - py) >= self.lookahead_m:
+                    tx, ty = x, y
+                    break
+            rx, ry = self._to_robot(tx, ty)
+            return math.atan2(ry, rx)
+
+    def speed_scale(self) -> float:
+        """Throttle cap (0..1): slow down within slow_m of the goal and for sharp turns."""
+        with self._lock:
+            if self.status != "active" or self._approach_xy is None:
+                return 1.0
+            px, py, _ = self.pose
+            gx, gy = self._approach_xy
+            scale = min(1.0, math.hypot(gx - px, gy - py) / self.slow_m)
+        heading = self.target_rad()
+        if heading is not None:
+            scale *= max(0.0, math.cos(heading))
+        return max(self.min_speed_scale, scale)
+
+    def export(self, max_points: int = 100) -> Dict:
+        """Goal + path in the robot frame (meters, like grid.export() cells), replan stats."""
+        with self._lock:
+            goal = None if self.goal is None else [round(v, 2) for v in self._to_robot(*self.goal)]
+            step = max(1, len(self.path) // max_points)
+            pts = self.path[::step]
+            if self.path and pts[-1] != self.path[-1]:
+                pts.append(self.path[-1])
+            path = [[round(v, 2) for v in self._to_robot(x, y)] for x, y in pts]
+            return {
+                "status": self.status,
+                "goal": goal,
+                "path": path,
+                "mode": self.last_mode,
+                "changed": self.last_changed,
+                "last_ms": round(self.last_replan_ms, 2),
+                "replan_ms": self.replan_hist.summary(1e3),
+            }
@@ -144,6 +144,9 @@ class PS4Controller:
         self.estop = False
         self._fire_pending = False
 
+        # False while run_asyncio() owns the device (update() then only recomputes)
+        self.poll = True
+
     def connect(self):
         dev = find_ds4_device()
         if not dev:
@@ -173,38 +176,65 @@ class PS4Controller:
         print(f"Trigger idle: L2={self.idle_L2}  R2={self.idle_R2}")
         print("RUNNING. Square = FIRE.\n")
 
+    def handle_event(self, e) -> bool:
+        """Apply one evdev event to the raw state; True if it was an input we use."""
+        if e.type == ecodes.EV_ABS:
+            if e.code == ABS_LX:
+                self.lx_raw = e.value
+            elif e.code == ABS_RX:
+                self.rx_raw = e.value
+            elif e.code == ABS_RY:
+                self.ry_raw = e.value
+            elif e.code == ABS_L2:
+                self.raw_l2 = e.value
+            elif e.code == ABS_R2:
+                self.raw_r2 = e.value
+            else:
+                return False
+            self.last_input = time.time()
+            return True
+
+        if e.type == ecodes.EV_KEY:
+            if e.code == BTN_FIRE and e.value == 1:
+                self._fire_pending = True
+            elif e.code == BTN_ESTOP and e.value == 1:
+                # toggle estop
+                self.estop = not self.estop
+            else:
+                return False
+            self.last_input = time.time()
+            return True
+        return False
+
+    async def run_asyncio(self, on_input=None):
+        """
+        Read the device on the running loop (evdev async_read_loop) until cancelled.
+        on_input() once per input report (EV_SYN) that changed a used input.
+        """
+        if not self.dev:
+            return
+        self.poll = False
+        changed = False
+        try:
+            async for e in self.dev.async_read_loop():
+                if e.type == ecodes.EV_SYN:
+                    if changed and on_input is not None:
+                        on_input()
+                    changed = False
+                elif self.handle_event(e):
+                    changed = True
+        finally:
+            self.poll = True
+
     def update(self):
         if not self.dev:
             return
 
-        r, _, _ = select.select([self.dev.fd], [], [], 0.0)
-        if r:
-            for e in self.dev.read():
-                if e.type == ecodes.EV_ABS:
-                    if e.code == ABS_LX:
-                        self.lx_raw = e.value
-                        self.last_input = time.time()
-                    elif e.code == ABS_RX:
-                        self.rx_raw = e.value
-                        self.last_input = time.time()
-                    elif e.code == ABS_RY:
-                        self.ry_raw = e.value
-                        self.last_input = time.time()
-                    elif e.code == ABS_L2:
-                        self.raw_l2 = e.value
-                        self.last_input = time.time()
-                    elif e.code == ABS_R2:
-                        self.raw_r2 = e.value
-                        self.last_input = time.time()
-
-                elif e.type == ecodes.EV_KEY:
-                    if e.code == BTN_FIRE and e.value == 1:
-                        self._fire_pending = True
-                        self.last_input = time.time()
-                    elif e.code == BTN_ESTOP and e.value == 1:
-                        # toggle estop
-                        self.estop = not self.estop
-                        self.last_input = time.time()
+        if self.poll:
+            r, _, _ = select.select([self.dev.fd], [], [], 0.0)
+            if r:
+                for e in self.dev.read():
+                    self.handle_event(e)
 
         # failsafe: tidak ada input -> stop + turret center
         if time.time() - self.last_input > self.cfg.failsafe_sec:
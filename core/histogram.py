@@ -0,0 +1,123 @@
+# core/histogram.py
+import bisect
+import math
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class Histogram:
+    """
+    Fixed log-spaced bucket histogram for latency/jitter numbers.
+    record() only updates counters (no per-sample allocation), so it is safe
+    to call from the control loop at full rate.
+
+    Units are whatever you feed in (seconds by default range 1us..10s).
+    Percentiles are reported as the upper edge of the matching bucket,
+    clamped to the observed max.
+    """
+
+    def __init__(self, lo: float = 1e-6, hi: float = 10.0, buckets_per_decade: int = 20):
+        if lo <= 0 or hi <= lo:
+            raise ValueError("need 0 < lo < hi")
+        n = int(math.ceil(math.log10(hi / lo) * buckets_per_decade))
+        step = 10.0 ** (1.0 / buckets_per_decade)
+        self._edges: List[float] = [lo * (step ** i) for i in range(n + 1)]
+        # bucket 0: < lo, bucket i: edges[i-1] <= v < edges[i], last: >= hi
+        self._counts: List[int] = [0] * (len(self._edges) + 1)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.min = 0.0
+
+    def record(self, v: float):
+        self._counts[bisect.bisect_right(self._edges, v)] += 1
+        if self.n == 0:
+            self.min = self.max = v
+        elif v > self.max:
+            self.max = v
+        elif v < self.min:
+            self.min = v
+        self.n += 1
+        self.total += v
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    def percentile(self, p: float) -> Optional[float]:
+        if self.n == 0:
+            return None
+        target = max(1, int(math.ceil(self.n * p / 100.0)))
+        acc = 0
+        for i, c in enumerate(self._counts):
+            acc += c
+            if acc >= target:
+                if i == 0:
+                    return min(self._edges[0], self.max)
+                if i >= len(self._edges):
+                    return self.max
+                return min(self._edges[i], self.max)
+        return self.max
+
+    def summary(self, scale: float = 1.0, ndigits: int = 3) -> Dict[str, Optional[float]]:
+        """p50/p95/p99/max/mean, multiplied by `scale` (e.g. 1e3 for s -> ms)."""
+        def _s(x):
+            return None if x is None else round(x * scale, ndigits)
+
+        return {
+            "n": self.n,
+            "p50": _s(self.percentile(50)),
+            "p95": _s(self.percentile(95)),
+            "p99": _s(self.percentile(99)),
+            "max": _s(self.max) if self.n else None,
+            "mean": _s(self.mean) if self.n else None,
+        }
+
+
+class StageTimer:
+    """
+    Per-stage wall time (perf_counter_ns) for the hot loop, one Histogram per stage.
+        t = timer.start()
+        ...; t = timer.lap("send", t)     # records since t, returns the new mark
+    Stages are created up front (`stages`) so lap() is a dict lookup + record();
+    an unknown name is added on first use. Each stage should be written by one
+    thread; summary(reset=True) from another thread may lose a sample that is
+    recorded while the window resets.
+    """
+
+    def __init__(self, stages: Iterable[str] = ()):
+        self.hists: Dict[str, Histogram] = {}
+        self.window_t0 = time.monotonic()
+        for name in stages:
+            self.hists[name] = Histogram()
+
+    @staticmethod
+    def start() -> int:
+        return time.perf_counter_ns()
+
+    def lap(self, name: str, t0_ns: int) -> int:
+        t1 = time.perf_counter_ns()
+        h = self.hists.get(name)
+        if h is None:
+            h = self.hists[name] = Histogram()
+        h.record((t1 - t0_ns) * 1e-9)
+        return t1
+
+    def summary(self, reset: bool = False) -> Dict[str, Any]:
+        """{"window_s", "stages": {name: {n, p50, p99, max} in ms}}; reset=True starts a new window."""
+        now = time.monotonic()
+        stages = {}
+        for name, h in self.hists.items():
+            s = h.summary(1e3)
+            stages[name] = {"n": s["n"], "p50": s["p50"], "p99": s["p99"], "max": s["max"]}
+            if reset:
+                h.reset()
+        out = {"window_s": round(now - self.window_t0, 2), "stages": stages}
+        if reset:
+            self.window_t0 = now
+        return out
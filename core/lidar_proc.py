@@ -0,0 +1,345 @@
+# core/lidar_proc.py
+# Out-of-process lidar: a child process owns the serial port and the rplidarc1
+# decoder, and publishes each completed revolution into shared memory.
+# The control process only reads ~3 KB per revolution, so the packet parsing
+# never competes with main.py for the GIL.
+#
+# Shared memory layout (ShmScan):
+#   int64   lock    seqlock counter (odd while the child is writing)
+#   int64   seq     revolution counter (keeps counting across child restarts)
+#   int64   points  points in the last revolution
+#   float64 ts      time.monotonic() of the revolution (system-wide clock)
+#   float32 dist_mm[n_bins]  (NaN = no return)
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional, TypeVar
+
+import numpy as np
+
+from core.lidar_scan import ScanHub, ScanSnapshot, ScanSource, make_filter
+
+T = TypeVar("T")
+
+_HDR_BYTES = 64
+_LOCK, _SEQ, _POINTS, _TS = 0, 1, 2, 3
+
+
+class ShmScan:
+    """Seqlock-protected revolution buffer in a SharedMemory block."""
+
+    def __init__(self, shm: SharedMemory, n_bins: int):
+        self.shm = shm
+        self.n_bins = n_bins
+        self._hdr = np.ndarray((4,), dtype=np.int64, buffer=shm.buf)
+        self._hdr_f = self._hdr.view(np.float64)
+        self._dist = np.ndarray((n_bins,), dtype=np.float32, buffer=shm.buf, offset=_HDR_BYTES)
+        self.bin_deg = 360.0 / n_bins
+        self.angles_deg = ((np.arange(n_bins) + 0.5) * self.bin_deg).astype(np.float64)
+
+    @classmethod
+    def create(cls, n_bins: int) -> "ShmScan":
+        shm = SharedMemory(create=True, size=_HDR_BYTES + 4 * n_bins)
+        scan = cls(shm, n_bins)
+        scan._hdr[:] = 0
+        scan._dist[:] = np.nan
+        return scan
+
+    @classmethod
+    def attach(cls, name: str, n_bins: int) -> "ShmScan":
+        # spawn children share the parent's resource tracker, so the block is
+        # still unlinked exactly once (by the parent's close(unlink=True))
+        return cls(SharedMemory(name=name), n_bins)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def seq(self) -> int:
+        return int(self._hdr[_SEQ])
+
+    @property
+    def ts(self) -> float:
+        return float(self._hdr_f[_TS])
+
+    @property
+    def points_per_rev(self) -> int:
+        return int(self._hdr[_POINTS])
+
+    def write(self, ts: float, points: int, dist_mm: np.ndarray) -> int:
+        """Single writer (child). Returns the new revolution seq."""
+        hdr = self._hdr
+        hdr[_LOCK] += 1  # odd: write in progress
+        self._dist[:] = dist_mm
+        hdr[_POINTS] = points
+        self._hdr_f[_TS] = ts
+        hdr[_SEQ] += 1
+        hdr[_LOCK] += 1
+        return int(hdr[_SEQ])
+
+    def read(self, fn: Callable[[int, float, np.ndarray], T], retries: int = 100) -> Optional[T]:
+        """
+        fn(seq, ts, dist_mm) on a zero-copy view of shared memory; retried if
+        the child wrote meanwhile. Copy inside fn if you keep the array.
+        Returns None if no consistent read succeeded within `retries`.
+        """
+        hdr = self._hdr
+        for _ in range(retries):
+            s1 = int(hdr[_LOCK])
+            if s1 & 1:
+                time.sleep(0)
+                continue
+            out = fn(int(hdr[_SEQ]), float(self._hdr_f[_TS]), self._dist)
+            if int(hdr[_LOCK]) == s1:
+                return out
+        return None
+
+    def close(self, unlink: bool = False):
+        # drop numpy views first, otherwise SharedMemory.close() raises BufferError
+        self._hdr = self._hdr_f = self._dist = None
+        try:
+            self.shm.close()
+        except Exception:
+            pass
+        if unlink:
+            try:
+                self.shm.unlink()
+            except Exception:
+                pass
+
+
+def _child_main(
+    conn,
+    shm_name: str,
+    port: str,
+    baud: int,
+    mirror_angle: bool,
+    n_bins: int,
+    max_age_s: float,
+    record_path: Optional[str] = None,
+):
+    """Child process: LidarC1 (thread mode) -> ShmScan, revolution seq -> conn (str = start error)."""
+    scan = ShmScan.attach(shm_name, n_bins)
+    try:
+        from core.lidar_sensor import LidarC1
+
+        lidar = LidarC1(port, baud, mirror_angle=mirror_angle, n_bins=n_bins, max_age_s=max_age_s, record_path=record_path)
+    except Exception as e:
+        # report to the parent instead of a traceback on the (curses) terminal
+        try:
+            conn.send(repr(e))
+        except (OSError, ValueError):
+            pass
+        scan.close()
+        return
+    bins = lidar.bins
+
+    def publish(seq, ts, dist):
+        lidar.record(seq, ts, dist)  # recording stays in the child too
+        rev = scan.write(ts, bins.points_per_rev, dist)
+        try:
+            conn.send(rev)
+        except (OSError, ValueError):
+            pass
+
+    # bypass the in-process ScanHub: the parent computes stats and notifies
+    bins.on_publish = publish
+
+    ppid = os.getppid()
+    try:
+        while os.getppid() == ppid:
+            if conn.poll(0.5):
+                conn.recv()  # anything from the parent means stop
+                break
+    except (EOFError, OSError):
+        pass
+    finally:
+        lidar.close()
+        scan.close()
+
+
+class LidarProcess(ScanSource):
+    """
+    Same public API as LidarC1 (read_sectors, read_sector_stats, read_scan,
+    last_age_s, scan_seq, subscribe/wait_scan, close), but the scanner runs in
+    a child process.
+    - revolutions are read from shared memory (read(fn) is zero-copy)
+    - a supervisor thread restarts the child if it dies or stops producing
+      revolutions for `stall_s` seconds (backoff grows to `max_backoff_s`)
+    - raises OSError if `port` does not exist (like LidarC1); after
+      `max_failed_starts` children in a row without a revolution the
+      supervisor gives up (failed=True, last_error)
+    """
+
+    def __init__(
+        self,
+        port="/dev/ttyUSB0",
+        baud=460800,
+        mirror_angle=False,
+        n_bins=720,
+        max_age_s=0.5,
+        record_path: Optional[str] = None,
+        filter_depth: int = 1,
+        filter_mode: str = "median",
+        stall_s: float = 5.0,
+        max_backoff_s: float = 5.0,
+        max_failed_starts: int = 5,
+    ):
+        if not os.path.exists(port):
+            raise OSError(f"lidar port {port} not found")
+        self._args = (port, baud, mirror_angle, n_bins, max_age_s, record_path)
+        self.stall_s = stall_s
+        self.max_backoff_s = max_backoff_s
+        self.max_failed_starts = max_failed_starts
+
+        self._ctx = mp.get_context("spawn")  # no fork of main's threads
+        self.scan = ShmScan.create(n_bins)
+        self.angles_deg = self.scan.angles_deg
+        self.hub = ScanHub(make_filter(n_bins, filter_depth, filter_mode))  # filtered here, child stays raw
+
+        self._proc = None
+        self._conn = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.restarts = 0
+        self.torn_reads = 0  # revolutions skipped: no consistent shared-memory read
+        self.failed_starts = 0  # children in a row that never produced a revolution
+        self.failed = False
+        self.last_error: Optional[str] = None
+        self.last_exitcode: Optional[int] = None
+        self._started_at = 0.0
+        self._last_rev_at = 0.0
+
+        self.start()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+
+    def _spawn(self):
+        parent, child = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_child_main,
+            args=(child, self.scan.name) + self._args,
+            name="lidar",
+            daemon=True,
+        )
+        proc.start()
+        child.close()
+        self._proc, self._conn = proc, parent
+        self._started_at = time.monotonic()
+
+    def _kill_child(self, timeout: float = 2.0):
+        proc, conn = self._proc, self._conn
+        self._proc = self._conn = None
+        if conn is not None:
+            try:
+                conn.send(None)
+            except Exception:
+                pass
+        if proc is not None:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout=1.0)
+            self.last_exitcode = proc.exitcode
+        if conn is not None:
+            conn.close()
+
+    def _supervise(self):
+        backoff = 0.5
+        got_rev = False
+        while not self._stop.is_set():
+            if self._proc is None:
+                try:
+                    self._spawn()
+                except Exception as e:
+                    self.last_error = repr(e)
+                    self.failed = True
+                    break
+                got_rev = False
+
+            alive = True
+            try:
+                if self._conn.poll(0.5):
+                    msg = self._conn.recv()
+                    if isinstance(msg, str):
+                        self.last_error = msg  # child could not open the scanner
+                        alive = False
+                    else:
+                        self._on_revolution()
+                        got_rev = True
+                        self.failed_starts = 0
+                        backoff = 0.5
+            except (EOFError, OSError):
+                alive = False
+
+            if self._stop.is_set():
+                break
+            now = time.monotonic()
+            last = max(self._started_at, self._last_rev_at)
+            if alive and self._proc.is_alive() and (now - last) < self.stall_s:
+                continue
+
+            # child died or hung -> restart with backoff
+            self._kill_child(timeout=0.5)
+            if not got_rev:
+                self.failed_starts += 1
+                if self.failed_starts >= self.max_failed_starts:
+                    self.failed = True  # scanner gone / unusable -> stop respawning
+                    break
+            self.restarts += 1
+            self._stop.wait(backoff)
+            backoff = min(self.max_backoff_s, backoff * 2.0)
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self._kill_child()
+        self.scan.close(unlink=True)
+
+    # ---------- revolutions ----------
+    def _on_revolution(self):
+        self._last_rev_at = time.monotonic()
+        snap = self.scan.read(lambda seq, ts, dist: ScanSnapshot(seq, ts, dist.copy(), self.angles_deg))
+        if snap is None:
+            self.torn_reads += 1  # child kept writing; the next revolution is announced anyway
+            return
+        self.hub.publish(snap)
+
+    def read(self, fn: Callable[[int, float, np.ndarray], T]) -> Optional[T]:
+        """fn(seq, ts, dist_mm) on the shared-memory revolution (zero-copy), None if torn."""
+        return self.scan.read(fn)
+
+    @property
+    def last_age_s(self) -> float:
+        """Seconds since the last completed revolution."""
+        ts = self.scan.ts
+        if ts <= 0:
+            return 999.0
+        return time.monotonic() - ts
+
+    @property
+    def scan_seq(self) -> int:
+        return self.scan.seq
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def read_scan(self) -> ScanSnapshot:
+        snap = self.hub.latest
+        if snap is not None:
+            return snap
+        snap = self.scan.read(lambda seq, ts, dist: ScanSnapshot(seq, ts, dist.copy(), self.angles_deg))
+        if snap is None:
+            snap = ScanSnapshot(0, 0.0, np.full(self.scan.n_bins, np.nan, dtype=np.float32), self.angles_deg)
+        return snap
@@ -0,0 +1,257 @@
+# core/lidar_record.py
+# Compact lidar revolution recorder + deterministic replay.
+#
+# File = 32-byte header + fixed-size records (append-only, so the record
+# index is implicit: offset = HDR + i * record_size; a torn last record from
+# a crash is simply ignored):
+#   header : magic "UGLSCAN1", u16 version, u16 n_bins, u32 reserved, f64 wall_t0, 8 pad
+#   record : f64 ts (monotonic), u32 seq, u16 points, u16 pad, u16 dist_mm[n_bins] (0 = no return)
+# 720 bins -> 1456 B/revolution (~14.5 KB/s at 10 Hz).
+import os
+import struct
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from core.lidar_scan import ScanHub, ScanSnapshot, ScanSource, make_filter
+
+MAGIC = b"UGLSCAN1"
+VERSION = 1
+_HDR = struct.Struct("<8sHHId8x")
+HDR_BYTES = _HDR.size  # 32
+
+
+def record_dtype(n_bins: int) -> np.dtype:
+    return np.dtype([
+        ("ts", "<f8"),
+        ("seq", "<u4"),
+        ("points", "<u2"),
+        ("_pad", "<u2"),
+        ("dist", "<u2", (n_bins,)),
+    ])
+
+
+def _read_header(path: str) -> Tuple[int, float]:
+    with open(path, "rb") as f:
+        raw = f.read(HDR_BYTES)
+    if len(raw) < HDR_BYTES:
+        raise ValueError(f"{path}: truncated header")
+    magic, version, n_bins, _, wall_t0 = _HDR.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a lidar scan recording")
+    return n_bins, wall_t0
+
+
+class ScanRecorder:
+    """
+    Appends one record per revolution. write() is a float32 -> uint16
+    conversion plus a buffered file write (a few µs for 720 bins).
+    """
+
+    def __init__(self, path: str, n_bins: int = 720, flush_every: int = 10):
+        self.path = path
+        self.n_bins = n_bins
+        self.flush_every = flush_every
+        self._rec = np.zeros(1, dtype=record_dtype(n_bins))
+        self._lock = threading.Lock()
+        self.records = 0
+
+        if os.path.exists(path) and os.path.getsize(path) >= HDR_BYTES:
+            n_file, _ = _read_header(path)
+            if n_file != n_bins:
+                raise ValueError(f"{path}: recorded with n_bins={n_file}, not {n_bins}")
+            self._f = open(path, "ab")
+        else:
+            self._f = open(path, "wb")
+            self._f.write(_HDR.pack(MAGIC, VERSION, n_bins, 0, time.time()))
+
+    def write(self, seq: int, ts: float, points: int, dist_mm: np.ndarray):
+        rec = self._rec[0]
+        rec["ts"] = ts
+        rec["seq"] = seq & 0xFFFFFFFF
+        rec["points"] = min(int(points), 0xFFFF)
+        d = np.nan_to_num(dist_mm, nan=0.0, posinf=0.0, neginf=0.0)
+        rec["dist"] = np.clip(d, 0, 0xFFFF)
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(self._rec.tobytes())
+            self.records += 1
+            if self.records % self.flush_every == 0:
+                self._f.flush()
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+class ScanReader:
+    """Memory-mapped view of a recording: len(), ts column, seek by time."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.n_bins, self.wall_t0 = _read_header(path)
+        dt = record_dtype(self.n_bins)
+        n = (os.path.getsize(path) - HDR_BYTES) // dt.itemsize
+        if n > 0:
+            self.records = np.memmap(path, dtype=dt, mode="r", offset=HDR_BYTES, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=dt)
+        self.bin_deg = 360.0 / self.n_bins
+        self.angles_deg = ((np.arange(self.n_bins) + 0.5) * self.bin_deg).astype(np.float64)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def ts(self) -> np.ndarray:
+        return self.records["ts"]
+
+    @property
+    def duration_s(self) -> float:
+        return float(self.ts[-1] - self.ts[0]) if len(self) > 1 else 0.0
+
+    def index_at(self, t_s: float) -> int:
+        """First record at or after t_s seconds from the start of the recording."""
+        if not len(self):
+            return 0
+        return int(np.searchsorted(self.ts, self.ts[0] + t_s))
+
+    def snapshot(self, i: int, ts: Optional[float] = None) -> ScanSnapshot:
+        rec = self.records[i]
+        dist = rec["dist"].astype(np.float32)
+        dist[dist == 0] = np.nan
+        return ScanSnapshot(
+            int(rec["seq"]),
+            float(rec["ts"]) if ts is None else ts,
+            dist,
+            self.angles_deg,
+        )
+
+
+class ReplayLidar(ScanSource):
+    """
+    Plays a recording through the LidarC1 interface (read_sectors,
+    read_sector_stats, read_scan, last_age_s, subscribe/wait_scan, close).
+    - speed=1.0 real time, N = N× faster, 0 = as fast as possible
+    - threaded playback stamps revolutions with time.monotonic() so
+      last_age_s / compute_drive timeouts behave like live data
+    - start=False + step(): deterministic, caller-driven playback that keeps
+      the recorded timestamps (feed snap.ts as `now` to the controller)
+    - snapshot seq counts published revolutions (monotonic across loops)
+    - filter_depth / filter_mode: same TemporalFilter as LidarC1 (recordings are raw);
+      reset when a loop wraps and on seek(), so every pass filters the same
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: float = 1.0,
+        loop: bool = False,
+        start: bool = True,
+        start_s: float = 0.0,
+        filter_depth: int = 1,
+        filter_mode: str = "median",
+    ):
+        self.reader = ScanReader(path)
+        self.angles_deg = self.reader.angles_deg
+        self.speed = speed
+        self.loop = loop
+        self.hub = ScanHub(make_filter(self.reader.n_bins, filter_depth, filter_mode))
+
+        self._i = self.reader.index_at(start_s)
+        self._ts = 0.0
+        self._seq = 0
+        self._reset_filter = False  # set on wrap / seek, applied by the publishing thread
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.finished = threading.Event()
+
+        if start:
+            self.start()
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._play, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    def seek(self, t_s: float):
+        self._i = self.reader.index_at(t_s)
+        self._reset_filter = True
+
+    def step(self) -> Optional[ScanSnapshot]:
+        """Publish the next revolution with its recorded ts; None at the end."""
+        if self._i >= len(self.reader):
+            if not self.loop or not len(self.reader):
+                self.finished.set()
+                return None
+            self._i = 0
+            self._reset_filter = True
+        snap = self.reader.snapshot(self._i)
+        self._i += 1
+        self._publish(snap)
+        return snap
+
+    def _publish(self, snap: ScanSnapshot):
+        self._seq += 1
+        snap.seq = self._seq
+        self._ts = snap.ts
+        if self._reset_filter:
+            self._reset_filter = False
+            if self.hub.filt is not None:
+                self.hub.filt.reset()
+        self.hub.publish(snap)
+
+    def _play(self):
+        n = len(self.reader)
+        rec_ts = self.reader.ts
+        t_wall0 = time.monotonic()
+        t_rec0 = None
+        while not self._stop.is_set():
+            if self._i >= n:
+                if not self.loop or not n:
+                    self.finished.set()
+                    return
+                self._i = 0
+                self._reset_filter = True
+                t_rec0 = None
+            i = self._i
+            if t_rec0 is None:
+                t_rec0 = float(rec_ts[i])
+                t_wall0 = time.monotonic()
+            if self.speed > 0:
+                due = t_wall0 + (float(rec_ts[i]) - t_rec0) / self.speed
+                wait_s = due - time.monotonic()
+                if wait_s > 0 and self._stop.wait(wait_s):
+                    return
+            self._i = i + 1
+            self._publish(self.reader.snapshot(i, ts=time.monotonic()))
+
+    # ---------- LidarC1 interface ----------
+    @property
+    def last_age_s(self) -> float:
+        if self._ts <= 0:
+            return 999.0
+        return time.monotonic() - self._ts
+
+    @property
+    def scan_seq(self) -> int:
+        return self._seq
+
+    def read_scan(self) -> ScanSnapshot:
+        snap = self.hub.latest
+        if snap is None:
+            empty = np.full(len(self.angles_deg), np.nan, dtype=np.float32)
+            return ScanSnapshot(0, 0.0, empty, self.angles_deg)
+        return snap
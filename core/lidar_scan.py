@@ -0,0 +1,510 @@
+# core/lidar_scan.py
+# Scan processing shared by LidarC1 and anything else that produces scans
+# (no driver imports here, so tools can use it without the lidar attached).
+import abc
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# sector name, center (deg), half width (deg). Earlier sectors win on overlap.
+SECTORS = (
+    ("front", 0.0, 30.0),
+    ("left", 60.0, 30.0),
+    ("right", 300.0, 30.0),
+)
+
+MIN_RANGE_M = 0.10
+MAX_RANGE_M = 12.0
+
+_EMPTY_STATS = {"min": None, "mean": None, "median": None, "p20": None, "count": 0}
+
+# columns of SectorLayout.reduce() (meters, count as float; NaN when empty)
+STAT_FIELDS = ("min", "mean", "median", "p20", "count")
+S_MIN, S_MEAN, S_MEDIAN, S_P20, S_COUNT = range(len(STAT_FIELDS))
+
+
+def _angle_diff(a, b):
+    """Signed angle difference in degrees, [-180, 180). Works on floats and arrays."""
+    return (a - b + 180.0) % 360.0 - 180.0
+
+
+def _pct_sorted(d: np.ndarray, q: float) -> float:
+    """Percentile (linear interpolation, same as np.percentile) of a sorted array."""
+    pos = (d.size - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, d.size - 1)
+    return float(d[lo] + (d[hi] - d[lo]) * (pos - lo))
+
+
+def sector_stats(angles_deg: np.ndarray, dist_mm: np.ndarray, mirror: bool = False, sectors=SECTORS) -> Dict[str, Dict]:
+    """
+    Vectorized sector reduction of one scan.
+    angles_deg / dist_mm: 1-D arrays (NaN / <=0 distances are ignored).
+    Returns {sector: {"min","mean","median","p20","count"}} in meters.
+    """
+    ang = np.asarray(angles_deg, dtype=np.float64)
+    dist = np.asarray(dist_mm, dtype=np.float64) / 1000.0
+    if mirror:
+        ang = (360.0 - ang) % 360.0
+
+    valid = np.isfinite(ang) & (dist >= MIN_RANGE_M) & (dist <= MAX_RANGE_M)
+    taken = ~valid
+
+    out: Dict[str, Dict] = {}
+    for name, center, half in sectors:
+        m = (np.abs(_angle_diff(ang, center)) <= half) & ~taken
+        taken |= m
+        d = np.sort(dist[m])
+        if d.size == 0:
+            out[name] = dict(_EMPTY_STATS)
+            continue
+        out[name] = {
+            "min": float(d[0]),
+            "mean": float(d.mean()),
+            "median": _pct_sorted(d, 50.0),
+            "p20": _pct_sorted(d, 20.0),
+            "count": int(d.size),
+        }
+    return out
+
+
+class SectorLayout:
+    """
+    Precomputed scan-bin -> sector lookup.
+    Built once from named sectors (name, center_deg, half_width_deg) or as a
+    uniform N-sector polar histogram; every revolution is then reduced by bin
+    index (no per-point trigonometry):
+        arr = layout.reduce(dist_mm)   # float64[n_sectors, len(STAT_FIELDS)]
+    """
+
+    def __init__(self, names: Sequence[str], sector_of_bin: np.ndarray, centers_deg: Sequence[float]):
+        self.names: Tuple[str, ...] = tuple(names)
+        self.n = len(self.names)
+        self.sector_of_bin = np.asarray(sector_of_bin, dtype=np.int32)
+        self.centers_deg = np.asarray(centers_deg, dtype=np.float64)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def named(cls, sectors=SECTORS, n_bins: int = 720) -> "SectorLayout":
+        """Earlier sectors win on overlap (same rule as sector_stats)."""
+        angles = (np.arange(n_bins) + 0.5) * (360.0 / n_bins)
+        sob = np.full(n_bins, -1, dtype=np.int32)
+        for i, (_, center, half) in enumerate(sectors):
+            m = (np.abs(_angle_diff(angles, center)) <= half) & (sob < 0)
+            sob[m] = i
+        return cls([s[0] for s in sectors], sob, [s[1] for s in sectors])
+
+    @classmethod
+    def uniform(cls, n_sectors: int, n_bins: int = 720) -> "SectorLayout":
+        """n_sectors equal sectors, sector 0 centered on 0 deg (front), counter-clockwise."""
+        width = 360.0 / n_sectors
+        angles = (np.arange(n_bins) + 0.5) * (360.0 / n_bins)
+        sob = (np.floor(((angles + width / 2.0) % 360.0) / width).astype(np.int32)) % n_sectors
+        return cls([f"s{i}" for i in range(n_sectors)], sob, np.arange(n_sectors) * width)
+
+    def reduce(self, dist_mm: np.ndarray) -> np.ndarray:
+        """Per-sector [min, mean, median, p20, count] in meters (NaN, count 0 when empty)."""
+        out = np.full((self.n, len(STAT_FIELDS)), np.nan)
+        out[:, S_COUNT] = 0.0
+
+        d = np.asarray(dist_mm, dtype=np.float64) / 1000.0
+        valid = (self.sector_of_bin >= 0) & (d >= MIN_RANGE_M) & (d <= MAX_RANGE_M)  # NaN compares False
+        if not valid.any():
+            return out
+        sid = self.sector_of_bin[valid]
+        d = d[valid]
+
+        order = np.lexsort((d, sid))
+        d = d[order]
+        sid = sid[order]
+        counts = np.bincount(sid, minlength=self.n)
+        starts = np.cumsum(counts) - counts
+        has = counts > 0
+        st, cn = starts[has], counts[has]
+
+        out[has, S_MIN] = d[st]
+        out[has, S_MEAN] = np.bincount(sid, weights=d, minlength=self.n)[has] / cn
+        for col, q in ((S_MEDIAN, 50.0), (S_P20, 20.0)):
+            pos = (cn - 1) * (q / 100.0)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.minimum(lo + 1, cn - 1)
+            out[has, col] = d[st + lo] + (d[st + hi] - d[st + lo]) * (pos - lo)
+        out[:, S_COUNT] = counts
+        return out
+
+    def to_dict(self, arr: np.ndarray) -> Dict[str, Dict]:
+        """reduce() output -> {name: {"min","mean","median","p20","count"}} (None when empty)."""
+        out: Dict[str, Dict] = {}
+        for i, name in enumerate(self.names):
+            row = arr[i]
+            if row[S_COUNT] <= 0:
+                out[name] = dict(_EMPTY_STATS)
+                continue
+            out[name] = {
+                "min": float(row[S_MIN]),
+                "mean": float(row[S_MEAN]),
+                "median": float(row[S_MEDIAN]),
+                "p20": float(row[S_P20]),
+                "count": int(row[S_COUNT]),
+            }
+        return out
+
+
+_LAYOUTS: Dict[Tuple, SectorLayout] = {}
+
+
+def get_layout(sectors=SECTORS, n_bins: int = 720) -> SectorLayout:
+    """Cached layout: `sectors` is a named-sector tuple or an int (uniform histogram)."""
+    key = (sectors, n_bins)
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        if isinstance(sectors, int):
+            layout = SectorLayout.uniform(sectors, n_bins)
+        else:
+            layout = SectorLayout.named(tuple(sectors), n_bins)
+        _LAYOUTS[key] = layout
+    return layout
+
+
+@dataclass
+class ScanSnapshot:
+    """One published revolution. dist_mm is NaN where a bin has no (fresh) return."""
+    seq: int
+    ts: float              # time.monotonic() when the revolution completed
+    dist_mm: np.ndarray    # float32[n_bins]
+    angles_deg: np.ndarray  # bin centers (shared, don't modify)
+    sectors: Optional[Dict[str, Dict]] = None  # filled once by ScanHub.publish
+    raw_mm: Optional[np.ndarray] = None  # unfiltered revolution when a TemporalFilter is active
+    _reduced: Dict[int, np.ndarray] = field(default_factory=dict, repr=False)
+
+    def reduce(self, layout: SectorLayout) -> np.ndarray:
+        """layout.reduce(dist_mm), cached per layout so consumers share the work."""
+        key = id(layout)
+        arr = self._reduced.get(key)
+        if arr is None:
+            arr = layout.reduce(self.dist_mm)
+            self._reduced[key] = arr
+        return arr
+
+    def sector_stats(self, sectors=SECTORS) -> Dict[str, Dict]:
+        if sectors is SECTORS and self.sectors is not None:
+            return self.sectors
+        layout = get_layout(sectors, len(self.dist_mm))
+        return layout.to_dict(self.reduce(layout))
+
+
+class ScanBins:
+    """
+    Fixed-size angle-binned scan buffer (default 720 x 0.5 deg).
+
+    Writer (lidar thread):
+      add_point(angle, dist_mm, ts) stores the newest return per bin with its
+      capture time. When the angle wraps (new revolution) the working bins are
+      copied into the back buffer with returns older than max_age_s expired,
+      then front/back are swapped and `seq` is bumped. A write counter is
+      odd from before that copy until after the swap (seqlock).
+    Readers:
+      snapshot() / read(fn) never see a half-written revolution; cost is
+      constant (n_bins) no matter how long the session runs.
+    """
+
+    def __init__(self, n_bins: int = 720, max_age_s: float = 0.5, mirror: bool = False):
+        self.n_bins = n_bins
+        self.bin_deg = 360.0 / n_bins
+        self._inv_bin = n_bins / 360.0
+        self.max_age_s = max_age_s
+        self.mirror = mirror
+
+        self.angles_deg = ((np.arange(n_bins) + 0.5) * self.bin_deg).astype(np.float64)
+
+        # working bins (writer only)
+        self._w_dist = np.full(n_bins, np.nan, dtype=np.float32)
+        self._w_ts = np.zeros(n_bins, dtype=np.float64)
+        self._last_angle = -1.0
+        self._points = 0
+
+        # published double buffer
+        self._bufs = [np.full(n_bins, np.nan, dtype=np.float32) for _ in range(2)]
+        self._front = 0
+        self._lock = threading.Lock()
+        self._writes = 0  # odd while the back buffer is being written
+        self.seq = 0
+        self.ts = 0.0
+        self.points_per_rev = 0
+
+        # called as on_publish(seq, ts, dist_mm) after each swap (writer thread)
+        self.on_publish: Optional[Callable[[int, float, np.ndarray], None]] = None
+
+    def add_point(self, angle_deg: float, dist_mm: Optional[float], ts: float):
+        raw = float(angle_deg)
+        # new revolution: raw angle jumps back
+        if raw < self._last_angle - 180.0:
+            self.publish(ts)
+        self._last_angle = raw
+
+        a = (360.0 - raw) if self.mirror else raw
+        i = int(a * self._inv_bin) % self.n_bins
+        self._w_dist[i] = np.nan if not dist_mm else dist_mm
+        self._w_ts[i] = ts
+        self._points += 1
+
+    def publish(self, ts: Optional[float] = None):
+        ts = time.monotonic() if ts is None else ts
+        back = self._bufs[1 - self._front]
+        self._writes += 1  # odd: a reader that started before may hold `back`
+        np.copyto(back, self._w_dist)
+        back[self._w_ts < ts - self.max_age_s] = np.nan
+        with self._lock:
+            self._front = 1 - self._front
+            self._writes += 1
+            self.seq += 1
+            self.ts = ts
+            self.points_per_rev = self._points
+            seq = self.seq
+        self._points = 0
+        if self.on_publish is not None:
+            self.on_publish(seq, ts, back)
+
+    def read(self, fn: Callable[[int, float, np.ndarray], T]) -> T:
+        """
+        Run fn(seq, ts, dist_mm) on the front buffer without copying.
+        Retries if the writer touched a buffer meanwhile (write counter moved).
+        """
+        while True:
+            with self._lock:
+                w, seq, ts, buf = self._writes, self.seq, self.ts, self._bufs[self._front]
+            out = fn(seq, ts, buf)
+            if self._writes == w:
+                return out
+
+    def snapshot(self) -> ScanSnapshot:
+        return self.read(lambda seq, ts, buf: ScanSnapshot(seq, ts, buf.copy(), self.angles_deg))
+
+
+def _take_sorted(s: np.ndarray, idx: np.ndarray) -> np.ndarray:
+    return np.take_along_axis(s, idx[None, :], axis=0)[0]
+
+
+class TemporalFilter:
+    """
+    Per-bin filter over the last `depth` revolutions (ring: depth x n_bins float32).
+    - mode "median": temporal median of the valid returns
+    - mode "kmin":   k-th smallest valid return, i.e. a close return has to be
+                     seen in k revolutions before it counts (k=1 -> plain min)
+    - outlier_mm: returns further than this from the bin's median are dropped
+                  first (only for bins with >= 3 returns)
+    Cost is constant per revolution (one sort of depth x n_bins).
+    """
+
+    MODES = ("median", "kmin")
+
+    def __init__(self, n_bins: int = 720, depth: int = 3, mode: str = "median", k: int = 2, outlier_mm: float = 300.0):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        self.n_bins = n_bins
+        self.depth = max(1, int(depth))
+        self.mode = mode
+        self.k = max(1, int(k))
+        self.outlier_mm = outlier_mm
+
+        self.ring = np.full((self.depth, n_bins), np.nan, dtype=np.float32)
+        self._i = 0
+        self.count = 0
+        self._cols = np.arange(n_bins)
+
+    def reset(self):
+        self.ring[:] = np.nan
+        self._i = 0
+        self.count = 0
+
+    def push(self, dist_mm: np.ndarray) -> np.ndarray:
+        """Add one revolution, return the filtered revolution (new array)."""
+        self.ring[self._i] = dist_mm
+        self._i = (self._i + 1) % self.depth
+        self.count += 1
+        return self.filtered()
+
+    def _median(self, s: np.ndarray, cnt: np.ndarray) -> np.ndarray:
+        lo = np.maximum(cnt - 1, 0) // 2
+        hi = cnt // 2
+        hi = np.where(cnt > 0, hi, 0)
+        med = 0.5 * (_take_sorted(s, lo) + _take_sorted(s, hi))
+        med[cnt == 0] = np.nan
+        return med
+
+    def filtered(self) -> np.ndarray:
+        n = min(self.count, self.depth)
+        if n == 0:
+            return np.full(self.n_bins, np.nan, dtype=np.float32)
+        s = np.sort(self.ring[:n] if n < self.depth else self.ring, axis=0)  # NaN sorts last
+        cnt = np.isfinite(s).sum(axis=0)
+
+        if self.outlier_mm and n >= 3:
+            med = self._median(s, cnt)
+            bad = (np.abs(s - med) > self.outlier_mm) & (cnt >= 3)
+            if bad.any():
+                s[bad] = np.nan
+                s.sort(axis=0)
+                cnt = np.isfinite(s).sum(axis=0)
+
+        if self.mode == "median":
+            out = self._median(s, cnt)
+        else:
+            idx = np.maximum(np.minimum(self.k, cnt) - 1, 0)
+            out = _take_sorted(s, idx)
+        return out.astype(np.float32, copy=False)
+
+
+def make_filter(n_bins: int, depth: int = 1, mode: str = "median") -> Optional[TemporalFilter]:
+    """TemporalFilter for depth > 1, None (no filtering) otherwise."""
+    if depth is None or depth <= 1:
+        return None
+    return TemporalFilter(n_bins=n_bins, depth=depth, mode=mode)
+
+
+def _put_latest(q: "asyncio.Queue", item):
+    # latest-wins: drop the unread snapshot instead of growing the queue
+    if q.full():
+        try:
+            q.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    q.put_nowait(item)
+
+
+class ScanHub:
+    """
+    Fan-out of completed revolutions (push instead of polling).
+    - publish(snap): computes sector stats once, then wakes everyone
+    - subscribe(cb): cb(snap) on the publishing thread (keep it short)
+    - wait_scan(after_seq, timeout): blocking wait for a newer revolution
+    - subscribe_asyncio(loop): asyncio.Queue(maxsize=1) fed latest-wins
+    - filt: optional TemporalFilter applied before the sector reduction
+      (snapshot.dist_mm is then filtered, snapshot.raw_mm the original)
+    """
+
+    def __init__(self, filt: Optional[TemporalFilter] = None):
+        self.filt = filt
+        self._cv = threading.Condition()
+        self._subs: Dict[int, Callable[[ScanSnapshot], None]] = {}
+        self._next_id = 1
+        self.latest: Optional[ScanSnapshot] = None
+        self.callback_errors = 0
+
+    def publish(self, snap: ScanSnapshot):
+        if self.filt is not None and snap.raw_mm is None:
+            snap.raw_mm = snap.dist_mm
+            snap.dist_mm = self.filt.push(snap.dist_mm)
+        if snap.sectors is None:
+            snap.sectors = snap.sector_stats()
+        with self._cv:
+            self.latest = snap
+            subs = list(self._subs.values())
+            self._cv.notify_all()
+        for cb in subs:
+            try:
+                cb(snap)
+            except Exception:
+                self.callback_errors += 1
+
+    def subscribe(self, cb: Callable[[ScanSnapshot], None]) -> int:
+        with self._cv:
+            token = self._next_id
+            self._next_id += 1
+            self._subs[token] = cb
+        return token
+
+    def unsubscribe(self, token: int):
+        with self._cv:
+            self._subs.pop(token, None)
+
+    def wait_scan(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[ScanSnapshot]:
+        """Newest snapshot with seq > after_seq, or None on timeout."""
+        with self._cv:
+            ok = self._cv.wait_for(
+                lambda: self.latest is not None and self.latest.seq > after_seq,
+                timeout=timeout,
+            )
+            return self.latest if ok else None
+
+    def subscribe_asyncio(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> "asyncio.Queue":
+        """Queue for `await q.get()` inside an asyncio loop; call from that loop."""
+        loop = loop or asyncio.get_running_loop()
+        q: "asyncio.Queue" = asyncio.Queue(maxsize=1)
+        self.subscribe(lambda snap: loop.call_soon_threadsafe(_put_latest, q, snap))
+        return q
+
+
+class ScanSource(abc.ABC):
+    """
+    Shared consumer API of LidarC1 / LidarProcess / ReplayLidar. Subclasses
+    set self.hub (ScanHub) and implement read_scan().
+    """
+
+    hub: ScanHub
+
+    @abc.abstractmethod
+    def read_scan(self) -> ScanSnapshot:
+        """Latest revolution (filtered if the source has a filter)."""
+
+    # ---------- push API ----------
+    def subscribe(self, cb: Callable[[ScanSnapshot], None]) -> int:
+        """cb(snapshot) on every completed revolution (runs on the publishing thread)."""
+        return self.hub.subscribe(cb)
+
+    def unsubscribe(self, token: int):
+        self.hub.unsubscribe(token)
+
+    def wait_scan(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[ScanSnapshot]:
+        return self.hub.wait_scan(after_seq, timeout)
+
+    def subscribe_asyncio(self, loop=None):
+        return self.hub.subscribe_asyncio(loop)
+
+    # ---------- pull API ----------
+    def read_layout(self, layout) -> np.ndarray:
+        """
+        Per-sector stats array of the latest revolution for any layout:
+        a SectorLayout, a named-sector tuple, or an int (uniform histogram).
+        Rows follow layout.names, columns STAT_FIELDS.
+        """
+        snap = self.read_scan()
+        if not isinstance(layout, SectorLayout):
+            layout = get_layout(layout, len(snap.dist_mm))
+        return snap.reduce(layout)
+
+    def read_polar(self, n_sectors: int = 36, stat: str = "min") -> np.ndarray:
+        """Uniform polar histogram of one statistic (meters, NaN = empty), sector 0 = front."""
+        return self.read_layout(n_sectors)[:, STAT_FIELDS.index(stat)]
+
+    def read_sector_stats(self) -> Dict[str, Dict]:
+        """
+        Per-sector stats {"front"|"left"|"right": {min, mean, median, p20, count}}
+        from the latest completed revolution (meters; None when a sector is empty).
+        Sectors:
+          front: 0°±30°
+          left:  60°±30° (30..90)
+          right: 300°±30° (270..330)
+        """
+        return self.read_scan().sector_stats()
+
+    def read_sectors(self) -> Tuple[float, float, float]:
+        """
+        Return (min_front_m, avg_left_m, avg_right_m) from the latest revolution.
+        Empty front -> inf, empty left/right -> 0.0 (same as before).
+        """
+        st = self.read_sector_stats()
+        min_front = st["front"]["min"]
+        avg_left = st["left"]["mean"]
+        avg_right = st["right"]["mean"]
+        return (
+            float("inf") if min_front is None else min_front,
+            0.0 if avg_left is None else avg_left,
+            0.0 if avg_right is None else avg_right,
+        )
@@ -2,45 +2,53 @@
 import asyncio
 import threading
 import time
-from typing import Dict, Optional, Tuple
+from typing import Optional
 
 # rplidarc1 package provides RPLidar class (async scanning) in scanner.py
 from rplidarc1.scanner import RPLidar  # works with installed package layout
 
-def _angle_diff(a: float, b: float) -> float:
-    return (a - b + 180.0) % 360.0 - 180.0
-
-def _in_sector(angle_deg: float, center_deg: float, half_width_deg: float) -> bool:
-    return abs(_angle_diff(angle_deg, center_deg)) <= half_width_deg
-
-def _clean_dist_m(dist_mm) -> Optional[float]:
-    if dist_mm is None:
-        return None
-    try:
-        d_mm = float(dist_mm)
-    except Exception:
-        return None
-    if d_mm <= 0:
-        return None
-    d = d_mm / 1000.0
-    if d < 0.10 or d > 12.0:
-        return None
-    return d
-
-class LidarC1:
+from core.lidar_record import ScanRecorder
+from core.lidar_scan import ScanBins, ScanHub, ScanSnapshot, ScanSource, make_filter
+
+
+class LidarC1(ScanSource):
     """
     Threaded wrapper for rplidarc1's asyncio scanner.
-    Keeps latest output_dict snapshot for synchronous consumers (main loop).
+    Points from the scanner's output_queue go into a fixed angle-binned buffer
+    (ScanBins); each completed revolution is published with a scan sequence
+    number and monotonic timestamp for synchronous consumers (main loop).
+
+    Push API (ScanHub): subscribe(cb) / wait_scan(seq, timeout) /
+    subscribe_asyncio() fire once per revolution with a ScanSnapshot that
+    already carries the sector stats. Pull API (ScanSource): read_sectors,
+    read_sector_stats, read_layout(layout), read_polar(n).
+
+    record_path: append every revolution to a ScanRecorder file
+    (replay with core.lidar_record.ReplayLidar). Raw revolutions are recorded.
+
+    filter_depth / filter_mode: TemporalFilter over the last N revolutions
+    before the sector reduction (depth 1 = off).
     """
-    def __init__(self, port="/dev/ttyUSB0", baud=460800, mirror_angle=False):
+    def __init__(
+        self,
+        port="/dev/ttyUSB0",
+        baud=460800,
+        mirror_angle=False,
+        n_bins=720,
+        max_age_s=0.5,
+        record_path=None,
+        filter_depth=1,
+        filter_mode="median",
+    ):
         self._lidar = RPLidar(port, baudrate=baud, timeout=0.2)
         self._mirror_angle = mirror_angle
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
-        self._lock = threading.Lock()
-        self._last_dict: Dict[float, int] = {}
-        self._last_update_ts = 0.0
+        self.bins = ScanBins(n_bins=n_bins, max_age_s=max_age_s, mirror=mirror_angle)
+        self.hub = ScanHub(make_filter(n_bins, filter_depth, filter_mode))
+        self.bins.on_publish = self._on_revolution
+        self.recorder = ScanRecorder(record_path, n_bins=n_bins) if record_path else None
 
         self.start()
 
@@ -69,25 +77,66 @@ class LidarC1:
             self._lidar.shutdown()
         except Exception:
             pass
+        if self.recorder is not None:
+            self.recorder.close()
 
     @property
     def last_age_s(self) -> float:
-        ts = self._last_update_ts
+        """Seconds since the last completed revolution."""
+        ts = self.bins.ts
         if ts <= 0:
             return 999.0
-        return time.time() - ts
+        return time.monotonic() - ts
+
+    @property
+    def scan_seq(self) -> int:
+        return self.bins.seq
+
+    def record(self, seq: int, ts: float, dist):
+        if self.recorder is not None:
+            try:
+                self.recorder.write(seq, ts, self.bins.points_per_rev, dist)
+            except Exception:
+                pass
+
+    def _on_revolution(self, seq: int, ts: float, dist):
+        self.record(seq, ts, dist)
+        self.hub.publish(ScanSnapshot(seq, ts, dist.copy(), self.bins.angles_deg))
+
+    def _ingest(self, item, ts: float):
+        try:
+            self.bins.add_point(item["a_deg"], item["d_mm"], ts)
+        except Exception:
+            pass
+
+    async def _consume(self):
+        # drain scanner output_queue -> bins (batch per wakeup, one timestamp per batch)
+        q = self._lidar.output_queue
+        while not self._stop.is_set():
+            try:
+                item = await asyncio.wait_for(q.get(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            ts = time.monotonic()
+            self._ingest(item, ts)
+            while True:
+                try:
+                    item = q.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                self._ingest(item, ts)
 
     def _run_async(self):
         async def _runner():
-            # run scanning continuously, update output_dict
+            consumer = asyncio.ensure_future(self._consume())
+            # run scanning continuously; points arrive on output_queue
             while not self._stop.is_set():
                 try:
-                    # start scan task, store dict internally
-                    # make_return_dict=True => fills self._lidar.output_dict (angle -> distance)
-                    await self._lidar.simple_scan(make_return_dict=True)
+                    await self._lidar.simple_scan(make_return_dict=False)
                 except Exception:
                     # brief backoff on errors
                     await asyncio.sleep(0.2)
+            consumer.cancel()
 
         try:
             asyncio.run(_runner())
@@ -95,50 +144,7 @@ class LidarC1:
             # if event loop crashed, nothing else to do; main will detect stale age
             pass
 
-    def read_sectors(self) -> Tuple[float, float, float]:
-        """
-        Return (min_front_m, avg_left_m, avg_right_m) from latest output_dict snapshot.
-        Sectors:
-          front: 0°±30°
-          left:  60°±30° (30..90)
-          right: 300°±30° (270..330)
-        """
-        # snapshot latest dict from lidar object
-        d = {}
-        try:
-            # copy from library's output_dict
-            d = dict(self._lidar.output_dict)  # angle -> distance_mm
-        except Exception:
-            d = {}
-
-        # update last snapshot age marker
-        with self._lock:
-            self._last_dict = d
-            self._last_update_ts = time.time()
-
-        front = []
-        left = []
-        right = []
-
-        for a, dist_mm in d.items():
-            try:
-                angle = float(a)
-            except Exception:
-                continue
-            if self._mirror_angle:
-                angle = (360.0 - angle) % 360.0
-            dist = _clean_dist_m(dist_mm)
-            if dist is None:
-                continue
-
-            if _in_sector(angle, 0.0, 30.0):
-                front.append(dist)
-            elif _in_sector(angle, 60.0, 30.0):
-                left.append(dist)
-            elif _in_sector(angle, 300.0, 30.0):
-                right.append(dist)
-
-        min_front = min(front) if front else float("inf")
-        avg_left = (sum(left) / len(left)) if left else 0.0
-        avg_right = (sum(right) / len(right)) if right else 0.0
-        return min_front, avg_left, avg_right
+    def read_scan(self) -> ScanSnapshot:
+        """Latest completed revolution: seq, monotonic ts, per-bin distances, sectors."""
+        snap = self.hub.latest
+        return snap if snap is not None else self.bins.snapshot()
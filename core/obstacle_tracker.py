@@ -0,0 +1,267 @@
+# core/obstacle_tracker.py
+# Obstacle clustering + tracking + time-to-collision from binned revolutions.
+#
+# 1. segment(): adaptive breakpoint detection on the angle-ordered points
+#    (vectorized; a break where the gap to the previous return is larger than
+#    what a surface at angle `lambda_deg` to the beam could produce)
+# 2. ObstacleTracker.update(): greedy nearest-neighbour association of
+#    clusters to tracks (gated), alpha-beta position/velocity filter, optional
+#    ego-motion compensation from ScanOdometry
+# 3. ttc_by_sector(): min time-to-collision per sector from the closing speed
+#    (radial component of the velocity relative to the robot)
+# Cost per revolution is bounded by n_bins, max_clusters and max_tracks.
+#
+# Frame: x forward, y left (same as OccupancyGrid / scan_match).
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.lidar_scan import SECTORS, _angle_diff
+from core.scan_match import scan_points
+
+
+@dataclass
+class Clusters:
+    cx: np.ndarray      # centroid x (m)
+    cy: np.ndarray      # centroid y (m)
+    rmin: np.ndarray    # nearest return (m)
+    count: np.ndarray   # returns per cluster
+    width: np.ndarray   # first-to-last point distance (m)
+
+    def __len__(self) -> int:
+        return len(self.cx)
+
+
+_EMPTY = Clusters(*(np.zeros(0) for _ in range(5)))
+
+
+def segment(
+    pts: np.ndarray,
+    bin_rad: float,
+    lambda_deg: float = 10.0,
+    sigma_m: float = 0.02,
+    max_bin_gap: int = 4,
+    min_points: int = 3,
+    max_clusters: int = 64,
+) -> Clusters:
+    """Adaptive breakpoint segmentation of float64[n_bins, 2] points (NaN = no return)."""
+    valid = np.flatnonzero(np.isfinite(pts[:, 0]))
+    n_bins = pts.shape[0]
+    if valid.size < min_points:
+        return _EMPTY
+    p = pts[valid]
+    r = np.hypot(p[:, 0], p[:, 1])
+
+    # gap i: between point i-1 and i (index 0 = wrap from the last point)
+    prev = np.roll(np.arange(valid.size), 1)
+    dbin = (valid - valid[prev]) % n_bins
+    gap = np.hypot(p[:, 0] - p[prev, 0], p[:, 1] - p[prev, 1])
+    dphi = dbin * bin_rad
+    lam = math.radians(lambda_deg)
+    dmax = r[prev] * np.sin(dphi) / np.maximum(np.sin(lam - dphi), 1e-3) + 3.0 * sigma_m
+    brk = (gap > dmax) | (dbin > max_bin_gap) | (dphi >= lam)
+
+    starts = np.flatnonzero(brk)
+    if starts.size == 0:
+        starts = np.array([0])  # one closed contour (e.g. a room with no gaps)
+    # rotate so the sequence begins at a break -> every cluster is contiguous
+    order = np.roll(np.arange(valid.size), -int(starts[0]))
+    p, r = p[order], r[order]
+    starts = np.sort((starts - starts[0]) % valid.size)
+
+    counts = np.diff(np.append(starts, valid.size))
+    keep = counts >= min_points
+    if not keep.any():
+        return _EMPTY
+    cx = np.add.reduceat(p[:, 0], starts)[keep] / counts[keep]
+    cy = np.add.reduceat(p[:, 1], starts)[keep] / counts[keep]
+    rmin = np.minimum.reduceat(r, starts)[keep]
+    last = starts + counts - 1
+    width = np.hypot(p[last, 0] - p[starts, 0], p[last, 1] - p[starts, 1])[keep]
+    counts = counts[keep]
+
+    if cx.size > max_clusters:
+        near = np.argsort(rmin)[:max_clusters]
+        cx, cy, rmin, counts, width = cx[near], cy[near], rmin[near], counts[near], width[near]
+    return Clusters(cx, cy, rmin, counts.astype(np.float64), width)
+
+
+class ObstacleTracker:
+    """
+    Tracks clusters across revolutions.
+    update(dist_mm, ts, motion=None) -> Clusters of this revolution
+      motion: (dx, dy, dtheta) robot motion since the previous revolution
+              (ScanOdometry); tracks are moved into the new frame so their
+              velocity is world-relative (static walls ~ 0 m/s). Without it
+              the robot is assumed static.
+    Track arrays (length = number of tracks): pos, vel, rmin, hits, misses, ids.
+    """
+
+    def __init__(
+        self,
+        n_bins: int = 720,
+        gate_m: float = 0.5,
+        alpha: float = 0.5,
+        beta: float = 0.3,
+        max_misses: int = 3,
+        min_hits: int = 3,
+        max_tracks: int = 64,
+        max_speed: float = 5.0,
+        sectors=SECTORS,
+    ):
+        self.n_bins = n_bins
+        self.bin_rad = 2.0 * math.pi / n_bins
+        ang = (np.arange(n_bins) + 0.5) * self.bin_rad
+        self._cos = np.cos(ang)
+        self._sin = np.sin(ang)
+        self.gate_m = gate_m
+        self.alpha = alpha
+        self.beta = beta
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.max_tracks = max_tracks
+        self.max_speed = max_speed
+        self.sectors = sectors
+
+        self.pos = np.zeros((0, 2))
+        self.vel = np.zeros((0, 2))
+        self.rmin = np.zeros(0)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.misses = np.zeros(0, dtype=np.int32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self._next_id = 1
+        self._last_ts: Optional[float] = None
+        self.robot_vel = np.zeros(2)
+
+    def reset(self):
+        self.__init__(self.n_bins, self.gate_m, self.alpha, self.beta, self.max_misses,
+                      self.min_hits, self.max_tracks, self.max_speed, self.sectors)
+
+    # ---------- update ----------
+    def _to_new_frame(self, motion: Tuple[float, float, float]):
+        dx, dy, dth = motion
+        c, s = math.cos(dth), math.sin(dth)
+        rot_t = np.array([[c, s], [-s, c]])  # R(-dtheta)
+        self.pos = (self.pos - (dx, dy)) @ rot_t.T
+        self.vel = self.vel @ rot_t.T
+
+    def update(self, dist_mm: np.ndarray, ts: float, motion: Optional[Tuple[float, float, float]] = None) -> Clusters:
+        pts = scan_points(dist_mm, self._cos, self._sin)
+        cl = segment(pts, self.bin_rad, max_clusters=self.max_tracks)
+        dt = 0.0 if self._last_ts is None else max(0.0, ts - self._last_ts)
+        self._last_ts = ts
+
+        if motion is not None and len(self.pos):
+            self._to_new_frame(motion)
+        self.robot_vel = np.array(motion[:2]) / dt if (motion is not None and dt > 0) else np.zeros(2)
+
+        meas = np.stack([cl.cx, cl.cy], axis=1) if len(cl) else np.zeros((0, 2))
+        pred = self.pos + self.vel * dt
+        t_idx, c_idx = self._associate(pred, meas)
+
+        # matched tracks: alpha-beta filter
+        if t_idx.size:
+            res = meas[c_idx] - pred[t_idx]
+            self.pos[t_idx] = pred[t_idx] + self.alpha * res
+            if dt > 0:
+                v = self.vel[t_idx] + (self.beta / dt) * res
+                speed = np.hypot(v[:, 0], v[:, 1])
+                v *= np.minimum(1.0, self.max_speed / np.maximum(speed, 1e-9))[:, None]
+                self.vel[t_idx] = v
+            self.rmin[t_idx] = cl.rmin[c_idx]
+            self.hits[t_idx] += 1
+            self.misses[t_idx] = 0
+
+        # unmatched tracks: coast, then drop
+        unmatched = np.ones(len(self.pos), dtype=bool)
+        unmatched[t_idx] = False
+        self.pos[unmatched] = pred[unmatched]
+        self.misses[unmatched] += 1
+        alive = self.misses <= self.max_misses
+        self._select(alive)
+
+        # unmatched clusters: new tracks (nearest first, bounded)
+        new = np.ones(len(cl), dtype=bool)
+        new[c_idx] = False
+        room = self.max_tracks - len(self.pos)
+        if room > 0 and new.any():
+            cand = np.flatnonzero(new)
+            cand = cand[np.argsort(cl.rmin[cand])][:room]
+            k = cand.size
+            self.pos = np.vstack([self.pos, meas[cand]])
+            self.vel = np.vstack([self.vel, np.zeros((k, 2))])
+            self.rmin = np.append(self.rmin, cl.rmin[cand])
+            self.hits = np.append(self.hits, np.ones(k, dtype=np.int32))
+            self.misses = np.append(self.misses, np.zeros(k, dtype=np.int32))
+            self.ids = np.append(self.ids, np.arange(self._next_id, self._next_id + k))
+            self._next_id += k
+        return cl
+
+    def _associate(self, pred: np.ndarray, meas: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Greedy nearest pairs under the gate (bounded: max_tracks x max_clusters)."""
+        if not len(pred) or not len(meas):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        d = np.hypot(pred[:, None, 0] - meas[None, :, 0], pred[:, None, 1] - meas[None, :, 1])
+        flat = np.argsort(d, axis=None)
+        flat = flat[d.ravel()[flat] <= self.gate_m]
+        used_t = np.zeros(len(pred), dtype=bool)
+        used_c = np.zeros(len(meas), dtype=bool)
+        ti, ci = [], []
+        for f in flat:
+            t, c = divmod(int(f), len(meas))
+            if used_t[t] or used_c[c]:
+                continue
+            used_t[t] = used_c[c] = True
+            ti.append(t)
+            ci.append(c)
+        return np.array(ti, dtype=np.int64), np.array(ci, dtype=np.int64)
+
+    def _select(self, m: np.ndarray):
+        self.pos, self.vel, self.rmin = self.pos[m], self.vel[m], self.rmin[m]
+        self.hits, self.misses, self.ids = self.hits[m], self.misses[m], self.ids[m]
+
+    # ---------- outputs ----------
+    def closing_speed(self) -> np.ndarray:
+        """Radial approach speed per track (m/s, > 0 = getting closer)."""
+        rel = self.vel - self.robot_vel
+        r = np.maximum(np.hypot(self.pos[:, 0], self.pos[:, 1]), 1e-6)
+        return -(self.pos * rel).sum(axis=1) / r
+
+    def ttc(self) -> np.ndarray:
+        """Time-to-collision per track (s, inf when not closing or not confirmed)."""
+        v = self.closing_speed()
+        out = np.full(len(self.pos), np.inf)
+        ok = (v > 0.05) & (self.hits >= self.min_hits)
+        out[ok] = self.rmin[ok] / v[ok]
+        return out
+
+    def ttc_by_sector(self) -> Dict[str, float]:
+        """{sector: min TTC (s)} using the same sectors as sector_stats."""
+        ttc = self.ttc()
+        bearing = np.degrees(np.arctan2(self.pos[:, 1], self.pos[:, 0])) % 360.0
+        taken = np.zeros(len(ttc), dtype=bool)
+        out: Dict[str, float] = {}
+        for name, center, half in self.sectors:
+            m = (np.abs(_angle_diff(bearing, center)) <= half) & ~taken
+            taken |= m
+            out[name] = float(ttc[m].min()) if m.any() else float("inf")
+        return out
+
+    def tracks(self, confirmed_only: bool = True):
+        """List of dicts for logging / dashboard."""
+        ttc = self.ttc()
+        out = []
+        for i in range(len(self.pos)):
+            if confirmed_only and self.hits[i] < self.min_hits:
+                continue
+            out.append({
+                "id": int(self.ids[i]),
+                "x": round(float(self.pos[i, 0]), 3),
+                "y": round(float(self.pos[i, 1]), 3),
+                "vx": round(float(self.vel[i, 0]), 3),
+                "vy": round(float(self.vel[i, 1]), 3),
+                "ttc": None if not np.isfinite(ttc[i]) else round(float(ttc[i]), 2),
+            })
+        return out
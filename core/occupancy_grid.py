@@ -0,0 +1,219 @@
+# core/occupancy_grid.py
+# Rolling robot-centred log-odds occupancy grid built from lidar revolutions.
+#
+# Frame: x forward, y left (lidar angle 0 = front, counter-clockwise, i.e. the
+# mirrored angles main.py uses). Cell (row, col) = (iy, ix); the robot sits in
+# the centre cell. Log-odds: 0 = unknown, > 0 occupied, < 0 free.
+import math
+import threading
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from core.lidar_scan import MAX_RANGE_M, MIN_RANGE_M
+
+
+def _wrap(a):
+    """Angle wrap to [-pi, pi). Works on floats and arrays."""
+    return (a + math.pi) % (2.0 * math.pi) - math.pi
+
+
+class OccupancyGrid:
+    """
+    Ego-centric log-odds grid (size_m x size_m at res_m per cell).
+    - update(dist_mm, angles_deg, ts): vectorized ray marking of one revolution
+      (free cells along every ray from a precomputed per-bin lookup table,
+      occupied at the endpoint), then decay toward unknown
+    - move(dx, dy, dtheta): scroll/rotate so the robot stays in the centre
+      (motion expressed in the previous robot frame, meters / radians)
+    - clearance(heading, width) / nearest_in_cone(heading, half_angle):
+      queries on the cached occupied-cell list (tens of µs)
+    Updates and moves take an internal lock; queries read an immutable
+    snapshot of the occupied cells, so they are safe from any thread.
+    """
+
+    def __init__(
+        self,
+        size_m: float = 8.0,
+        res_m: float = 0.05,
+        n_bins: int = 720,
+        l_occ: float = 0.85,
+        l_free: float = -0.40,
+        l_min: float = -2.0,
+        l_max: float = 3.5,
+        occ_thresh: float = 0.6,
+        decay_tau_s: float = 3.0,
+    ):
+        self.res = res_m
+        self.n = int(round(size_m / res_m)) | 1  # odd -> robot in a cell centre
+        self.c = self.n // 2
+        self.size_m = self.n * res_m
+        self.radius_m = self.c * res_m
+        self.l_occ = l_occ
+        self.l_free = l_free
+        self.l_min = l_min
+        self.l_max = l_max
+        self.occ_thresh = occ_thresh
+        self.decay_tau_s = decay_tau_s
+
+        self.logodds = np.zeros((self.n, self.n), dtype=np.float32)
+        self._lock = threading.Lock()
+        self._last_ts: Optional[float] = None
+        self._residual = np.zeros(2)  # sub-cell translation carried between moves
+
+        # cell centre coordinates (for rotation resampling / exports)
+        idx = (np.arange(self.n) - self.c) * res_m
+        self._cx, self._cy = np.meshgrid(idx, idx)  # [row=iy, col=ix]
+
+        self._build_rays(n_bins)
+
+        # occupied cells snapshot: (x, y, r, bearing) arrays
+        self._occ = (np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0))
+        self.updates = 0
+
+    # ---------- precomputed rays ----------
+    def _build_rays(self, n_bins: int):
+        self.n_bins = n_bins
+        ang = np.deg2rad((np.arange(n_bins) + 0.5) * (360.0 / n_bins))
+        self._cos = np.cos(ang)
+        self._sin = np.sin(ang)
+        k = int(math.ceil(self.radius_m / self.res))
+        self._steps = (np.arange(k) + 0.5) * self.res
+        xs = self._cos[:, None] * self._steps[None, :]
+        ys = self._sin[:, None] * self._steps[None, :]
+        self._ray_cells = self._flat_index(xs, ys)  # int64[n_bins, k], -1 outside
+
+    def _flat_index(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        ix = np.floor(x / self.res + 0.5).astype(np.int64) + self.c
+        iy = np.floor(y / self.res + 0.5).astype(np.int64) + self.c
+        ok = (ix >= 0) & (ix < self.n) & (iy >= 0) & (iy < self.n)
+        return np.where(ok, iy * self.n + ix, -1)
+
+    # ---------- updates ----------
+    def update(self, dist_mm: np.ndarray, ts: Optional[float] = None):
+        """One revolution (len n_bins, NaN = no return) into the grid."""
+        d = np.asarray(dist_mm, dtype=np.float64) / 1000.0
+        if d.size != self.n_bins:
+            self._build_rays(d.size)
+        hit = np.isfinite(d) & (d >= MIN_RANGE_M) & (d <= MAX_RANGE_M)
+
+        # free: every ray step short of the return (one cell margin)
+        free = self._steps[None, :] < (np.where(hit, d, 0.0)[:, None] - self.res)
+        free_cells = self._ray_cells[free]
+        free_cells = free_cells[free_cells >= 0]
+
+        dh = d[hit]
+        hit_cells = self._flat_index(self._cos[hit] * dh, self._sin[hit] * dh)
+        hit_cells = hit_cells[hit_cells >= 0]
+
+        with self._lock:
+            flat = self.logodds.reshape(-1)
+            if ts is not None and self._last_ts is not None and self.decay_tau_s > 0:
+                dt = max(0.0, ts - self._last_ts)
+                flat *= math.exp(-dt / self.decay_tau_s)
+            if ts is not None:
+                self._last_ts = ts
+            flat[free_cells] += self.l_free  # fancy assignment: once per cell
+            flat[hit_cells] += self.l_occ
+            np.clip(flat, self.l_min, self.l_max, out=flat)
+            self.updates += 1
+            self._refresh_occ()
+
+    def move(self, dx: float, dy: float, dtheta: float = 0.0):
+        """
+        Robot moved by (dx, dy) and turned by dtheta in its previous frame.
+        Pure translation shifts whole cells (sub-cell remainder carried over);
+        rotation resamples the grid (nearest neighbour).
+        """
+        with self._lock:
+            if abs(dtheta) > 1e-4:
+                self._rotate_translate(dx, dy, dtheta)
+            else:
+                self._residual += (dx, dy)
+                sx = int(round(self._residual[0] / self.res))
+                sy = int(round(self._residual[1] / self.res))
+                if sx or sy:
+                    self._residual -= (sx * self.res, sy * self.res)
+                    self._shift(sx, sy)
+            self._refresh_occ()
+
+    def _shift(self, sx: int, sy: int):
+        # robot moved +sx cells forward -> world content moves -sx in the grid
+        g = self.logodds
+        out = np.zeros_like(g)
+        n = self.n
+        if abs(sx) < n and abs(sy) < n:
+            src_x = slice(max(0, sx), n + min(0, sx))
+            dst_x = slice(max(0, -sx), n + min(0, -sx))
+            src_y = slice(max(0, sy), n + min(0, sy))
+            dst_y = slice(max(0, -sy), n + min(0, -sy))
+            out[dst_y, dst_x] = g[src_y, src_x]
+        self.logodds = out
+
+    def _rotate_translate(self, dx: float, dy: float, dtheta: float):
+        # new cell centre p -> old frame: R(dtheta) p + t
+        c, s = math.cos(dtheta), math.sin(dtheta)
+        tx = dx + self._residual[0]
+        ty = dy + self._residual[1]
+        self._residual[:] = 0.0
+        ox = c * self._cx - s * self._cy + tx
+        oy = s * self._cx + c * self._cy + ty
+        src = self._flat_index(ox, oy)
+        flat = self.logodds.reshape(-1)
+        self.logodds = np.where(src >= 0, flat[np.maximum(src, 0)], 0.0).astype(np.float32)
+
+    def reset(self):
+        with self._lock:
+            self.logodds[:] = 0.0
+            self._residual[:] = 0.0
+            self._last_ts = None
+            self._refresh_occ()
+
+    def _refresh_occ(self):
+        iy, ix = np.nonzero(self.logodds > self.occ_thresh)
+        x = (ix - self.c) * self.res
+        y = (iy - self.c) * self.res
+        self._occ = (x, y, np.hypot(x, y), np.arctan2(y, x))
+
+    # ---------- queries ----------
+    def occupied_points(self) -> Tuple[np.ndarray, np.ndarray]:
+        x, y, _, _ = self._occ
+        return x, y
+
+    def clearance(self, heading_rad: float = 0.0, width_m: float = 0.30, max_m: Optional[float] = None) -> float:
+        """Free distance along `heading_rad` for a corridor `width_m` wide."""
+        x, y, _, _ = self._occ
+        max_m = self.radius_m if max_m is None else max_m
+        if x.size == 0:
+            return max_m
+        c, s = math.cos(heading_rad), math.sin(heading_rad)
+        along = x * c + y * s
+        lat = -x * s + y * c
+        m = (along > 0.0) & (np.abs(lat) <= width_m / 2.0)
+        if not m.any():
+            return max_m
+        return min(max_m, float(along[m].min()))
+
+    def nearest_in_cone(self, heading_rad: float = 0.0, half_angle_rad: float = math.pi) -> Tuple[float, Optional[float]]:
+        """(distance, bearing_rad) of the nearest occupied cell in the cone; (inf, None) if none."""
+        _, _, r, b = self._occ
+        if r.size == 0:
+            return float("inf"), None
+        m = np.abs(_wrap(b - heading_rad)) <= half_angle_rad
+        if not m.any():
+            return float("inf"), None
+        i = int(np.argmin(np.where(m, r, np.inf)))
+        return float(r[i]), float(b[i])
+
+    def probability(self) -> np.ndarray:
+        """Occupancy probability [0..1] per cell (copy)."""
+        return 1.0 / (1.0 + np.exp(-self.logodds))
+
+    def export(self, max_cells: int = 2000) -> Dict:
+        """Compact dashboard payload: occupied cells as [ix, iy] offsets from the robot."""
+        x, y, r, _ = self._occ
+        if x.size > max_cells:
+            keep = np.argsort(r)[:max_cells]  # nearest first
+            x, y = x[keep], y[keep]
+        cells = np.stack([np.round(x / self.res), np.round(y / self.res)], axis=1).astype(int)
+        return {"res": self.res, "n": self.n, "occ": cells.tolist()}
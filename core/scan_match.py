@@ -0,0 +1,277 @@
+# core/scan_match.py
+# Scan-matching odometry between consecutive binned lidar revolutions.
+#
+# ICP (point-to-line by default, point-to-point optional) with projective
+# correspondences: scans are angle-binned (ScanBins), so the nearest neighbour
+# of a transformed point is searched only in a window of bins around its
+# bearing in the previous scan (m x (2w+1) distances instead of m x n).
+# Line normals come from the neighbouring bins of the previous scan.
+# Everything is NumPy; one match of two 720-bin scans is a few ms.
+#
+# Frame: x forward, y left, theta counter-clockwise (same as OccupancyGrid).
+import math
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from core.lidar_scan import MAX_RANGE_M, MIN_RANGE_M
+
+
+def scan_points(dist_mm: np.ndarray, cos_a: np.ndarray, sin_a: np.ndarray) -> np.ndarray:
+    """Binned distances -> float64[n_bins, 2] points in meters (NaN rows where invalid)."""
+    d = np.asarray(dist_mm, dtype=np.float64) / 1000.0
+    d = np.where((d >= MIN_RANGE_M) & (d <= MAX_RANGE_M), d, np.nan)
+    return np.stack([d * cos_a, d * sin_a], axis=1)
+
+
+def rigid_fit(src: np.ndarray, dst: np.ndarray) -> Tuple[float, float, float]:
+    """Least-squares 2-D rigid transform (dx, dy, dtheta) mapping src -> dst."""
+    mu_s = src.mean(axis=0)
+    mu_d = dst.mean(axis=0)
+    s = src - mu_s
+    d = dst - mu_d
+    sxx = float((s[:, 0] * d[:, 0]).sum())
+    syy = float((s[:, 1] * d[:, 1]).sum())
+    sxy = float((s[:, 0] * d[:, 1]).sum())
+    syx = float((s[:, 1] * d[:, 0]).sum())
+    th = math.atan2(sxy - syx, sxx + syy)
+    c, sn = math.cos(th), math.sin(th)
+    tx = mu_d[0] - (c * mu_s[0] - sn * mu_s[1])
+    ty = mu_d[1] - (sn * mu_s[0] + c * mu_s[1])
+    return tx, ty, th
+
+
+def normals(pts: np.ndarray, max_gap_m: float = 0.25) -> np.ndarray:
+    """Unit normals from the neighbouring bins (NaN where the surface is unclear)."""
+    t = np.roll(pts, -1, axis=0) - np.roll(pts, 1, axis=0)
+    length = np.hypot(t[:, 0], t[:, 1])
+    ok = np.isfinite(length) & (length > 1e-6) & (length < 2.0 * max_gap_m)
+    n = np.full_like(pts, np.nan)
+    n[ok, 0] = -t[ok, 1] / length[ok]
+    n[ok, 1] = t[ok, 0] / length[ok]
+    return n
+
+
+def line_fit(src: np.ndarray, dst: np.ndarray, nrm: np.ndarray) -> Tuple[float, float, float]:
+    """Linearized point-to-line step (dx, dy, dtheta) moving src onto the lines (dst, nrm)."""
+    r = ((src - dst) * nrm).sum(axis=1)
+    j = np.stack([nrm[:, 0], nrm[:, 1], nrm[:, 1] * src[:, 0] - nrm[:, 0] * src[:, 1]], axis=1)
+    h = j.T @ j
+    g = j.T @ r
+    try:
+        x = -np.linalg.solve(h + 1e-9 * np.eye(3), g)
+    except np.linalg.LinAlgError:
+        return 0.0, 0.0, 0.0
+    # rotate about the origin first, then translate (same convention as rigid_fit)
+    return float(x[0]), float(x[1]), float(x[2])
+
+
+def compose(a: Tuple[float, float, float], b: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    """Pose composition a ∘ b (apply b in a's frame)."""
+    ax, ay, at = a
+    bx, by, bt = b
+    c, s = math.cos(at), math.sin(at)
+    return ax + c * bx - s * by, ay + s * bx + c * by, (at + bt + math.pi) % (2.0 * math.pi) - math.pi
+
+
+@dataclass
+class MatchResult:
+    dx: float         # motion since the previous revolution, previous robot frame (m)
+    dy: float
+    dtheta: float     # rad, counter-clockwise
+    quality: float    # 0..1 (inlier fraction x residual term)
+    inliers: int
+    rms_m: float
+    iters: int
+
+
+class ScanMatcher:
+    """
+    ICP between two binned revolutions.
+    - window_deg: correspondence search half-window around the projected bearing
+    - max_corr_m: correspondence gate, shrinks to min_corr_m over the iterations
+    - trim: keep the best `trim` fraction of correspondences each iteration
+    - metric: "line" (point-to-line, better on walls) or "point"
+    """
+
+    def __init__(
+        self,
+        n_bins: int = 720,
+        window_deg: float = 4.0,
+        max_corr_m: float = 0.30,
+        min_corr_m: float = 0.08,
+        max_iter: int = 15,
+        trim: float = 0.9,
+        min_points: int = 40,
+        sigma_m: float = 0.03,
+        stride: int = 2,
+        metric: str = "line",
+        eps: float = 5e-4,
+    ):
+        self.n_bins = n_bins
+        self.bin_deg = 360.0 / n_bins
+        ang = np.deg2rad((np.arange(n_bins) + 0.5) * self.bin_deg)
+        self.cos_a = np.cos(ang)
+        self.sin_a = np.sin(ang)
+        w = max(1, int(round(window_deg / self.bin_deg)))
+        self._offsets = np.arange(-w, w + 1)
+        self.max_corr_m = max_corr_m
+        self.min_corr_m = min_corr_m
+        self.max_iter = max_iter
+        self.trim = trim
+        self.min_points = min_points
+        self.sigma_m = sigma_m
+        self.stride = max(1, int(stride))  # subsample the current scan
+        self.metric = metric
+        self.eps = eps  # convergence: step below eps (m / rad)
+
+    def points(self, dist_mm: np.ndarray) -> np.ndarray:
+        return scan_points(dist_mm, self.cos_a, self.sin_a)
+
+    def match(
+        self,
+        prev_pts: np.ndarray,
+        cur_pts: np.ndarray,
+        guess: Tuple[float, float, float] = (0.0, 0.0, 0.0),
+    ) -> Optional[MatchResult]:
+        """
+        prev_pts / cur_pts: float64[n_bins, 2] from points() (NaN = no return).
+        Returns the pose of the current scan in the previous scan's frame.
+        """
+        cur = cur_pts[:: self.stride]
+        cur = cur[np.isfinite(cur[:, 0])]
+        if cur.shape[0] < self.min_points or np.isfinite(prev_pts[:, 0]).sum() < self.min_points:
+            return None
+
+        inv_bin = 1.0 / math.radians(self.bin_deg)
+        prev_n = normals(prev_pts) if self.metric == "line" else None
+        pose = guess
+        rms = float("inf")
+        n_in = 0
+        it = 0
+        for it in range(1, self.max_iter + 1):
+            gate = self.max_corr_m + (self.min_corr_m - self.max_corr_m) * (it - 1) / max(1, self.max_iter - 1)
+            c, s = math.cos(pose[2]), math.sin(pose[2])
+            px = c * cur[:, 0] - s * cur[:, 1] + pose[0]
+            py = s * cur[:, 0] + c * cur[:, 1] + pose[1]
+
+            # projective candidates: bins around each point's bearing in the previous scan
+            b = np.floor((np.arctan2(py, px) % (2.0 * math.pi)) * inv_bin).astype(np.int64)
+            idx = (b[:, None] + self._offsets[None, :]) % self.n_bins
+            cand = prev_pts[idx]  # [m, 2w+1, 2]
+            d2 = (cand[..., 0] - px[:, None]) ** 2 + (cand[..., 1] - py[:, None]) ** 2
+            d2 = np.where(np.isfinite(d2), d2, np.inf)
+            k = np.argmin(d2, axis=1)
+            rows = np.arange(d2.shape[0])
+            best = d2[rows, k]
+
+            ok = best < gate * gate
+            if ok.sum() < self.min_points:
+                return None
+            if self.trim < 1.0:
+                lim = np.quantile(best[ok], self.trim)
+                ok &= best <= lim
+            src = np.stack([px[ok], py[ok]], axis=1)
+            dst = cand[rows[ok], k[ok]]
+            if prev_n is not None:
+                nrm = prev_n[idx[rows[ok], k[ok]]]
+                has_n = np.isfinite(nrm[:, 0])
+                if has_n.sum() >= self.min_points:
+                    step = line_fit(src[has_n], dst[has_n], nrm[has_n])
+                else:
+                    step = rigid_fit(src, dst)
+            else:
+                step = rigid_fit(src, dst)
+            pose = compose(step, pose)
+            n_in = int(ok.sum())
+            rms = math.sqrt(float(best[ok].mean()))
+            if abs(step[0]) < self.eps and abs(step[1]) < self.eps and abs(step[2]) < self.eps:
+                break
+
+        quality = (n_in / cur.shape[0]) * math.exp(-((rms / self.sigma_m) ** 2) / 2.0)
+        return MatchResult(float(pose[0]), float(pose[1]), float(pose[2]), float(quality), n_in, rms, it)
+
+
+class ScanOdometry:
+    """
+    Per-revolution motion from consecutive scans.
+    update(dist_mm, ts) -> MatchResult or None; also keeps
+      pose (x, y, theta) integrated in the start frame and
+      vx / vy (m/s, robot frame) / wz (rad/s), low-pass filtered.
+    Matches below `min_quality` are dropped: the pose advances by the
+    constant-velocity prediction (vx, vy, wz) * dt instead, then the velocity
+    decays toward 0.
+    - motion: (dx, dy, dtheta) applied for the last revolution (match or
+      prediction); None on the first scan / after a gap > max_dt. Hand it to
+      the tracker / grid.move so their frame follows the pose.
+    """
+
+    def __init__(self, matcher: Optional[ScanMatcher] = None, min_quality: float = 0.3, alpha: float = 0.5, max_dt: float = 0.5):
+        self.matcher = matcher or ScanMatcher()
+        self.min_quality = min_quality
+        self.alpha = alpha
+        self.max_dt = max_dt
+
+        self._prev_pts: Optional[np.ndarray] = None
+        self._prev_ts: Optional[float] = None
+        self._last_step = (0.0, 0.0, 0.0)
+
+        self.pose = (0.0, 0.0, 0.0)
+        self.vx = 0.0
+        self.vy = 0.0
+        self.wz = 0.0
+        self.quality = 0.0
+        self.last: Optional[MatchResult] = None
+        self.motion: Optional[Tuple[float, float, float]] = None
+        self.matches = 0
+        self.rejected = 0
+
+    def reset(self):
+        self._prev_pts = None
+        self._prev_ts = None
+        self._last_step = (0.0, 0.0, 0.0)
+        self.pose = (0.0, 0.0, 0.0)
+        self.vx = self.vy = self.wz = 0.0
+        self.quality = 0.0
+        self.motion = None
+
+    @property
+    def speed(self) -> float:
+        """Forward speed estimate (m/s)."""
+        return self.vx
+
+    def update(self, dist_mm: np.ndarray, ts: float) -> Optional[MatchResult]:
+        pts = self.matcher.points(dist_mm)
+        prev, prev_ts = self._prev_pts, self._prev_ts
+        self._prev_pts, self._prev_ts = pts, ts
+        self.motion = None
+        if prev is None or prev_ts is None:
+            return None
+        dt = ts - prev_ts
+        if dt <= 0 or dt > self.max_dt:
+            self._last_step = (0.0, 0.0, 0.0)
+            return None
+
+        # constant-velocity guess from the previous revolution
+        res = self.matcher.match(prev, pts, guess=self._last_step)
+        self.last = res
+        if res is None or res.quality < self.min_quality:
+            self.rejected += 1
+            self.quality = 0.0 if res is None else res.quality
+            self.motion = (self.vx * dt, self.vy * dt, self.wz * dt)
+            self.pose = compose(self.pose, self.motion)
+            a = self.alpha
+            self.vx, self.vy, self.wz = (1 - a) * self.vx, (1 - a) * self.vy, (1 - a) * self.wz
+            self._last_step = (0.0, 0.0, 0.0)
+            return None
+
+        self.matches += 1
+        self.quality = res.quality
+        self._last_step = self.motion = (res.dx, res.dy, res.dtheta)
+        self.pose = compose(self.pose, self._last_step)
+        a = self.alpha
+        self.vx = (1 - a) * self.vx + a * res.dx / dt
+        self.vy = (1 - a) * self.vy + a * res.dy / dt
+        self.wz = (1 - a) * self.wz + a * res.dtheta / dt
+        return res
@@ -0,0 +1,304 @@
+# core/scheduler.py
+# Multi-rate periodic task scheduler for the main loop (time.monotonic deadlines).
+#
+# Foreground tasks (control path) run in the thread that calls run(), highest
+# priority first whenever several are due. Background tasks (publishing, TUI,
+# stats) run in one worker thread with the same deadline logic, so a slow
+# redraw or JSON encode never delays the next motor command; it only shares
+# the GIL. A waiting thread gets the GIL back after sys.getswitchinterval()
+# (5 ms default), so run() shortens it to switch_interval_s while background
+# tasks exist (50 Hz task next to a 10 ms Python redraw, 1 core: late p95
+# 7 ms -> 3 ms).
+#
+# AsyncScheduler runs the foreground tasks on an asyncio loop instead, next to
+# event sources (input readers, datagram endpoints) that wake() a task the
+# moment something arrives; the periodic release is then only a heartbeat.
+import asyncio
+import math
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from core.histogram import Histogram
+
+
+class Task:
+    """
+    One periodic job.
+    - late: start time minus release time (s), i.e. scheduling latency
+    - cost: run time (s)
+    - overruns: runs that finished after the next release (deadline miss)
+    - skipped: releases dropped because of overruns (no catch-up bursts)
+    - min_gap_s: wake() never starts the task sooner than this after its last start
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        hz: float,
+        priority: int = 0,
+        background: bool = False,
+        wake: bool = False,
+        min_gap_s: float = 0.0,
+    ):
+        if hz <= 0:
+            raise ValueError("need hz > 0")
+        self.name = name
+        self.fn = fn
+        self.period_s = 1.0 / hz
+        self.priority = priority
+        self.background = background
+        self.wake = wake
+        self.min_gap_s = min_gap_s
+        self.next_due = 0.0
+        self.last_start = -math.inf
+
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.last_cost_s = 0.0
+        self.late = Histogram()
+        self.cost = Histogram()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hz": round(1.0 / self.period_s, 2),
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "late_ms": self.late.summary(1e3),
+            "cost_ms": self.cost.summary(1e3),
+        }
+
+
+class Scheduler:
+    """
+    sched.add("control", fn, hz=50, priority=0)
+    sched.add("tui", fn, hz=10, priority=5, background=True)
+    sched.run()          # blocks until stop(); joins the background worker
+    - priority: lower runs first when several tasks are due in the same thread
+    - wake=True tasks become due immediately on wake() (e.g. new lidar scan),
+      their next release is then one period later; wake(name) wakes one task
+    - an exception in a foreground task propagates out of run() (the caller's
+      cleanup stops the robot); background exceptions are counted per task
+    - stats(): histogram summaries are not free -> call at a low rate
+    - switch_interval_s: GIL switch interval during run() (None = leave as is)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, switch_interval_s: Optional[float] = 0.001):
+        self.clock = clock
+        self.switch_interval_s = switch_interval_s
+        self.tasks: List[Task] = []
+        self._wake = threading.Event()
+        self._woken: set = set()  # task names, "*" = every wake=True task
+        self._woken_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def add(self, name: str, fn: Callable[[], Any], hz: float, priority: int = 0,
+            background: bool = False, wake: bool = False, min_gap_s: float = 0.0) -> Task:
+        task = Task(name, fn, hz, priority=priority, background=background, wake=wake, min_gap_s=min_gap_s)
+        self.tasks.append(task)
+        return task
+
+    def task(self, name: str) -> Optional[Task]:
+        for t in self.tasks:
+            if t.name == name:
+                return t
+        return None
+
+    def wake(self, name: Optional[str] = None):
+        """Thread-safe: make wake=True foreground tasks (or just `name`) due now."""
+        with self._woken_lock:
+            self._woken.add("*" if name is None else name)
+        self._wake.set()
+
+    def stop(self):
+        """Thread-safe: run() returns after the task that is currently running."""
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {t.name: t.stats() for t in self.tasks}
+
+    # ---------- run ----------
+    def run(self):
+        fg = sorted((t for t in self.tasks if not t.background), key=lambda t: t.priority)
+        bg = sorted((t for t in self.tasks if t.background), key=lambda t: t.priority)
+        now = self.clock()
+        for t in self.tasks:
+            t.next_due = now
+        self._stop.clear()
+        old_switch = sys.getswitchinterval()
+        if bg and self.switch_interval_s:
+            sys.setswitchinterval(self.switch_interval_s)
+        if bg:
+            self._worker = threading.Thread(target=self._run_background, args=(bg,), daemon=True)
+            self._worker.start()
+        try:
+            self._run_foreground(fg)
+        finally:
+            self._stop.set()
+            if self._worker is not None:
+                self._worker.join(timeout=2.0)
+                self._worker = None
+            sys.setswitchinterval(old_switch)
+
+    def _run_foreground(self, tasks: List[Task]):
+        while not self._stop.is_set():
+            task = self._due_foreground(tasks)
+            if task is not None:
+                self._run_task(task, reraise=True)
+                continue
+            wait_s = self._wait_s(tasks)
+            if wait_s is None or wait_s > 0:
+                self._wake.wait(wait_s)
+
+    def _due_foreground(self, tasks: List[Task]) -> Optional[Task]:
+        now = self.clock()
+        if self._wake.is_set():
+            self._wake.clear()
+            with self._woken_lock:
+                woken, self._woken = self._woken, set()
+            for t in tasks:
+                if t.wake and ("*" in woken or t.name in woken):
+                    t.next_due = min(t.next_due, max(now, t.last_start + t.min_gap_s))
+        return self._next_due(tasks, now)
+
+    def _wait_s(self, tasks: List[Task]) -> Optional[float]:
+        if not tasks:
+            return None
+        return min(t.next_due for t in tasks) - self.clock()
+
+    def _run_background(self, tasks: List[Task]):
+        while not self._stop.is_set():
+            task = self._next_due(tasks, self.clock())
+            if task is not None:
+                self._run_task(task, reraise=False)
+                continue
+            wait_s = min(t.next_due for t in tasks) - self.clock()
+            if wait_s > 0:
+                self._stop.wait(wait_s)
+
+    @staticmethod
+    def _next_due(tasks: List[Task], now: float) -> Optional[Task]:
+        # tasks are sorted by priority -> first due one wins
+        for t in tasks:
+            if t.next_due <= now:
+                return t
+        return None
+
+    def _run_task(self, t: Task, reraise: bool):
+        release = t.next_due
+        start = self.clock()
+        t.last_start = start
+        t.late.record(start - release)
+        try:
+            t.fn()
+        except Exception as e:
+            t.errors += 1
+            t.last_error = repr(e)
+            if reraise:
+                raise
+        finally:
+            end = self.clock()
+            t.last_cost_s = end - start
+            t.cost.record(end - start)
+            t.runs += 1
+            nxt = release + t.period_s
+            if end > nxt:
+                # deadline miss: drop the releases we are already past
+                t.overruns += 1
+                k = math.ceil((end - nxt) / t.period_s)
+                t.skipped += k
+                nxt += k * t.period_s
+            t.next_due = nxt
+
+
+class AsyncScheduler(Scheduler):
+    """
+    Scheduler whose foreground tasks run on an asyncio loop (asyncio.run in
+    the thread that calls run()); background tasks keep their worker thread.
+    - add_source(coro_fn): `async def` started with the loop, cancelled on
+      stop (input readers; they call wake(name) when something arrives)
+    - call_soon(fn): thread-safe, fn() runs on the loop (e.g. from the serial
+      rx thread); dropped before the loop starts / after it ends
+    - wake() / stop() are thread-safe and wake the loop directly
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, switch_interval_s: Optional[float] = 0.001):
+        super().__init__(clock=clock, switch_interval_s=switch_interval_s)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sources: List[Callable[[], Any]] = []
+        self._aio_wake: Optional[asyncio.Event] = None
+        self.source_errors = 0
+
+    def add_source(self, coro_fn: Callable[[], Any]):
+        self._sources.append(coro_fn)
+
+    def call_soon(self, fn: Callable[[], Any]):
+        loop = self.loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(fn)
+        except RuntimeError:
+            pass  # loop closed
+
+    def wake(self, name: Optional[str] = None):
+        super().wake(name)
+        self.call_soon(self._set_aio_wake)
+
+    def stop(self):
+        super().stop()
+        self.call_soon(self._set_aio_wake)
+
+    def _set_aio_wake(self):
+        if self._aio_wake is not None:
+            self._aio_wake.set()
+
+    def _source_done(self, fut: "asyncio.Future"):
+        if not fut.cancelled() and fut.exception() is not None:
+            self.source_errors += 1
+
+    # ---------- run ----------
+    def _run_foreground(self, tasks: List[Task]):
+        try:
+            asyncio.run(self._run_async(tasks))
+        finally:
+            self.loop = None
+
+    async def _run_async(self, tasks: List[Task]):
+        self._aio_wake = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        sources = [asyncio.ensure_future(f()) for f in self._sources]
+        for fut in sources:
+            fut.add_done_callback(self._source_done)
+        try:
+            while not self._stop.is_set():
+                # clear before checking: a wake() landing after this point sets it again
+                self._aio_wake.clear()
+                task = self._due_foreground(tasks)
+                if task is not None:
+                    self._run_task(task, reraise=True)
+                    await asyncio.sleep(0)  # let readers run between ticks
+                    continue
+                wait_s = self._wait_s(tasks)
+                if wait_s is None or wait_s > 0:
+                    try:
+                        await asyncio.wait_for(self._aio_wake.wait(), wait_s)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            for fut in sources:
+                fut.cancel()
+            await asyncio.gather(*sources, return_exceptions=True)
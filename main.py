@@ -4,14 +4,26 @@ import curses
 import threading
 
 from core.lidar_sensor import LidarC1
+from core.lidar_proc import LidarProcess
+from core.lidar_record import ReplayLidar
+from core.lidar_scan import S_MIN, get_layout
+from core.occupancy_grid import OccupancyGrid
+from core.obstacle_tracker import ObstacleTracker
+from core.scan_match import ScanOdometry
 from comm.serial_link import SerialLink
 from control.ps4_controller import PS4Controller
 from control.autonomy import AutonomyController
+from control.navigator import Navigator
+from core.histogram import StageTimer
+from core.scheduler import AsyncScheduler, Scheduler
 from dashboard.backend.udp_bus import make_udp_sender
 from tools.live_tui import LiveTUI
 from config import (
-    SERIAL_PORT, BAUDRATE, CONTROL_HZ,
-    DASH_UDP_HOST, DASH_UDP_PORT, DASH_PUB_TELEM_HZ, DASH_PUB_TX_HZ
+    SERIAL_PORT, BAUDRATE, SERIAL_PROTOCOL, SERIAL_ASYNC_WRITE,
+    SERIAL_DELTA, SERIAL_KEYFRAME_S, SERIAL_TX_LOG,
+    SERIAL_NO_RESET, SERIAL_READY_TIMEOUT_S, CONTROL_HZ, AUTO_HZ, TUI_POLL_HZ,
+    DASH_UDP_HOST, DASH_UDP_PORT, DASH_PUB_TELEM_HZ, DASH_PUB_TX_HZ, DASH_PUB_GRID_HZ,
+    DASH_PUB_PATH_HZ, DASH_PUB_TIMING_HZ, CONTROL_HEARTBEAT_HZ, CONTROL_WAKE_MIN_S,
 )
 
 from comm.cmd_udp import CmdUdpRx
@@ -22,8 +34,23 @@ from comm.cmd_udp import CmdUdpRx
 USE_TUI = True
 USE_DASHBOARD = True
 USE_LIDAR = True
+LIDAR_PROCESS = False  # True = scanner decode di child process (shared memory), False = thread
+LIDAR_RECORD_PATH = None   # mis. "logs/scan.bin" -> rekam tiap revolusi
+LIDAR_REPLAY_PATH = None   # set ke file rekaman -> jalan tanpa lidar (ReplayLidar, real time, loop)
+LIDAR_FILTER_DEPTH = 3     # median per-bin atas N revolusi terakhir (1 = off)
+LIDAR_POLAR_SECTORS = 36   # histogram polar (min per sektor) untuk dashboard/TUI
+AUTO_PLANNER = "rules"     # "rules" (kiri vs kanan) | "gap" (follow-the-gap) | "dwa" (dynamic window)
+GAP_PLANNER_SECTORS = 180  # resolusi histogram polar untuk planner "gap" / "dwa" (2°)
+USE_GRID = True            # occupancy grid lokal (ego-centric) untuk autonomy + dashboard
+USE_SCAN_ODOM = True       # odometry dari scan matching (ICP) -> grid scroll + braking vs speed
+USE_TRACKER = True         # cluster + tracking obstacle -> time-to-collision per sektor
+USE_NAV = True             # navigasi ke goal dari dashboard {"cmd":"goal",...} (A* / D* Lite di atas grid)
+                           # butuh USE_GRID + USE_SCAN_ODOM, arah goal dipakai semua planner ("rules": saat depan lega)
+RUNTIME = "threads"        # "threads" (poll input tiap tick CONTROL_HZ) | "asyncio" (evdev/UDP/serial/auto
+                           # bangunkan task control langsung, periodik cuma heartbeat CONTROL_HEARTBEAT_HZ)
+USE_SIM = False            # simulator 2D (sim/) gantikan Arduino + lidar -> main loop tanpa hardware
+SIM_SCENARIO = ("clutter", 0)  # (corridor|room|clutter, seed), lihat sim/runner.py
 
-LIDAR_HZ = 5.0
 BOOT_SAFE_SEC = 8.0
 
 # Dashboard -> local command UDP (IN)
@@ -51,15 +78,36 @@ def main():
     # -------------------------
     # Serial link (Arduino)
     # -------------------------
-    link = SerialLink(SERIAL_PORT, BAUDRATE)
+    sim_robot = None
+    if USE_SIM:
+        from sim.lidar import SimLidar
+        from sim.link import SimSerialLink
+        from sim.robot import DiffDrive
+        from sim.runner import make_scenario
+
+        scenario = make_scenario(*SIM_SCENARIO, duration_s=float("inf"))
+        sim_robot = DiffDrive(scenario.start, world=scenario.world)
+        link = SimSerialLink(sim_robot)
+    else:
+        link = SerialLink(
+            SERIAL_PORT, BAUDRATE,
+            protocol=SERIAL_PROTOCOL,
+            async_write=SERIAL_ASYNC_WRITE,
+            delta=SERIAL_DELTA,
+            keyframe_s=SERIAL_KEYFRAME_S,
+            tx_log=SERIAL_TX_LOG,
+            no_reset=SERIAL_NO_RESET,
+            ready_timeout_s=SERIAL_READY_TIMEOUT_S,
+        )
     link.open()
 
     # -------------------------
     # Dashboard UDP publish OUT (optional)
     # -------------------------
     udp_send = make_udp_sender(DASH_UDP_HOST, DASH_UDP_PORT) if USE_DASHBOARD else None
-    last_pub_telem = 0.0
-    last_pub_tx = 0.0
+
+    # link latency + scheduler stats (histogram summaries are not free -> refresh slowly)
+    LINK_STATS_DT = 0.5
 
     # -------------------------
     # Dashboard command receiver (aim toggle + click)
@@ -80,55 +128,121 @@ def main():
     # -------------------------
     # Timing
     # -------------------------
-    dt = 1.0 / max(1, CONTROL_HZ)
+    # per-task rates / priorities: see loop(); deadlines on time.monotonic()
+    sched = AsyncScheduler() if RUNTIME == "asyncio" else Scheduler()
+    # per-stage timing (p50/p99/max per DASH_PUB_TIMING_HZ window): which stage ate the budget
+    timer = StageTimer(("cmdrx", "ps4", "mux", "send", "recv", "lidar", "auto", "keys", "debug", "tui", "publish", "stats"))
     t0 = time.time()
 
     # -------------------------
     # Autonomy + LiDAR
     # -------------------------
     auto = AutonomyController()
+    auto.planner = AUTO_PLANNER
     auto_enabled = False
 
     lidar = None
     lidar_lock = threading.Lock()
-    lidar_cache = {"min_f": None, "avg_l": None, "avg_r": None, "ts": 0.0}
+    lidar_cache = {
+        "min_f": None, "avg_l": None, "avg_r": None,
+        "p20_f": None, "p20_l": None, "p20_r": None,
+        "ts": 0.0,
+        "polar": None,
+        "odom": None,
+        "ttc": None,
+        "gap_polar": None,
+    }
 
     if USE_LIDAR:
         try:
-            lidar = LidarC1("/dev/ttyUSB0", 460800, mirror_angle=True)
+            if sim_robot is not None:
+                lidar = SimLidar(scenario.world, sim_robot, filter_depth=LIDAR_FILTER_DEPTH, start=True)
+            elif LIDAR_REPLAY_PATH:
+                lidar = ReplayLidar(LIDAR_REPLAY_PATH, speed=1.0, loop=True, filter_depth=LIDAR_FILTER_DEPTH)
+            else:
+                lidar_cls = LidarProcess if LIDAR_PROCESS else LidarC1
+                lidar = lidar_cls(
+                    "/dev/ttyUSB0", 460800, mirror_angle=True,
+                    record_path=LIDAR_RECORD_PATH, filter_depth=LIDAR_FILTER_DEPTH,
+                )
         except Exception:
             lidar = None
 
-    stop_flag = threading.Event()
-
-    def lidar_poller():
-        period = 1.0 / max(1e-6, LIDAR_HZ)
-        next_poll = time.time()
-        while not stop_flag.is_set():
-            if lidar is not None:
-                try:
-                    mf, al, ar = lidar.read_sectors()
-                    with lidar_lock:
-                        lidar_cache["min_f"] = mf
-                        lidar_cache["avg_l"] = al
-                        lidar_cache["avg_r"] = ar
-                        lidar_cache["ts"] = time.time()
-                except Exception:
-                    with lidar_lock:
-                        lidar_cache["min_f"] = None
-                        lidar_cache["avg_l"] = None
-                        lidar_cache["avg_r"] = None
-                        lidar_cache["ts"] = time.time()
-
-            next_poll += period
-            sleep_s = next_poll - time.time()
-            if sleep_s > 0:
-                time.sleep(sleep_s)
-            else:
-                next_poll = time.time()
+    grid = OccupancyGrid() if (USE_GRID and lidar is not None) else None
+    odom = ScanOdometry() if (USE_SCAN_ODOM and lidar is not None) else None
+    tracker = ObstacleTracker() if (USE_TRACKER and lidar is not None) else None
+    nav = Navigator() if (USE_NAV and grid is not None and odom is not None) else None
+
+    def on_scan(snap):
+        # runs on the scanner's publishing thread once per revolution (keep it
+        # short: stats are already computed, only the cache is updated here)
+        st = snap.sectors
+        polar_min = snap.reduce(get_layout(LIDAR_POLAR_SECTORS, len(snap.dist_mm)))[:, S_MIN]
+        polar = [None if v != v else round(float(v), 2) for v in polar_min]
+        gap_polar = None
+        if AUTO_PLANNER in ("gap", "dwa"):
+            gap_polar = snap.reduce(get_layout(GAP_PLANNER_SECTORS, len(snap.dist_mm)))[:, S_MIN]
+        f, l, r = st["front"], st["left"], st["right"]
+        with lidar_lock:
+            # same fallbacks as read_sectors(): empty front -> inf, empty side -> 0
+            lidar_cache["min_f"] = float("inf") if f["min"] is None else f["min"]
+            lidar_cache["avg_l"] = 0.0 if l["mean"] is None else l["mean"]
+            lidar_cache["avg_r"] = 0.0 if r["mean"] is None else r["mean"]
+            lidar_cache["p20_f"] = f["p20"]
+            lidar_cache["p20_l"] = l["p20"]
+            lidar_cache["p20_r"] = r["p20"]
+            lidar_cache["ts"] = snap.ts  # monotonic
+            lidar_cache["polar"] = polar
+            lidar_cache["gap_polar"] = gap_polar
+        # no wake: "auto" picks the revolution up on its next AUTO_HZ release;
+        # extra calls would tighten the per-call th/st rate limits
+
+    def perceive(snap):
+        # ICP / tracker / grid / replan: perception thread, never the scanner's thread
+        motion = None
+        if odom is not None:
+            # raw revolution: the temporal filter lags while moving
+            odom.update(snap.raw_mm if snap.raw_mm is not None else snap.dist_mm, snap.ts)
+            motion = odom.motion  # ICP step, or constant-velocity prediction on a rejected match
+            with lidar_lock:
+                lidar_cache["odom"] = {
+                    "vx": round(odom.vx, 3),
+                    "vy": round(odom.vy, 3),
+                    "wz": round(odom.wz, 3),
+                    "q": round(odom.quality, 2),
+                    "pose": [round(v, 3) for v in odom.pose],
+                }
+        if tracker is not None:
+            tracker.update(snap.dist_mm, snap.ts, motion=motion)
+            ttc = tracker.ttc_by_sector()
+            with lidar_lock:
+                lidar_cache["ttc"] = {k: (None if v == float("inf") else round(v, 2)) for k, v in ttc.items()}
+        if grid is not None:
+            if motion is not None:
+                grid.move(*motion)
+            grid.update(snap.dist_mm, snap.ts)
+            if nav is not None:
+                nav.update(grid, odom.pose, snap.ts)  # replan (D* Lite: only changed cells)
+
+    def perception_loop():
+        # latest-wins: revolutions that arrive while perceive() runs are skipped
+        seq = 0
+        while not sched.stopped:
+            snap = lidar.wait_scan(seq, timeout=0.5)
+            if snap is None:
+                continue
+            seq = snap.seq
+            try:
+                perceive(snap)
+            except Exception:
+                pass
 
+    perception = None
     if USE_LIDAR and lidar is not None:
-        threading.Thread(target=lidar_poller, daemon=True).start()
+        lidar.subscribe(on_scan)
+        if odom is not None or tracker is not None or grid is not None:
+            perception = threading.Thread(target=perception_loop, name="perception", daemon=True)
+            perception.start()
 
     # -------------------------
     # Aim source + dashboard target cache
@@ -139,211 +253,400 @@ def main():
     dash_hold = {"rx": 0.0, "ry": 0.0, "fire": False}
     dash_hold_until = 0.0  # "fresh" window (optional)
 
-    def loop(stdscr=None):
-        nonlocal t0, last_pub_tx, last_pub_telem, auto_enabled
-        nonlocal aim_source, dash_hold, dash_hold_until
-
-        if stdscr is not None:
-            curses.curs_set(0)
-            stdscr.nodelay(True)
-            stdscr.timeout(0)
-
-        next_tick = time.time()
-
-        while True:
-            loop_start = time.time()
-            now = loop_start
-            ms = int((now - t0) * 1000)
-
-            # -------------------------
-            # Keypress (optional)
-            # -------------------------
-            if stdscr is not None and tui is not None:
-                ch = stdscr.getch()
-                if ch == ord("q"):
-                    break
-                elif ch == ord("a"):
-                    auto_enabled = not auto_enabled
-                elif ch == ord("f"):
-                    tui.show_flat = not tui.show_flat
-                elif ch == ord("+"):
-                    tui.refresh_dt = max(0.05, tui.refresh_dt / 1.5)
-                elif ch == ord("-"):
-                    tui.refresh_dt = min(5.0, tui.refresh_dt * 1.5)
+    # -------------------------
+    # State shared between tasks (plain reference swaps, readers never block)
+    # -------------------------
+    pad_estop = False
+    auto_out = None      # (monotonic ts, th, st, estop) from the "auto" task, None = not driving
+    AUTO_STALE_S = 3.0 / max(1, AUTO_HZ)
+    ctl = None           # last control tick {"now", "cmd"} -> debug packet (publish / TUI)
+    telem_last = None
+    telem_seq = 0
+    last_goal_cmd = None  # poll_latest() keeps returning the last message -> apply a goal once
+
+    # ---------- foreground tasks (control path) ----------
+    def auto_tick():
+        # autonomy: fixed AUTO_HZ (rate limits in compute_drive are per call)
+        nonlocal auto_out
+        if lidar is None or not auto_enabled or pad_estop or (time.time() - t0) < BOOT_SAFE_SEC:
+            auto_out = None
+            return
+
+        now_mono = time.monotonic()
+        tt = timer.start()
+        with lidar_lock:
+            min_f = lidar_cache["min_f"]
+            avg_l = lidar_cache["avg_l"]
+            avg_r = lidar_cache["avg_r"]
+            p20_f = lidar_cache["p20_f"]
+            p20_l = lidar_cache["p20_l"]
+            p20_r = lidar_cache["p20_r"]
+            lidar_ts = lidar_cache["ts"]
+            lidar_odom = lidar_cache["odom"]
+            lidar_ttc = lidar_cache["ttc"]
+            lidar_gap_polar = lidar_cache["gap_polar"]
+        tt = timer.lap("lidar", tt)
+        if min_f is None:
+            auto_out = None  # lidar not ready -> manual
+            return
 
-            # -------------------------
-            # Read dashboard UDP (non-blocking)
-            # -------------------------
+        try:
+            if nav is not None:
+                target = nav.target_rad()
+                auto.target_rad = 0.0 if target is None else target
+                auto.speed_scale = nav.speed_scale()
+
+            # robust p20 distances per sector; compute_drive falls back to min/avg when None
+            th_auto, st_auto, auto_estop = auto.compute_drive(
+                min_f, avg_l, avg_r,
+                front_dist=p20_f,
+                left_dist=p20_l,
+                right_dist=p20_r,
+                now=now_mono,
+                lidar_timestamp=lidar_ts or None,
+                grid=grid,
+                speed=(lidar_odom or {}).get("vx"),
+                ttc=(lidar_ttc or {}).get("front"),
+                scan=lidar_gap_polar,
+            )
+        except Exception:
+            auto_out = None
+            return
+        timer.lap("auto", tt)
+
+        if nav is not None and nav.status == "reached":
+            # parkir di goal sampai goal baru / cancel
+            th_auto = 0.0
+            st_auto = 0.0
+        auto_out = (now_mono, th_auto, st_auto, auto_estop)
+        if RUNTIME == "asyncio":
+            sched.wake("control")  # control only has a heartbeat period here
+
+    def apply_dash_cmd(dash_cmd):
+        nonlocal aim_source, dash_hold, dash_hold_until, last_goal_cmd
+        c = dash_cmd.get("cmd")
+
+        # Aim toggle: {"cmd":"aim","aim_source":"dashboard","ts":...}
+        if isinstance(c, str) and c == "aim":
+            src = dash_cmd.get("aim_source")
+            if src in ("controller", "dashboard"):
+                aim_source = src
+
+        # Goal: {"cmd":"goal","x":..,"y":..,"frame":"robot"} / {"cmd":"goal","cancel":true}
+        if isinstance(c, str) and c == "goal" and nav is not None and dash_cmd is not last_goal_cmd:
+            last_goal_cmd = dash_cmd
+            nav.handle_cmd(dash_cmd)
+
+        # Click payload: {"cmd":{...,"turret":{"rx":..,"ry":..,"fire":..}},"meta":...,"ts":...}
+        if isinstance(c, dict):
+            t = c.get("turret")
+            if isinstance(t, dict) and ("rx" in t) and ("ry" in t):
+                dash_hold = {
+                    "rx": clampf(t.get("rx", dash_hold["rx"])),
+                    "ry": clampf(t.get("ry", dash_hold["ry"])),
+                    "fire": bool(t.get("fire", dash_hold["fire"])),
+                }
+                dash_hold_until = time.time() + 1.5  # hold "fresh" 1.5s
+
+    def recv_telem():
+        nonlocal telem_last, telem_seq
+        tt = timer.start()
+        telem = link.recv_latest()
+        if telem is not None:
+            telem_last = telem
+            telem_seq += 1
+        timer.lap("recv", tt)
+
+    def on_dash_msg(dash_cmd):
+        # asyncio runtime: every datagram, on the loop, as it arrives
+        tt = timer.start()
+        apply_dash_cmd(dash_cmd)
+        timer.lap("cmdrx", tt)
+        sched.wake("control")
+
+    def control_tick():
+        # dashboard cmd + PS4 + drive mux + serial send/recv: never waits on publish / TUI
+        nonlocal pad_estop, ctl
+
+        now = time.time()
+        ms = int((now - t0) * 1000)
+
+        # -------------------------
+        # Read dashboard UDP (non-blocking; asyncio runtime: on_dash_msg)
+        # -------------------------
+        if RUNTIME != "asyncio":
+            tt = timer.start()
             dash_cmd = cmdrx.poll_latest()
             if dash_cmd:
-                c = dash_cmd.get("cmd")
-
-                # Aim toggle: {"cmd":"aim","aim_source":"dashboard","ts":...}
-                if isinstance(c, str) and c == "aim":
-                    src = dash_cmd.get("aim_source")
-                    if src in ("controller", "dashboard"):
-                        aim_source = src
-
-                # Click payload: {"cmd":{...,"turret":{"rx":..,"ry":..,"fire":..}},"meta":...,"ts":...}
-                if isinstance(c, dict):
-                    t = c.get("turret")
-                    if isinstance(t, dict) and ("rx" in t) and ("ry" in t):
-                        dash_hold = {
-                            "rx": clampf(t.get("rx", dash_hold["rx"])),
-                            "ry": clampf(t.get("ry", dash_hold["ry"])),
-                            "fire": bool(t.get("fire", dash_hold["fire"])),
-                        }
-                        dash_hold_until = time.time() + 1.5  # hold "fresh" 1.5s
-
-            # -------------------------
-            # Read PS4
-            # -------------------------
-            ps4.update()
-            throttle, steer, rx, ry, fire_event, estop_from_pad = ps4.get_manual_command()
-
-            # -------------------------
-            # Boot-safe
-            # -------------------------
-            elapsed = now - t0
-            boot_safe = elapsed < BOOT_SAFE_SEC
-
-            mode = "safe" if boot_safe else "manual"
-            estop = True if boot_safe else estop_from_pad
-
-            # drive defaults
-            th_out = 0.0 if boot_safe else clamp(throttle, -0.8, 0.8)
-            st_out = 0.0 if boot_safe else clamp(steer, -1.0, 1.0)
-
-            # controller turret defaults
-            rx_out = 0.0 if boot_safe else clamp(rx, -1.0, 1.0)
-            ry_out = 0.0 if boot_safe else clamp(ry, -1.0, 1.0)
-            fire_out = False if boot_safe else fire_event
-
-            # -------------------------
-            # Read LiDAR cache
-            # -------------------------
-            with lidar_lock:
-                min_f = lidar_cache["min_f"]
-                avg_l = lidar_cache["avg_l"]
-                avg_r = lidar_cache["avg_r"]
-                lidar_ts = lidar_cache["ts"]
-
-            # -------------------------
-            # AUTO override (drive only)
-            # -------------------------
-            if (not boot_safe) and auto_enabled and (lidar is not None) and (not estop):
-                try:
-                    if min_f is None:
-                        raise RuntimeError("lidar not ready")
-
-                    th_auto, st_auto, auto_estop = auto.compute_drive(min_f, avg_l, avg_r)
-
-                    mode = "auto"
-                    th_out = clamp(th_auto, -0.8, 0.8)
-                    st_out = clamp(st_auto, -1.0, 1.0)
-
-                    if auto_estop:
-                        mode = "safe"
-                        estop = True
-                        th_out = 0.0
-                        st_out = 0.0
-                except Exception:
-                    mode = "manual"
-
-            # -------------------------
-            # Turret mux: controller vs dashboard
-            # -------------------------
-            if boot_safe:
-                turret_out = {"rx": 0.0, "ry": 0.0, "fire": False}
-                turret_mode = 0
+                apply_dash_cmd(dash_cmd)
+            timer.lap("cmdrx", tt)
+        tt = timer.start()
+
+        # -------------------------
+        # Read PS4
+        # -------------------------
+        ps4.update()
+        throttle, steer, rx, ry, fire_event, estop_from_pad = ps4.get_manual_command()
+        pad_estop = estop_from_pad
+        tt = timer.lap("ps4", tt)
+
+        # -------------------------
+        # Boot-safe
+        # -------------------------
+        elapsed = now - t0
+        boot_safe = elapsed < BOOT_SAFE_SEC
+
+        mode = "safe" if boot_safe else "manual"
+        estop = True if boot_safe else estop_from_pad
+
+        # drive defaults
+        th_out = 0.0 if boot_safe else clamp(throttle, -0.8, 0.8)
+        st_out = 0.0 if boot_safe else clamp(steer, -1.0, 1.0)
+
+        # controller turret defaults
+        rx_out = 0.0 if boot_safe else clamp(rx, -1.0, 1.0)
+        ry_out = 0.0 if boot_safe else clamp(ry, -1.0, 1.0)
+        fire_out = False if boot_safe else fire_event
+
+        # -------------------------
+        # AUTO override (drive only), latest output of the "auto" task
+        # -------------------------
+        a = auto_out
+        if (not boot_safe) and auto_enabled and (lidar is not None) and (not estop) and a is not None:
+            mode = "auto"
+            if time.monotonic() - a[0] > AUTO_STALE_S:
+                # autonomy task stalled -> stop instead of replaying an old command
+                th_out = 0.0
+                st_out = 0.0
+            elif a[3]:
+                mode = "safe"
+                estop = True
+                th_out = 0.0
+                st_out = 0.0
             else:
-                if aim_source == "dashboard":
-                    turret_mode = 1  # POS mode
-
-                    # IMPORTANT: do not reset to 0 when no new click.
-                    turret_out = dash_hold
+                th_out = clamp(a[1], -0.8, 0.8)
+                st_out = clamp(a[2], -1.0, 1.0)
+
+        # -------------------------
+        # Turret mux: controller vs dashboard
+        # -------------------------
+        if boot_safe:
+            turret_out = {"rx": 0.0, "ry": 0.0, "fire": False}
+            turret_mode = 0
+        else:
+            if aim_source == "dashboard":
+                turret_mode = 1  # POS mode
 
-                    # allow controller fire even in dashboard aim (optional)
-                    if fire_out:
-                        turret_out = {**turret_out, "fire": True}
-                else:
-                    turret_mode = 0  # RATE mode
-                    turret_out = {"rx": rx_out, "ry": ry_out, "fire": fire_out}
+                # IMPORTANT: do not reset to 0 when no new click.
+                turret_out = dash_hold
 
-            # -------------------------
-            # Build Arduino command
-            # -------------------------
-            cmd_arduino = {
-                "t": ms,
-                "cmd": "set",
-                "mode": mode,
-                "estop": estop,
-                "drive": {"th": th_out, "st": st_out},
-                "turret": {
-                    "rx": float(turret_out["rx"]),
-                    "ry": float(turret_out["ry"]),
-                    "fire": bool(turret_out["fire"]),
-                    "mode": int(turret_mode),
+                # allow controller fire even in dashboard aim (optional)
+                if fire_out:
+                    turret_out = {**turret_out, "fire": True}
+            else:
+                turret_mode = 0  # RATE mode
+                turret_out = {"rx": rx_out, "ry": ry_out, "fire": fire_out}
+
+        # -------------------------
+        # Build Arduino command
+        # -------------------------
+        cmd_arduino = {
+            "t": ms,
+            "cmd": "set",
+            "mode": mode,
+            "estop": estop,
+            "drive": {"th": th_out, "st": st_out},
+            "turret": {
+                "rx": float(turret_out["rx"]),
+                "ry": float(turret_out["ry"]),
+                "fire": bool(turret_out["fire"]),
+                "mode": int(turret_mode),
+            },
+        }
+        tt = timer.lap("mux", tt)
+
+        link.send(cmd_arduino)
+        timer.lap("send", tt)
+
+        # -------------------------
+        # Telemetry (asyncio runtime: link.on_rx)
+        # -------------------------
+        if RUNTIME != "asyncio":
+            recv_telem()
+
+        ctl = {"now": now, "cmd": cmd_arduino}
+
+    # ---------- background tasks (dashboard / TUI / stats) ----------
+    link_stats = {}
+    sched_stats = {}
+    timing_stats = None
+    debug_src = None
+    debug_last = None
+    telem_pub_seq = 0
+
+    def make_debug():
+        """Debug packet for the dashboard/TUI from the last control tick (built once per tick)."""
+        nonlocal debug_src, debug_last
+        c = ctl
+        if c is None or c is debug_src:
+            return debug_last
+        tt = timer.start()
+        now_mono = time.monotonic()
+        with lidar_lock:
+            min_f = lidar_cache["min_f"]
+            avg_l = lidar_cache["avg_l"]
+            avg_r = lidar_cache["avg_r"]
+            p20_f = lidar_cache["p20_f"]
+            p20_l = lidar_cache["p20_l"]
+            p20_r = lidar_cache["p20_r"]
+            lidar_ts = lidar_cache["ts"]
+            lidar_polar = lidar_cache["polar"]
+            lidar_odom = lidar_cache["odom"]
+            lidar_ttc = lidar_cache["ttc"]
+        control = sched.task("control")
+        debug_src = c
+        debug_last = {
+            "ts": c["now"],
+            "src": "pi",
+            "cmd": c["cmd"],
+            "meta": {
+                "aim_source": aim_source,
+                "dash_cmd_age_s": cmdrx.age_s,
+                "loop_cost_ms": control.last_cost_s * 1000.0,
+                "auto_enabled": auto_enabled,
+                "link": link_stats,
+                "sched": sched_stats,  # per task: runs/overruns/skipped + late_ms/cost_ms p50..max
+                "timing": timing_stats,  # per stage ms p50/p99/max (event "timing")
+                "lidar": {
+                    "min_front": min_f,
+                    "avg_left": avg_l,
+                    "avg_right": avg_r,
+                    "p20_front": p20_f,
+                    "p20_left": p20_l,
+                    "p20_right": p20_r,
+                    "age_s": (now_mono - lidar_ts) if lidar_ts else None,
+                    "polar_min": lidar_polar,  # LIDAR_POLAR_SECTORS, sektor 0 = depan
+                    "odom": lidar_odom,  # scan matching: vx/vy m/s, wz rad/s, q 0..1
+                    "ttc": lidar_ttc,    # detik per sektor (None = tidak ada yang mendekat)
                 },
-            }
-
-            link.send(cmd_arduino)
-
-            # -------------------------
-            # Telemetry
-            # -------------------------
-            telem = link.recv_latest()
+                # navigasi ringkas (path lengkap di event "path")
+                "nav": None if nav is None else {
+                    "status": nav.status,
+                    "mode": nav.last_mode,
+                    "replan_ms": round(nav.last_replan_ms, 2),
+                },
+            },
+            "telem": telem_last,
+        }
+        timer.lap("debug", tt)
+        return debug_last
+
+    def stats_tick():
+        # histogram summaries are not free -> refresh slowly
+        nonlocal link_stats, sched_stats
+        tt = timer.start()
+        link_stats = link.stats()
+        sched_stats = sched.stats()
+        timer.lap("stats", tt)
+
+    def timing_tick():
+        # one window per DASH_PUB_TIMING_HZ period, then start over (jitter hunting wants "now")
+        nonlocal timing_stats
+        timing_stats = timer.summary(reset=True)
+        if USE_DASHBOARD and udp_send is not None:
+            udp_send({"ts": time.time(), "src": "pi", "type": "timing", "data": timing_stats})
+
+    def pub_tx():
+        debug = make_debug()
+        if debug is not None:
+            tt = timer.start()
+            udp_send({"ts": time.time(), "src": "pi", "type": "tx", "data": debug})
+            timer.lap("publish", tt)
+
+    def pub_telem():
+        nonlocal telem_pub_seq
+        if telem_last and telem_seq != telem_pub_seq:
+            telem_pub_seq = telem_seq
+            tt = timer.start()
+            udp_send({"ts": time.time(), "src": "arduino", "type": "telem", "data": telem_last})
+            timer.lap("publish", tt)
+
+    def pub_grid():
+        tt = timer.start()
+        udp_send({"ts": time.time(), "src": "pi", "type": "grid", "data": grid.export()})
+        timer.lap("publish", tt)
+
+    def pub_path():
+        tt = timer.start()
+        udp_send({"ts": time.time(), "src": "pi", "type": "path", "data": nav.export()})
+        timer.lap("publish", tt)
 
+    def loop(stdscr=None):
+        def tui_tick():
+            nonlocal auto_enabled
             # -------------------------
-            # Debug packet (dashboard/TUI)
+            # Keypress
             # -------------------------
-            loop_cost_ms = (time.time() - loop_start) * 1000.0
-            debug = {
-                "ts": now,
-                "src": "pi",
-                "cmd": cmd_arduino,
-                "meta": {
-                    "aim_source": aim_source,
-                    "dash_cmd_age_s": cmdrx.age_s,
-                    "loop_cost_ms": loop_cost_ms,
-                    "auto_enabled": auto_enabled,
-                    "lidar": {
-                        "min_front": min_f,
-                        "avg_left": avg_l,
-                        "avg_right": avg_r,
-                        "age_s": (now - lidar_ts) if lidar_ts else None,
-                    },
-                },
-                "telem": telem,
-            }
-
-            # publish to dashboard (optional)
-            if USE_DASHBOARD and udp_send is not None:
-                if (now - last_pub_tx) >= (1.0 / max(1, DASH_PUB_TX_HZ)):
-                    last_pub_tx = now
-                    udp_send({"ts": now, "src": "pi", "type": "tx", "data": debug})
-
-                if telem and (now - last_pub_telem) >= (1.0 / max(1, DASH_PUB_TELEM_HZ)):
-                    last_pub_telem = now
-                    udp_send({"ts": now, "src": "arduino", "type": "telem", "data": telem})
-
-            # TUI
-            if stdscr is not None and tui is not None:
+            tt = timer.start()
+            ch = stdscr.getch()
+            if ch == ord("q"):
+                sched.stop()
+                return
+            elif ch == ord("a"):
+                auto_enabled = not auto_enabled
+            elif ch == ord("f"):
+                tui.show_flat = not tui.show_flat
+            elif ch == ord("+"):
+                tui.refresh_dt = max(0.05, tui.refresh_dt / 1.5)
+            elif ch == ord("-"):
+                tui.refresh_dt = min(5.0, tui.refresh_dt * 1.5)
+            timer.lap("keys", tt)
+
+            debug = make_debug()
+            if debug is not None:
+                # redraw is throttled by tui.refresh_dt
+                tt = timer.start()
                 tui.update(
                     stdscr=stdscr,
-                    now=now,
-                    telem=telem,
+                    now=time.time(),
+                    telem=telem_last,
                     cmd=debug,
                     link_age_s=link.last_rx_age_s,
                 )
+                timer.lap("tui", tt)
 
-            # pacing
-            next_tick += dt
-            sleep_s = next_tick - time.time()
-            if sleep_s > 0:
-                time.sleep(sleep_s)
-            else:
-                next_tick = time.time()
+        if stdscr is not None:
+            curses.curs_set(0)
+            stdscr.nodelay(True)
+            stdscr.timeout(0)
+
+        # lower priority runs first when several tasks are due in the same thread
+        if lidar is not None:
+            sched.add("auto", auto_tick, max(1, AUTO_HZ), priority=0)
+        if RUNTIME == "asyncio":
+            # inputs wake "control" as they arrive; the period is the failsafe heartbeat
+            sched.add("control", control_tick, max(1, CONTROL_HEARTBEAT_HZ), priority=1, wake=True,
+                      min_gap_s=CONTROL_WAKE_MIN_S)
+            sched.add_source(lambda: cmdrx.run_asyncio(on_dash_msg))
+            sched.add_source(lambda: ps4.run_asyncio(lambda: sched.wake("control")))
+            link.on_rx = lambda: sched.call_soon(recv_telem)
+        else:
+            sched.add("control", control_tick, max(1, CONTROL_HZ), priority=1, wake=True,
+                      min_gap_s=CONTROL_WAKE_MIN_S)
+
+        sched.add("stats", stats_tick, 1.0 / LINK_STATS_DT, priority=4, background=True)
+        sched.add("timing", timing_tick, max(1, DASH_PUB_TIMING_HZ), priority=4, background=True)
+        if USE_DASHBOARD and udp_send is not None:
+            sched.add("pub_telem", pub_telem, max(1, DASH_PUB_TELEM_HZ), priority=1, background=True)
+            sched.add("pub_tx", pub_tx, max(1, DASH_PUB_TX_HZ), priority=2, background=True)
+            if nav is not None:
+                sched.add("pub_path", pub_path, max(1, DASH_PUB_PATH_HZ), priority=3, background=True)
+            if grid is not None:
+                sched.add("pub_grid", pub_grid, max(1, DASH_PUB_GRID_HZ), priority=3, background=True)
+        if stdscr is not None and tui is not None:
+            sched.add("tui", tui_tick, max(1, TUI_POLL_HZ), priority=5, background=True)
+
+        sched.run()
 
     try:
         if USE_TUI:
@@ -351,27 +654,16 @@ def main():
         else:
             loop(None)
     finally:
-        stop_flag.set()
-
         try:
             cmdrx.close()
         except Exception:
             pass
 
-        # safe-stop
-        try:
-            link.send({
-                "cmd": "set",
-                "mode": "safe",
-                "estop": True,
-                "drive": {"th": 0.0, "st": 0.0},
-                "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
-            })
-        except Exception:
-            pass
-
-        link.close()
+        # close() drains the writer and flushes a final safe-stop frame
+        link.close(safe_stop=True)
 
+        if perception is not None:
+            perception.join(timeout=1.0)
         if lidar is not None:
             try:
                 lidar.close()
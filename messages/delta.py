@@ -0,0 +1,104 @@
+# messages/delta.py
+# Delta/keyframe encoding for JSON "set" commands.
+#
+#   keyframe : {"cmd":"set","s":12,"t":..., <all fields>}
+#   delta    : {"cmd":"d","s":13, <only changed fields, nested like "set">}
+#
+# "s" is a u16 sequence number shared by keyframes and deltas. Deltas are
+# applied on top of the receiver's current state, so a receiver that sees a
+# gap in "s" must ignore deltas and answer {"type":"resync"}; the next frame
+# is then a keyframe. A delta with no fields is still sent as a heartbeat.
+import time
+from typing import Any, Dict, Optional
+
+# fields never diffed (sent in keyframes only / framing)
+_SKIP = ("cmd", "t", "s")
+
+
+def quantize(obj: Any, ndigits: int) -> Any:
+    if isinstance(obj, dict):
+        return {k: quantize(v, ndigits) for k, v in obj.items()}
+    if isinstance(obj, float):
+        return round(obj, ndigits)
+    return obj
+
+
+def diff(prev: Dict[str, Any], cur: Dict[str, Any]) -> Dict[str, Any]:
+    """Nested partial dict of fields in `cur` that differ from `prev`."""
+    out: Dict[str, Any] = {}
+    for k, v in cur.items():
+        if k in _SKIP:
+            continue
+        p = prev.get(k)
+        if isinstance(v, dict):
+            sub = diff(p if isinstance(p, dict) else {}, v)
+            if sub:
+                out[k] = sub
+        elif p != v or type(p) is not type(v):
+            out[k] = v
+    return out
+
+
+def apply(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge a delta into `state` in place (receiver side / simulators)."""
+    for k, v in delta.items():
+        if k in _SKIP:
+            continue
+        if isinstance(v, dict) and isinstance(state.get(k), dict):
+            apply(state[k], v)
+        else:
+            state[k] = v
+    return state
+
+
+class DeltaEncoder:
+    """
+    Turns full "set" commands into keyframes/deltas.
+    - keyframe every `keyframe_s` seconds, on request_keyframe(), or when estop changes
+    - floats are rounded to `ndigits` so sensor noise doesn't defeat the diff
+    """
+
+    def __init__(self, keyframe_s: float = 1.0, ndigits: int = 3):
+        self.keyframe_s = keyframe_s
+        self.ndigits = ndigits
+
+        self._seq = 0
+        self._last: Optional[Dict[str, Any]] = None
+        self._last_key_ts = 0.0
+        self._force_key = True
+
+        self.keyframes = 0
+        self.deltas = 0
+        self.resyncs = 0
+
+    def request_keyframe(self, resync: bool = False):
+        self._force_key = True
+        if resync:
+            self.resyncs += 1
+
+    def encode(self, cmd: Dict[str, Any], now: Optional[float] = None, seq: Optional[int] = None) -> Dict[str, Any]:
+        """`seq` lets the caller share one sequence counter with other frame types."""
+        now = time.monotonic() if now is None else now
+        cur = quantize(cmd, self.ndigits)
+        self._seq = ((self._seq + 1) if seq is None else seq) & 0xFFFF
+
+        key = (
+            self._force_key
+            or self._last is None
+            or (now - self._last_key_ts) >= self.keyframe_s
+            or bool(cur.get("estop")) != bool(self._last.get("estop"))
+        )
+        if key:
+            self._force_key = False
+            self._last_key_ts = now
+            self._last = cur
+            self.keyframes += 1
+            out = {"cmd": "set", "s": self._seq}
+            out.update((k, v) for k, v in cur.items() if k != "cmd")
+            return out
+
+        out = {"cmd": "d", "s": self._seq}
+        out.update(diff(self._last, cur))
+        self._last = cur
+        self.deltas += 1
+        return out
@@ -0,0 +1,194 @@
+# messages/frame.py
+# Compact binary frames for the Pi <-> Arduino serial link.
+#
+# Wire format (one frame):
+#   COBS( type:u8 | seq:u16 | payload | crc16:u16 ) + 0x00
+#
+# - COBS removes every 0x00 from the frame so 0x00 can be the delimiter
+# - CRC16-CCITT (poly 0x1021, init 0xFFFF) over type|seq|payload
+# - all integers little-endian (same as AVR)
+#
+# Float fields are sent as fixed point:
+#   drive/turret axes : int16, value * AXIS_SCALE  ([-1..1] -> [-10000..10000])
+#   angles (deg)      : int16, value * DEG_SCALE   (0.01 deg resolution)
+import binascii
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+PROTO_NAME = "bin1"
+
+FT_SET = 0x01    # Pi -> Arduino : set command
+FT_STAT = 0x81   # Arduino -> Pi : telemetry record
+
+AXIS_SCALE = 10000.0
+DEG_SCALE = 100.0
+
+MODES = ("safe", "manual", "auto")
+_MODE_ID = {m: i for i, m in enumerate(MODES)}
+
+FLAG_ESTOP = 0x01
+FLAG_FIRE = 0x02
+
+# header: type, seq
+_HDR = struct.Struct("<BH")
+_CRC = struct.Struct("<H")
+
+# set: t_ms, mode, flags, th, st, rx, ry, turret_mode
+SET_FMT = struct.Struct("<IBBhhhhB")
+
+# stat: t_ms, ack (seq of last applied set), mode, flags, th, st, rx_act, ry_act, yaw_deg, pitch_deg
+STAT_FMT = struct.Struct("<IHBBhhhhhh")
+
+
+def crc16(data, crc: int = 0xFFFF) -> int:
+    """CRC16-CCITT (false). binascii.crc_hqx is the same polynomial, in C."""
+    return binascii.crc_hqx(data, crc)
+
+
+def cobs_encode(data: bytes) -> bytes:
+    out = bytearray()
+    for chunk in data.split(b"\x00"):
+        # blocks longer than 254 bytes are split with a 0xFF code (no implied zero)
+        while len(chunk) >= 254:
+            out.append(0xFF)
+            out += chunk[:254]
+            chunk = chunk[254:]
+        out.append(len(chunk) + 1)
+        out += chunk
+    return bytes(out)
+
+
+def cobs_decode(data) -> bytes:
+    out = bytearray()
+    i = 0
+    n = len(data)
+    while i < n:
+        code = data[i]
+        if code == 0:
+            raise ValueError("cobs: zero byte inside frame")
+        end = i + code
+        if end > n:
+            raise ValueError("cobs: truncated block")
+        out += data[i + 1:end]
+        i = end
+        if code != 0xFF and i < n:
+            out.append(0)
+    return bytes(out)
+
+
+def _axis(x) -> int:
+    v = int(round(float(x) * AXIS_SCALE))
+    return -32767 if v < -32767 else 32767 if v > 32767 else v
+
+
+def _deg(x) -> int:
+    v = int(round(float(x) * DEG_SCALE))
+    return -32767 if v < -32767 else 32767 if v > 32767 else v
+
+
+def encode_frame(ftype: int, seq: int, payload: bytes) -> bytes:
+    body = _HDR.pack(ftype, seq & 0xFFFF) + payload
+    return cobs_encode(body + _CRC.pack(crc16(body))) + b"\x00"
+
+
+def decode_frame(frame) -> Tuple[int, int, bytes]:
+    """
+    Decode one frame WITHOUT the trailing 0x00.
+    Returns (type, seq, payload). Raises ValueError on bad COBS/CRC.
+    """
+    raw = cobs_decode(frame)
+    if len(raw) < _HDR.size + _CRC.size:
+        raise ValueError("frame too short")
+    body, crc_rx = raw[:-2], _CRC.unpack_from(raw, len(raw) - 2)[0]
+    if crc16(body) != crc_rx:
+        raise ValueError("crc mismatch")
+    ftype, seq = _HDR.unpack_from(body, 0)
+    return ftype, seq, body[_HDR.size:]
+
+
+def pack_set(cmd: Dict[str, Any], seq: int) -> bytes:
+    """Encode a `{"cmd":"set",...}` dict (main.py layout) as a binary frame."""
+    drive = cmd.get("drive") or {}
+    turret = cmd.get("turret") or {}
+    flags = 0
+    if cmd.get("estop"):
+        flags |= FLAG_ESTOP
+    if turret.get("fire"):
+        flags |= FLAG_FIRE
+    payload = SET_FMT.pack(
+        int(cmd.get("t", 0)) & 0xFFFFFFFF,
+        _MODE_ID.get(cmd.get("mode"), 0),
+        flags,
+        _axis(drive.get("th", 0.0)),
+        _axis(drive.get("st", 0.0)),
+        _axis(turret.get("rx", 0.0)),
+        _axis(turret.get("ry", 0.0)),
+        int(turret.get("mode", 0)) & 0xFF,
+    )
+    return encode_frame(FT_SET, seq, payload)
+
+
+def unpack_set(payload: bytes) -> Dict[str, Any]:
+    t, mode, flags, th, st, rx, ry, tmode = SET_FMT.unpack(payload)
+    return {
+        "t": t,
+        "cmd": "set",
+        "mode": MODES[mode] if mode < len(MODES) else "safe",
+        "estop": bool(flags & FLAG_ESTOP),
+        "drive": {"th": th / AXIS_SCALE, "st": st / AXIS_SCALE},
+        "turret": {
+            "rx": rx / AXIS_SCALE,
+            "ry": ry / AXIS_SCALE,
+            "fire": bool(flags & FLAG_FIRE),
+            "mode": tmode,
+        },
+    }
+
+
+def pack_stat(stat: Dict[str, Any], seq: int) -> bytes:
+    """Encode a telemetry dict (Arduino side / simulators)."""
+    drive = stat.get("drive") or {}
+    flags = FLAG_ESTOP if stat.get("estop") else 0
+    payload = STAT_FMT.pack(
+        int(stat.get("t", 0)) & 0xFFFFFFFF,
+        int(stat.get("ack", 0)) & 0xFFFF,
+        _MODE_ID.get(stat.get("mode"), 0),
+        flags,
+        _axis(drive.get("th", 0.0)),
+        _axis(drive.get("st", 0.0)),
+        _axis(stat.get("rx_act", 0.0)),
+        _axis(stat.get("ry_act", 0.0)),
+        _deg(stat.get("yaw_deg", 0.0)),
+        _deg(stat.get("pitch_deg", 0.0)),
+    )
+    return encode_frame(FT_STAT, seq, payload)
+
+
+def unpack_stat(payload: bytes) -> Dict[str, Any]:
+    """Decode a telemetry payload into the same dict shape as JSON telemetry."""
+    t, ack, mode, flags, th, st, rx, ry, yaw, pitch = STAT_FMT.unpack(payload)
+    return {
+        "type": "stat",
+        "t": t,
+        "ack": ack,
+        "mode": MODES[mode] if mode < len(MODES) else "safe",
+        "estop": bool(flags & FLAG_ESTOP),
+        "drive": {"th": th / AXIS_SCALE, "st": st / AXIS_SCALE},
+        "rx_act": rx / AXIS_SCALE,
+        "ry_act": ry / AXIS_SCALE,
+        "yaw_deg": yaw / DEG_SCALE,
+        "pitch_deg": pitch / DEG_SCALE,
+    }
+
+
+def parse_frame(frame) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """
+    Decode a frame into (seq, dict). Returns None for unknown frame types.
+    Raises ValueError on corrupted frames.
+    """
+    ftype, seq, payload = decode_frame(frame)
+    if ftype == FT_STAT and len(payload) == STAT_FMT.size:
+        return seq, unpack_stat(payload)
+    if ftype == FT_SET and len(payload) == SET_FMT.size:
+        return seq, unpack_set(payload)
+    return None
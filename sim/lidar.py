@@ -0,0 +1,117 @@
+# sim/lidar.py
+# Simulated lidar: ray-cast revolutions in the LidarC1 format (binned mm,
+# mirrored / counter-clockwise angles, bin 0 = front).
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from core.lidar_scan import MAX_RANGE_M, MIN_RANGE_M, ScanHub, ScanSnapshot, ScanSource, make_filter
+from sim.robot import DiffDrive
+from sim.world import World
+
+
+class SimLidar(ScanSource):
+    """
+    Stand-in for LidarC1 (read_sectors, read_sector_stats, read_layout,
+    read_scan, subscribe/wait_scan, last_age_s, scan_seq, close).
+    - scan(ts): deterministic, caller-driven revolution at the robot's
+      current pose (batch runs use the sim clock as ts)
+    - start=True: thread publishing at rate_hz stamped with time.monotonic()
+      (drop-in for main.py)
+    - noise_mm: gaussian range noise, dropout: fraction of bins without a return
+    """
+
+    def __init__(
+        self,
+        world: World,
+        robot: DiffDrive,
+        n_bins: int = 720,
+        rate_hz: float = 10.0,
+        noise_mm: float = 10.0,
+        dropout: float = 0.02,
+        max_range_m: float = MAX_RANGE_M,
+        filter_depth: int = 1,
+        filter_mode: str = "median",
+        seed: Optional[int] = None,
+        start: bool = False,
+    ):
+        self.world = world
+        self.robot = robot
+        self.n_bins = n_bins
+        self.rate_hz = rate_hz
+        self.noise_mm = noise_mm
+        self.dropout = dropout
+        self.max_range_m = max_range_m
+        self.angles_deg = (np.arange(n_bins) + 0.5) * (360.0 / n_bins)
+        self._rng = np.random.default_rng(seed)
+        self.hub = ScanHub(make_filter(n_bins, filter_depth, filter_mode))
+
+        self._seq = 0
+        self._ts = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self.start()
+
+    # ---------- scanning ----------
+    def ranges_mm(self) -> np.ndarray:
+        """One noisy revolution at the robot's current pose (float32 mm, NaN = no return)."""
+        p = self.robot.pose
+        d = self.world.raycast_bins(p.x, p.y, p.theta, self.n_bins, self.max_range_m)
+        if self.noise_mm > 0:
+            d = d + self._rng.normal(0.0, self.noise_mm / 1000.0, d.shape)
+        if self.dropout > 0:
+            d[self._rng.random(d.shape) < self.dropout] = np.inf
+        d[(d < MIN_RANGE_M) | ~np.isfinite(d)] = np.nan
+        return (d * 1000.0).astype(np.float32)
+
+    def scan(self, ts: float) -> ScanSnapshot:
+        self._seq += 1
+        self._ts = ts
+        snap = ScanSnapshot(self._seq, ts, self.ranges_mm(), self.angles_deg)
+        self.hub.publish(snap)
+        return snap
+
+    # ---------- lifecycle ----------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        period = 1.0 / max(1e-6, self.rate_hz)
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            self.scan(time.monotonic())
+            next_t += period
+            wait_s = next_t - time.monotonic()
+            if wait_s > 0:
+                self._stop.wait(wait_s)
+            else:
+                next_t = time.monotonic()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+    # ---------- LidarC1 interface ----------
+    @property
+    def last_age_s(self) -> float:
+        if self._ts <= 0:
+            return 999.0
+        return time.monotonic() - self._ts
+
+    @property
+    def scan_seq(self) -> int:
+        return self._seq
+
+    def read_scan(self) -> ScanSnapshot:
+        snap = self.hub.latest
+        if snap is None:
+            return ScanSnapshot(0, 0.0, np.full(self.n_bins, np.nan, dtype=np.float32), self.angles_deg)
+        return snap
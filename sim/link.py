@@ -0,0 +1,161 @@
+# sim/link.py
+# SerialLink stand-in that drives the simulated robot instead of an Arduino.
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from comm.rx_buffer import LatestSlot
+from sim.robot import DiffDrive
+
+
+class SimSerialLink:
+    """
+    Same surface as comm.serial_link.SerialLink (open, send, recv_latest,
+    read_all_since, stats, close, connected, last_rx_age_s, on_rx) with the
+    firmware behaviour of tools/virtual_arduino.py: commands are applied after
+    `delay_s`, estop or no command for `failsafe_s` -> wheels stop, telemetry
+    {"type":"stat",...} (plus a "sim" pose block) after every physics step.
+    - step(dt, now): deterministic, caller-driven physics (batch runs)
+    - open(): physics thread at physics_hz on time.monotonic() (main.py)
+    """
+
+    def __init__(
+        self,
+        robot: DiffDrive,
+        delay_s: float = 0.0,
+        failsafe_s: float = 0.5,
+        physics_hz: float = 100.0,
+        rx_history: int = 256,
+    ):
+        self.robot = robot
+        self.delay_s = delay_s
+        self.failsafe_s = failsafe_s
+        self.physics_hz = physics_hz
+
+        self.rx_slot = LatestSlot(history=rx_history)
+        self.state: Dict[str, Any] = {}
+        self._pending: deque = deque()
+        self._lock = threading.Lock()
+        self._now = 0.0
+        self._last_cmd_ts = -1e9
+        self._last_rx_ts = 0.0
+        self._t0 = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._open = False
+
+        self.tx_sent = 0
+        self.rx_frames = 0
+        self.proto = "sim"
+        self.on_rx: Optional[Callable[[], None]] = None
+
+    # ---------- lifecycle ----------
+    def open(self):
+        self._open = True
+        self._now = time.monotonic()
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self, safe_stop: bool = True):
+        if safe_stop:
+            with self._lock:
+                self._pending.clear()
+                self.state = {"mode": "safe", "estop": True, "drive": {"th": 0.0, "st": 0.0}}
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._open = False
+
+    def _run(self):
+        period = 1.0 / max(1e-6, self.physics_hz)
+        last = time.monotonic()
+        while not self._stop.wait(period):
+            now = time.monotonic()
+            self.step(now - last, now)
+            last = now
+
+    # ---------- link API ----------
+    def send(self, msg: Dict[str, Any]):
+        with self._lock:
+            self._pending.append((self._now + self.delay_s, msg))
+            self.tx_sent += 1
+
+    def step(self, dt: float, now: float) -> Dict[str, Any]:
+        """Advance physics by dt (sim seconds) and publish one telemetry record."""
+        with self._lock:
+            self._now = now
+            while self._pending and self._pending[0][0] <= now:
+                _, msg = self._pending.popleft()
+                if msg.get("cmd") == "set":
+                    self.state = msg
+                    self._last_cmd_ts = now
+            st = self.state
+        drive = st.get("drive") or {}
+        stale = (now - self._last_cmd_ts) > self.failsafe_s
+        estop = bool(st.get("estop")) or stale
+        th = 0.0 if estop else float(drive.get("th", 0.0))
+        sd = 0.0 if estop else float(drive.get("st", 0.0))
+        pose = self.robot.step(th, sd, dt)
+
+        if self._t0 is None:
+            self._t0 = now
+        rec = {
+            "type": "stat",
+            "t": int((now - self._t0) * 1000),
+            "ack": st.get("s", 0),
+            "mode": "safe" if stale else st.get("mode", "safe"),
+            "estop": estop,
+            "drive": {"th": th, "st": sd},
+            "sim": {
+                "x": pose.x,
+                "y": pose.y,
+                "theta": pose.theta,
+                "v": self.robot.v,
+                "w": self.robot.w,
+                "collided": self.robot.collided,
+            },
+        }
+        self.rx_slot.put(rec)
+        self.rx_frames += 1
+        self._last_rx_ts = time.time()
+        if self.on_rx is not None:
+            self.on_rx()
+        return rec
+
+    @property
+    def connected(self) -> bool:
+        return self._open
+
+    def recv_latest(self) -> Optional[Dict[str, Any]]:
+        return self.rx_slot.take_latest()
+
+    def read_all_since(self, seq: int) -> List[Tuple[int, Dict[str, Any]]]:
+        return self.rx_slot.read_all_since(seq)
+
+    @property
+    def rx_seq(self) -> int:
+        return self.rx_slot.seq
+
+    @property
+    def last_rx_age_s(self) -> float:
+        if self._last_rx_ts <= 0:
+            return 999.0
+        return time.time() - self._last_rx_ts
+
+    def stats(self) -> Dict[str, Any]:
+        p = self.robot.pose
+        return {
+            "proto": self.proto,
+            "tx_sent": self.tx_sent,
+            "rx_seq": self.rx_slot.seq,
+            "connected": self.connected,
+            "pose": [round(p.x, 3), round(p.y, 3), round(p.theta, 3)],
+            "collided": self.robot.collided,
+            "odometer_m": round(self.robot.odometer, 2),
+        }
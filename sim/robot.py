@@ -0,0 +1,96 @@
+# sim/robot.py
+# Differential-drive kinematics driven by the drive.th / drive.st command.
+import math
+from dataclasses import dataclass
+
+from sim.world import World
+
+
+def clamp(x, lo, hi):
+    return lo if x < lo else hi if x > hi else x
+
+
+@dataclass
+class Pose:
+    x: float = 0.0
+    y: float = 0.0
+    theta: float = 0.0  # rad, counter-clockwise
+
+
+class DiffDrive:
+    """
+    Tank-mixed differential drive (same mixing idea as the firmware):
+      left = th + turn_gain * st, right = th - turn_gain * st   (st > 0 = right)
+      v = max_speed * (left + right) / 2, w = max_speed * (right - left) / track_m
+    Wheel speeds follow the command with a first-order lag (tau_s).
+    step(th, st, dt) -> Pose; `collided` latches when the body hits the world.
+    """
+
+    def __init__(
+        self,
+        pose: Pose = None,
+        max_speed: float = 1.0,
+        track_m: float = 0.30,
+        turn_gain: float = 0.6,
+        tau_s: float = 0.15,
+        radius_m: float = 0.18,
+        world: World = None,
+    ):
+        self.pose = pose or Pose()
+        self.max_speed = max_speed
+        self.track_m = track_m
+        self.turn_gain = turn_gain
+        self.tau_s = tau_s
+        self.radius_m = radius_m
+        self.world = world
+
+        self.v_left = 0.0
+        self.v_right = 0.0
+        self.collided = False
+        self.odometer = 0.0
+        self._free_m = 0.0  # distance we can still travel before the next collision query
+
+    @property
+    def v(self) -> float:
+        return 0.5 * (self.v_left + self.v_right)
+
+    @property
+    def w(self) -> float:
+        return (self.v_right - self.v_left) / self.track_m
+
+    def step(self, th: float, st: float, dt: float) -> Pose:
+        if dt <= 0:
+            return self.pose
+        left = clamp(th + self.turn_gain * st, -1.0, 1.0) * self.max_speed
+        right = clamp(th - self.turn_gain * st, -1.0, 1.0) * self.max_speed
+        a = 1.0 if self.tau_s <= 0 else 1.0 - math.exp(-dt / self.tau_s)
+        self.v_left += a * (left - self.v_left)
+        self.v_right += a * (right - self.v_right)
+
+        if self.collided:
+            self.v_left = self.v_right = 0.0
+            return self.pose
+
+        v, w = self.v, self.w
+        p = self.pose
+        th_mid = p.theta + 0.5 * w * dt
+        nx = p.x + v * math.cos(th_mid) * dt
+        ny = p.y + v * math.sin(th_mid) * dt
+        nt = (p.theta + w * dt + math.pi) % (2.0 * math.pi) - math.pi
+
+        step_m = math.hypot(nx - p.x, ny - p.y)
+        if self.world is not None:
+            self._free_m -= step_m
+            if self._free_m <= 0.0:
+                # query only once the last measured free radius is used up
+                clear = self.world.clearance(nx, ny, self.radius_m + 0.5)
+                if clear < self.radius_m:
+                    # stop at contact (no sliding)
+                    self.collided = True
+                    self.v_left = self.v_right = 0.0
+                    return self.pose
+                self._free_m = clear - self.radius_m
+
+        self.odometer += step_m
+        self.pose = Pose(nx, ny, nt)
+        return self.pose
@@ -0,0 +1,331 @@
+# sim/runner.py
+# Closed-loop episodes: SimLidar -> (sector stats, optional grid / TTC) ->
+# AutonomyController.compute_drive -> SimSerialLink -> DiffDrive, on a sim
+# clock (no sleeping), plus a process-pool batch runner for CI / tuning.
+#
+#   python3 -m sim.runner --episodes 200 --kind clutter
+#   python3 -m sim.runner --episodes 50 -p stop_dist=0.3,0.4 -p max_th=0.4,0.6
+#   python3 -m sim.runner --episodes 500 --max-collision-rate 0.02   # CI gate (exit 1)
+#   python3 -m sim.runner --kind clutter --nav dstar -p planner=dwa    # drive to the scenario goal
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from control.autonomy import AutonomyController
+from core.lidar_scan import S_MIN, get_layout
+from sim.lidar import SimLidar
+from sim.link import SimSerialLink
+from sim.robot import DiffDrive, Pose
+from sim.world import World, cluttered_room, corridor, room
+
+KINDS = ("corridor", "room", "clutter")
+GAP_BINS = 180  # polar histogram for planner="gap" / "dwa" (2° sectors)
+
+
+@dataclass
+class Scenario:
+    name: str
+    world: World
+    start: Pose
+    duration_s: float = 30.0
+    seed: int = 0
+    goal: Optional[Tuple[float, float]] = None  # world frame, used with run_episode(nav=...)
+
+
+def make_scenario(kind: str, seed: int, duration_s: float = 30.0) -> Scenario:
+    rng = np.random.default_rng(seed)
+    if kind == "corridor":
+        width = rng.uniform(0.9, 1.6)
+        world = corridor(12.0, width)
+        start = Pose(0.5, rng.uniform(-0.1, 0.1) * width, rng.uniform(-0.2, 0.2))
+    elif kind == "room":
+        world = room(6.0, 4.0)
+        start = Pose(rng.uniform(1.0, 5.0), rng.uniform(1.0, 3.0), rng.uniform(-math.pi, math.pi))
+    elif kind == "clutter":
+        sx, sy = rng.uniform(1.0, 7.0), rng.uniform(1.0, 5.0)
+        world = cluttered_room(rng, 8.0, 6.0, int(rng.integers(6, 16)), keep_clear=[(sx, sy)])
+        start = Pose(sx, sy, rng.uniform(-math.pi, math.pi))
+    else:
+        raise ValueError(f"unknown scenario kind: {kind}")
+    return Scenario(f"{kind}-{seed}", world, start, duration_s, seed, _pick_goal(world, start, kind, seed))
+
+
+def _pick_goal(world: World, start: Pose, kind: str, seed: int) -> Tuple[float, float]:
+    """Free point >= 3 m from the start (own RNG stream: scenarios stay unchanged)."""
+    if kind == "corridor":
+        return (11.0, 0.0)
+    rng = np.random.default_rng(seed + 7919)
+    seg = world.segments
+    x0, x1 = seg[:, [0, 2]].min(), seg[:, [0, 2]].max()
+    y0, y1 = seg[:, [1, 3]].min(), seg[:, [1, 3]].max()
+    best = (start.x, start.y)
+    for _ in range(200):
+        x, y = rng.uniform(x0 + 0.5, x1 - 0.5), rng.uniform(y0 + 0.5, y1 - 0.5)
+        if math.hypot(x - start.x, y - start.y) >= 3.0 and world.clearance(x, y, 1.0) >= 0.5:
+            return (x, y)
+    return best
+
+
+def run_episode(
+    sc: Scenario,
+    params: Optional[Dict[str, Any]] = None,
+    control_hz: float = 20.0,
+    scan_hz: float = 10.0,
+    physics_hz: float = 100.0,
+    delay_s: float = 0.02,
+    filter_depth: int = 3,
+    use_grid: bool = False,
+    use_ttc: bool = False,
+    nav: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One closed-loop episode with the main.py control path; returns metrics.
+    nav="dstar" | "astar": drive to sc.goal with control.navigator.Navigator
+    (needs the grid; ground-truth pose stands in for odometry).
+    """
+    robot = DiffDrive(Pose(sc.start.x, sc.start.y, sc.start.theta), world=sc.world)
+    link = SimSerialLink(robot, delay_s=delay_s)
+    lidar = SimLidar(sc.world, robot, rate_hz=scan_hz, filter_depth=filter_depth, seed=sc.seed)
+    auto = AutonomyController()
+    for k, v in (params or {}).items():
+        setattr(auto, k, v)
+
+    grid = tracker = navigator = None
+    if use_grid or nav:
+        from core.occupancy_grid import OccupancyGrid
+        grid = OccupancyGrid()
+    if use_ttc:
+        from core.obstacle_tracker import ObstacleTracker
+        tracker = ObstacleTracker()
+    if nav:
+        from control.navigator import Navigator
+        navigator = Navigator(incremental=nav != "astar")
+        navigator.pose = (sc.start.x, sc.start.y, sc.start.theta)
+        navigator.set_goal(*sc.goal, frame="odom")
+
+    cache: Dict[str, Any] = {}
+    last_pose = [robot.pose]
+
+    def on_scan(snap):
+        # same fallbacks as main.py on_scan / read_sectors()
+        st = snap.sectors
+        f, l, r = st["front"], st["left"], st["right"]
+        cache["min_f"] = float("inf") if f["min"] is None else f["min"]
+        cache["avg_l"] = 0.0 if l["mean"] is None else l["mean"]
+        cache["avg_r"] = 0.0 if r["mean"] is None else r["mean"]
+        cache["p20"] = (f["p20"], l["p20"], r["p20"])
+        cache["ts"] = snap.ts
+        if auto.planner in ("gap", "dwa"):
+            cache["polar"] = snap.reduce(get_layout(GAP_BINS, len(snap.dist_mm)))[:, S_MIN]
+        # ground-truth motion since the previous scan stands in for ScanOdometry
+        p0, p1 = last_pose[0], robot.pose
+        last_pose[0] = p1
+        c, s = math.cos(p0.theta), math.sin(p0.theta)
+        dx, dy = p1.x - p0.x, p1.y - p0.y
+        motion = (c * dx + s * dy, -s * dx + c * dy, (p1.theta - p0.theta + math.pi) % (2 * math.pi) - math.pi)
+        if tracker is not None:
+            tracker.update(snap.dist_mm, snap.ts, motion=motion)
+            cache["ttc"] = tracker.ttc_by_sector()["front"]
+        if grid is not None:
+            grid.move(*motion)
+            grid.update(snap.dist_mm, snap.ts)
+        if navigator is not None:
+            navigator.update(grid, (p1.x, p1.y, p1.theta), snap.ts)
+
+    lidar.subscribe(on_scan)
+
+    dt = 1.0 / physics_hz
+    n_steps = int(round(sc.duration_s * physics_hz))
+    ctrl_every = max(1, int(round(physics_hz / control_hz)))
+    scan_every = max(1, int(round(physics_hz / scan_hz)))
+
+    ticks = estops = reversals = 0
+    th_sum = 0.0
+    last_estop = False
+    last_sgn = 0
+    min_clear = float("inf")
+    t_collision = t_goal = None
+    t_wall0 = time.perf_counter()
+
+    for k in range(n_steps):
+        t = k * dt
+        if k % scan_every == 0:
+            lidar.scan(t)
+        if k % ctrl_every == 0 and "min_f" in cache:
+            if navigator is not None:
+                if navigator.status == "reached":
+                    t_goal = t
+                    break
+                target = navigator.target_rad()
+                auto.target_rad = 0.0 if target is None else target
+                auto.speed_scale = navigator.speed_scale()
+            p20_f, p20_l, p20_r = cache["p20"]
+            ttc = cache.get("ttc")
+            th, st, estop = auto.compute_drive(
+                cache["min_f"], cache["avg_l"], cache["avg_r"],
+                front_dist=p20_f, left_dist=p20_l, right_dist=p20_r,
+                now=t, lidar_timestamp=cache["ts"],
+                grid=grid,
+                speed=robot.v if grid is not None or use_ttc else None,
+                ttc=None if ttc is None or ttc == float("inf") else ttc,
+                scan=cache.get("polar"),
+            )
+            th = max(-0.8, min(0.8, th))
+            st = max(-1.0, min(1.0, st))
+            if estop:
+                th = st = 0.0
+            link.send({
+                "t": int(t * 1000),
+                "cmd": "set",
+                "mode": "safe" if estop else "auto",
+                "estop": estop,
+                "drive": {"th": th, "st": st},
+                "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
+            })
+            ticks += 1
+            th_sum += max(0.0, th)
+            if estop and not last_estop:
+                estops += 1
+            last_estop = estop
+            sgn = 0 if abs(st) < 0.1 else (1 if st > 0 else -1)
+            if sgn and last_sgn and sgn != last_sgn:
+                reversals += 1
+            if sgn:
+                last_sgn = sgn
+        link.step(dt, t)
+        if robot.collided:
+            t_collision = t
+            break
+        if k % scan_every == 0:
+            p = robot.pose
+            min_clear = min(min_clear, sc.world.clearance(p.x, p.y, 2.0) - robot.radius_m)
+
+    wall = time.perf_counter() - t_wall0
+    sim_s = (k + 1) * dt
+    out = {
+        "scenario": sc.name,
+        "collided": robot.collided,
+        "t_collision": t_collision,
+        "distance_m": robot.odometer,
+        "mean_th": th_sum / max(1, ticks),
+        "min_clear_m": max(0.0, min_clear) if math.isfinite(min_clear) else None,
+        "estops": estops,
+        "reversals": reversals,
+        "sim_s": sim_s,
+        "wall_s": wall,
+    }
+    if navigator is not None:
+        out["reached"] = t_goal is not None
+        out["t_goal"] = t_goal
+        out["replan_ms"] = navigator.replan_hist.summary(1e3)
+        out["full_replans"] = navigator.full_replans
+    return out
+
+
+# ---------- batch ----------
+def _episode_task(job):
+    kind, seed, params, kw = job
+    return run_episode(make_scenario(kind, seed, kw.pop("duration_s")), params, **kw)
+
+
+def run_batch(
+    kinds: Sequence[str],
+    seeds: Sequence[int],
+    params: Optional[Dict[str, Any]] = None,
+    workers: int = 1,
+    **kw,
+) -> List[Dict[str, Any]]:
+    """Every kind x seed episode; kw goes to make_scenario (duration_s) / run_episode."""
+    kw.setdefault("duration_s", 30.0)
+    jobs = [(k, s, params or {}, dict(kw)) for k in kinds for s in seeds]
+    if workers <= 1:
+        return [_episode_task(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_episode_task, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+
+
+def summarize(results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    n = max(1, len(results))
+    clears = [r["min_clear_m"] for r in results if r["min_clear_m"] is not None]
+    sim_s = sum(r["sim_s"] for r in results)
+    wall_s = sum(r["wall_s"] for r in results)
+    out = {
+        "episodes": len(results),
+        "collision_rate": sum(r["collided"] for r in results) / n,
+        "distance_m": sum(r["distance_m"] for r in results) / n,
+        "mean_th": sum(r["mean_th"] for r in results) / n,
+        "min_clear_m": min(clears) if clears else None,
+        "estops": sum(r["estops"] for r in results) / n,
+        "reversals": sum(r["reversals"] for r in results) / n,
+        "speedup": sim_s / max(1e-9, wall_s),
+    }
+    nav = [r for r in results if "reached" in r]
+    if nav:
+        p50 = sorted(r["replan_ms"]["p50"] or 0.0 for r in nav)
+        out["reach_rate"] = sum(r["reached"] for r in nav) / len(nav)
+        out["replan_p50_ms"] = p50[len(p50) // 2]
+        out["replan_p95_ms"] = max(r["replan_ms"]["p95"] or 0.0 for r in nav)
+        out["replan_max_ms"] = max(r["replan_ms"]["max"] or 0.0 for r in nav)
+        out["full_replans"] = sum(r["full_replans"] for r in nav) / len(nav)
+    return out
+
+
+def main(argv=None):
+    from tools.autonomy_sweep import parse_grid
+
+    ap = argparse.ArgumentParser(description="closed-loop autonomy episodes in the 2-D simulator")
+    ap.add_argument("--kind", action="append", choices=KINDS, help="scenario kind (repeatable, default all)")
+    ap.add_argument("--episodes", type=int, default=20, help="seeds per kind")
+    ap.add_argument("--seed", type=int, default=0, help="first seed")
+    ap.add_argument("--duration", type=float, default=30.0)
+    ap.add_argument("-p", "--param", action="append", default=[], help="name=v1,v2,... (repeatable)")
+    ap.add_argument("--grid", action="store_true", help="occupancy grid in the loop")
+    ap.add_argument("--ttc", action="store_true", help="obstacle tracker TTC in the loop")
+    ap.add_argument("--nav", choices=("dstar", "astar"), default=None, help="drive to the scenario goal")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--max-collision-rate", type=float, default=None, help="exit 1 above this (CI)")
+    args = ap.parse_args(argv)
+
+    kinds = args.kind or list(KINDS)
+    seeds = range(args.seed, args.seed + args.episodes)
+    rows = []
+    t0 = time.perf_counter()
+    for params in parse_grid(args.param):
+        res = run_batch(kinds, seeds, params, workers=args.workers, duration_s=args.duration,
+                        use_grid=args.grid, use_ttc=args.ttc, nav=args.nav)
+        rows.append((params, summarize(res), [r["scenario"] for r in res if r["collided"]]))
+    wall = time.perf_counter() - t0
+
+    rows.sort(key=lambda r: (r[1]["collision_rate"], -r[1]["distance_m"]))
+    print(f"{len(rows)} param sets x {len(kinds) * args.episodes} episodes in {wall:.1f} s "
+          f"({rows[0][1]['speedup']:.0f}x real time per worker)")
+    names = list(rows[0][0].keys())
+    hdr = " ".join(f"{n:>12s}" for n in names)
+    print(f"{'coll%':>6s} {'dist_m':>7s} {'mean_th':>7s} {'minclr':>6s} {'estop':>6s} {'rev':>6s} {hdr}")
+    for params, s, _ in rows:
+        clr = s["min_clear_m"]
+        vals = " ".join(f"{params[n]!s:>12}" for n in names)
+        print(f"{100 * s['collision_rate']:6.1f} {s['distance_m']:7.2f} {s['mean_th']:7.3f} "
+              f"{(clr if clr is not None else 99.0):6.2f} {s['estops']:6.1f} {s['reversals']:6.1f} {vals}")
+    if args.nav:
+        for params, s, _ in rows:
+            print(f"nav {args.nav}: reached {100 * s['reach_rate']:.0f}%  replan p50 {s['replan_p50_ms']:.2f} ms  "
+                  f"p95 {s['replan_p95_ms']:.2f} ms  max {s['replan_max_ms']:.2f} ms  "
+                  f"full replans/episode {s['full_replans']:.1f}  {params}")
+    if rows[0][2]:
+        print("collisions:", " ".join(rows[0][2][:20]))
+
+    if args.max_collision_rate is not None and rows[0][1]["collision_rate"] > args.max_collision_rate:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
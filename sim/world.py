@@ -0,0 +1,188 @@
+# sim/world.py
+# 2-D world made of line segments + vectorized ray casting / collision checks.
+#
+# Frame: world x / y in meters, theta counter-clockwise (same convention as the
+# lidar pipeline: x forward, y left in the robot frame).
+import math
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class World:
+    """
+    Static obstacles as segments float64[m, 4] (x1, y1, x2, y2).
+    - add_segment / add_polygon / add_box / add_circle: build the world
+    - raycast(x, y, angles_rad, max_range): distance per ray (inf = no hit),
+      all rays x all segments in one broadcast (720 rays x 100 segments ~ 2 ms)
+    - raycast_bins(x, y, theta, n_bins): lidar-style uniform bins, each segment
+      only against the bins it spans (~0.25 ms for the same scene)
+    - clearance(x, y): distance from a point to the nearest segment
+    """
+
+    def __init__(self, segments: Optional[np.ndarray] = None):
+        self._segs = np.zeros((0, 4)) if segments is None else np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+        self._bbox: Optional[np.ndarray] = None  # float64[4, m] lo_x, hi_x, lo_y, hi_y (lazy)
+
+    @property
+    def segments(self) -> np.ndarray:
+        return self._segs
+
+    def __len__(self) -> int:
+        return len(self._segs)
+
+    # ---------- building ----------
+    def add_segment(self, x1: float, y1: float, x2: float, y2: float) -> "World":
+        self._segs = np.vstack([self._segs, [x1, y1, x2, y2]])
+        self._bbox = None
+        return self
+
+    def add_polygon(self, pts: Sequence[Tuple[float, float]], closed: bool = True) -> "World":
+        p = np.asarray(pts, dtype=np.float64)
+        q = np.roll(p, -1, axis=0) if closed else p[1:]
+        p = p if closed else p[:-1]
+        self._segs = np.vstack([self._segs, np.hstack([p, q])])
+        self._bbox = None
+        return self
+
+    def add_box(self, cx: float, cy: float, w: float, h: float, yaw: float = 0.0) -> "World":
+        c, s = math.cos(yaw), math.sin(yaw)
+        corners = [(-w / 2, -h / 2), (w / 2, -h / 2), (w / 2, h / 2), (-w / 2, h / 2)]
+        return self.add_polygon([(cx + c * x - s * y, cy + s * x + c * y) for x, y in corners])
+
+    def add_circle(self, cx: float, cy: float, r: float, n: int = 12) -> "World":
+        a = np.linspace(0.0, 2.0 * math.pi, n, endpoint=False)
+        return self.add_polygon(np.stack([cx + r * np.cos(a), cy + r * np.sin(a)], axis=1))
+
+    def extend(self, other: "World") -> "World":
+        self._segs = np.vstack([self._segs, other.segments])
+        self._bbox = None
+        return self
+
+    # ---------- queries ----------
+    def raycast(self, x: float, y: float, angles_rad: np.ndarray, max_range: float = 12.0) -> np.ndarray:
+        """Hit distance along each world-frame angle from (x, y); inf where nothing within max_range."""
+        ang = np.asarray(angles_rad, dtype=np.float64)
+        out = np.full(ang.shape, np.inf)
+        s = self._near(x, y, max_range)
+        if not len(s):
+            return out
+        dx, dy = np.cos(ang)[:, None], np.sin(ang)[:, None]
+        px, py = s[:, 0] - x, s[:, 1] - y
+        ex, ey = s[:, 2] - s[:, 0], s[:, 3] - s[:, 1]
+        den = dx * ey - dy * ex                        # cross(d, e)  [n, m]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (px * ey - py * ex) / den              # along the ray
+            u = (px * dy - py * dx) / den              # along the segment
+        hit = (t > 0.0) & (u >= 0.0) & (u <= 1.0) & (np.abs(den) > 1e-12)
+        t = np.where(hit, t, np.inf).min(axis=1)
+        out[:] = np.where(t <= max_range, t, np.inf)
+        return out
+
+    def raycast_bins(self, x: float, y: float, theta: float, n_bins: int = 720, max_range: float = 12.0) -> np.ndarray:
+        """
+        Same result as raycast() for n_bins uniform bins (bin centres (i + 0.5) * 360 / n_bins
+        relative to theta), but each segment is only intersected with the bins its
+        angular span covers: cost ~ n_bins x depth complexity instead of n_bins x m.
+        """
+        out = np.full(n_bins, np.inf)
+        s = self._near(x, y, max_range)
+        if not len(s):
+            return out
+        two_pi = 2.0 * math.pi
+        b = two_pi / n_bins
+        a0 = (np.arctan2(s[:, 1] - y, s[:, 0] - x) - theta) % two_pi
+        a1 = (np.arctan2(s[:, 3] - y, s[:, 2] - x) - theta) % two_pi
+        span = (a1 - a0) % two_pi
+        lo = np.where(span <= math.pi, a0, a1)  # start of the shorter (counter-clockwise) arc
+        span = np.minimum(span, two_pi - span)
+        i0 = np.ceil(lo / b - 0.5).astype(np.int64)
+        cnt = np.floor((lo + span) / b - 0.5).astype(np.int64) - i0 + 1
+        keep = cnt > 0
+        if not keep.any():
+            return out
+        s, i0, cnt = s[keep], i0[keep], cnt[keep]
+
+        # (segment, bin) pairs, flattened
+        seg = np.repeat(np.arange(len(s)), cnt)
+        off = np.arange(seg.size) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        bins = (i0[seg] + off) % n_bins
+        ang = (bins + 0.5) * b + theta
+        dx, dy = np.cos(ang), np.sin(ang)
+        ss = s[seg]
+        px, py = ss[:, 0] - x, ss[:, 1] - y
+        ex, ey = ss[:, 2] - ss[:, 0], ss[:, 3] - ss[:, 1]
+        den = dx * ey - dy * ex
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (px * ey - py * ex) / den
+        t = np.where((t > 0.0) & (np.abs(den) > 1e-12), t, np.inf)
+        np.minimum.at(out, bins, t)
+        out[out > max_range] = np.inf
+        return out
+
+    def clearance(self, x: float, y: float, max_range: float = 2.0) -> float:
+        """Distance from (x, y) to the nearest segment (max_range if none closer)."""
+        s = self._near(x, y, max_range)
+        if not len(s):
+            return max_range
+        ex, ey = s[:, 2] - s[:, 0], s[:, 3] - s[:, 1]
+        l2 = np.maximum(ex * ex + ey * ey, 1e-12)
+        u = np.clip(((x - s[:, 0]) * ex + (y - s[:, 1]) * ey) / l2, 0.0, 1.0)
+        d = np.hypot(s[:, 0] + u * ex - x, s[:, 1] + u * ey - y)
+        return min(max_range, float(d.min()))
+
+    def _near(self, x: float, y: float, r: float) -> np.ndarray:
+        """Segments whose bounding box comes within r of (x, y)."""
+        s = self._segs
+        if not len(s):
+            return s
+        if self._bbox is None:
+            self._bbox = np.stack([
+                np.minimum(s[:, 0], s[:, 2]), np.maximum(s[:, 0], s[:, 2]),
+                np.minimum(s[:, 1], s[:, 3]), np.maximum(s[:, 1], s[:, 3]),
+            ])
+        lo_x, hi_x, lo_y, hi_y = self._bbox
+        m = (lo_x <= x + r) & (hi_x >= x - r) & (lo_y <= y + r) & (hi_y >= y - r)
+        return s[m]
+
+
+# ---------- scenarios ----------
+def room(w: float = 6.0, h: float = 4.0) -> World:
+    """Closed rectangular room, corner at (0, 0)."""
+    return World().add_polygon([(0.0, 0.0), (w, 0.0), (w, h), (0.0, h)])
+
+
+def corridor(length: float = 12.0, width: float = 1.2, end_wall: bool = True) -> World:
+    """Straight corridor along +x from x = 0, centred on y = 0."""
+    w = World().add_segment(0.0, width / 2, length, width / 2).add_segment(0.0, -width / 2, length, -width / 2)
+    w.add_segment(0.0, -width / 2, 0.0, width / 2)
+    if end_wall:
+        w.add_segment(length, -width / 2, length, width / 2)
+    return w
+
+
+def cluttered_room(
+    rng: np.random.Generator,
+    w: float = 8.0,
+    h: float = 6.0,
+    n_obstacles: int = 10,
+    keep_clear: Iterable[Tuple[float, float]] = (),
+    clear_r: float = 0.8,
+) -> World:
+    """Room with random boxes / posts, none within clear_r of the keep_clear points."""
+    world = room(w, h)
+    keep = list(keep_clear)
+    placed = 0
+    tries = 0
+    while placed < n_obstacles and tries < 50 * max(1, n_obstacles):
+        tries += 1
+        cx = rng.uniform(0.5, w - 0.5)
+        cy = rng.uniform(0.5, h - 0.5)
+        if any(math.hypot(cx - kx, cy - ky) < clear_r for kx, ky in keep):
+            continue
+        if rng.random() < 0.5:
+            world.add_circle(cx, cy, rng.uniform(0.05, 0.25), n=8)
+        else:
+            world.add_box(cx, cy, rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8), yaw=rng.uniform(0.0, math.pi))
+        placed += 1
+    return world
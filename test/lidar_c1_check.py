@@ -1,22 +1,35 @@
 #!/usr/bin/env python3
+# Live:   python3 test/lidar_c1_check.py [--record scan.bin]
+# Replay: python3 test/lidar_c1_check.py scan.bin [--speed 4]   (0 = as fast as possible)
 import sys
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
+import argparse
 import time
 from core.lidar_sensor import LidarC1
+from core.lidar_record import ReplayLidar
 
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("replay", nargs="?", help="recorded scan file (no hardware needed)")
+    ap.add_argument("--speed", type=float, default=1.0)
+    ap.add_argument("--record", default=None, help="record live revolutions to this file")
+    args = ap.parse_args()
+
     port = "/dev/ttyUSB0"
     baud = 460800
 
     lidar = None
     try:
-        lidar = LidarC1(port, baud)
+        if args.replay:
+            lidar = ReplayLidar(args.replay, speed=args.speed)
+        else:
+            lidar = LidarC1(port, baud, record_path=args.record)
 
-        print("RPLIDAR C1 test started")
+        print("RPLIDAR C1 test started" + (f" (replay {args.replay})" if args.replay else ""))
         print("Press Ctrl+C to stop")
         print("-" * 60)
 
@@ -31,7 +44,7 @@ def main():
                 min_f, avg_l, avg_r = lidar.read_sectors()
 
                 age = getattr(lidar, "last_age_s", None)
-                age_s = age() if callable(age) else None
+                age_s = age() if callable(age) else age
 
                 age_str = "-" if age_s is None else f"{age_s:.2f}s"
                 print(
@@ -41,6 +54,10 @@ def main():
                     f"age={age_str}"
                 )
 
+            if args.replay and lidar.finished.is_set():
+                print("\nReplay finished")
+                break
+
             time.sleep(0.02)
 
     except KeyboardInterrupt:
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# tools/autonomy_sweep.py
+# Offline replay of recorded lidar logs through AutonomyController.compute_drive
+# (faster than real time) + parameter sweeps on a process pool.
+#
+# Inputs (any mix):
+#   *.bin   scan recordings (core/lidar_record.py, LIDAR_RECORD_PATH)
+#   *.jsonl sector logs: one object per line with "ts" and the meta.lidar
+#           keys (min_front, avg_left, avg_right, p20_front, p20_left,
+#           p20_right, optional ttc / odom / polar_min)
+#
+#   python3 tools/autonomy_sweep.py logs/*.bin
+#   python3 tools/autonomy_sweep.py logs/*.bin -p stop_dist=0.3,0.4,0.5 -p hyst=0.15,0.25 --top 10
+#   python3 tools/autonomy_sweep.py logs/*.bin -p planner=rules,gap,dwa
+#
+# Replay is open loop: the recorded path does not react to the commands, so
+# the score rates how the controller *would* have commanded on that data.
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from control.autonomy import AutonomyController
+
+CONTROL_HZ = 20.0
+
+# score = sum(weight * metric); higher is better
+WEIGHTS = {
+    "mean_th": 1.0,            # forward progress
+    "min_clear": 0.5,          # closest approach while driving forward (capped at 1 m)
+    "estops_per_min": -0.05,
+    "reversals_per_min": -0.01,  # steering sign flips (zig-zag)
+}
+
+GAP_BINS = 180  # polar histogram handed to compute_drive(scan=...) (planner="gap" / "dwa")
+
+# (ts, min_f, avg_l, avg_r, p20_f, p20_l, p20_r, speed, ttc_front, polar_min)
+Frame = Tuple[float, float, float, float, Optional[float], Optional[float], Optional[float], Optional[float], Optional[float], Any]
+
+
+# ---------- loading ----------
+def _none_inf(v):
+    return None if v is None or v == float("inf") else v
+
+
+def load_scan_log(path: str, filter_depth: int = 3, odom: bool = True, ttc: bool = True) -> List[Frame]:
+    """Scan recording -> per-revolution sector frames (same pipeline as main.py)."""
+    from core.lidar_record import ReplayLidar
+    from core.lidar_scan import S_MIN, get_layout
+    from core.obstacle_tracker import ObstacleTracker
+    from core.scan_match import ScanMatcher, ScanOdometry
+
+    rp = ReplayLidar(path, speed=0, start=False, filter_depth=filter_depth)
+    n_bins = rp.reader.n_bins
+    odo = ScanOdometry(ScanMatcher(n_bins)) if odom else None
+    tracker = ObstacleTracker(n_bins) if ttc else None
+    frames: List[Frame] = []
+    while True:
+        snap = rp.step()
+        if snap is None:
+            break
+        st = snap.sectors
+        f, l, r = st["front"], st["left"], st["right"]
+        speed = None
+        motion = None
+        if odo is not None:
+            odo.update(snap.raw_mm if snap.raw_mm is not None else snap.dist_mm, snap.ts)
+            speed = odo.vx
+            motion = odo.motion
+        ttc_f = None
+        if tracker is not None:
+            tracker.update(snap.dist_mm, snap.ts, motion=motion)
+            ttc_f = _none_inf(tracker.ttc_by_sector()["front"])
+        frames.append((
+            snap.ts,
+            float("inf") if f["min"] is None else f["min"],
+            0.0 if l["mean"] is None else l["mean"],
+            0.0 if r["mean"] is None else r["mean"],
+            f["p20"], l["p20"], r["p20"],
+            speed, ttc_f,
+            snap.reduce(get_layout(GAP_BINS, n_bins))[:, S_MIN],
+        ))
+    return frames
+
+
+def _polar(vals):
+    if not vals:
+        return None
+    import numpy as np
+    return np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+
+
+def load_sector_log(path: str) -> List[Frame]:
+    frames: List[Frame] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+            except Exception:
+                continue
+            lid = obj.get("lidar", obj)
+            if "ts" not in obj or lid.get("min_front") is None:
+                continue
+            frames.append((
+                float(obj["ts"]),
+                float(lid["min_front"]),
+                float(lid.get("avg_left") or 0.0),
+                float(lid.get("avg_right") or 0.0),
+                lid.get("p20_front"), lid.get("p20_left"), lid.get("p20_right"),
+                (lid.get("odom") or {}).get("vx"),
+                (lid.get("ttc") or {}).get("front"),
+                _polar(lid.get("polar_min")),
+            ))
+    return frames
+
+
+def load_log(path: str, filter_depth: int = 3) -> List[Frame]:
+    if path.endswith(".jsonl"):
+        return load_sector_log(path)
+    return load_scan_log(path, filter_depth=filter_depth)
+
+
+# ---------- replay + scoring ----------
+def replay(frames: Sequence[Frame], params: Dict[str, Any], hz: float = CONTROL_HZ) -> Dict[str, float]:
+    """Run compute_drive at `hz` over the log (latest frame per tick) and score it."""
+    if not frames:
+        return {"ticks": 0}
+    auto = AutonomyController()
+    for k, v in params.items():
+        setattr(auto, k, v)
+
+    dt = 1.0 / hz
+    t = frames[0][0]
+    t_end = frames[-1][0]
+    i = 0
+    ticks = estops = reversals = 0
+    th_sum = 0.0
+    min_clear = float("inf")
+    last_estop = False
+    last_st_sign = 0
+
+    while t <= t_end:
+        while i + 1 < len(frames) and frames[i + 1][0] <= t:
+            i += 1
+        ts, min_f, avg_l, avg_r, p20_f, p20_l, p20_r, speed, ttc, polar = frames[i]
+        th, st, estop = auto.compute_drive(
+            min_f, avg_l, avg_r,
+            front_dist=p20_f, left_dist=p20_l, right_dist=p20_r,
+            now=t, lidar_timestamp=ts,
+            speed=speed, ttc=ttc,
+            scan=polar,
+        )
+        ticks += 1
+        th_sum += max(0.0, th)
+        if estop and not last_estop:
+            estops += 1
+        last_estop = estop
+        if th > 0.05:
+            min_clear = min(min_clear, min_f)
+        sgn = 0 if abs(st) < 0.1 else (1 if st > 0 else -1)
+        if sgn and last_st_sign and sgn != last_st_sign:
+            reversals += 1
+        if sgn:
+            last_st_sign = sgn
+        t += dt
+
+    minutes = max(1e-9, ticks * dt / 60.0)
+    return {
+        "ticks": ticks,
+        "mean_th": th_sum / ticks,
+        "min_clear": min_clear,
+        "estops": estops,
+        "reversals": reversals,
+        "estops_per_min": estops / minutes,
+        "reversals_per_min": reversals / minutes,
+    }
+
+
+def score(m: Dict[str, float]) -> float:
+    if not m.get("ticks"):
+        return float("-inf")
+    vals = dict(m)
+    vals["min_clear"] = min(1.0, m["min_clear"])
+    return sum(w * vals[k] for k, w in WEIGHTS.items())
+
+
+# ---------- process pool ----------
+_LOGS: Dict[str, List[Frame]] = {}
+
+
+def _init_worker(paths: Sequence[str], filter_depth: int):
+    # each worker decodes the logs once; tasks then only carry parameters
+    for p in paths:
+        _LOGS[p] = load_log(p, filter_depth)
+
+
+def _run_combo(params: Dict[str, Any]) -> Dict[str, Any]:
+    per_log = {p: replay(frames, params) for p, frames in _LOGS.items()}
+    ok = [m for m in per_log.values() if m.get("ticks")]
+    ticks = sum(m["ticks"] for m in ok) or 1
+    agg = {
+        "mean_th": sum(m["mean_th"] * m["ticks"] for m in ok) / ticks,
+        "min_clear": min((m["min_clear"] for m in ok), default=float("inf")),
+        "estops": sum(m["estops"] for m in ok),
+        "reversals": sum(m["reversals"] for m in ok),
+        "ticks": ticks if ok else 0,
+    }
+    minutes = max(1e-9, ticks / CONTROL_HZ / 60.0)
+    agg["estops_per_min"] = agg["estops"] / minutes
+    agg["reversals_per_min"] = agg["reversals"] / minutes
+    return {"params": params, "metrics": agg, "score": score(agg)}
+
+
+def _cast(default: Any, raw: str) -> Any:
+    if isinstance(default, bool):
+        return raw.lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (int, float)):
+        return type(default)(float(raw))
+    return raw  # strings (e.g. planner=rules,gap)
+
+
+def parse_grid(specs: Sequence[str]) -> List[Dict[str, Any]]:
+    """["stop_dist=0.3,0.4", "hyst=0.2"] -> list of param dicts (cartesian product)."""
+    defaults = AutonomyController()
+    names, values = [], []
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        name = name.strip()
+        if not hasattr(defaults, name) or name.startswith("_"):
+            raise SystemExit(f"unknown AutonomyController parameter: {name}")
+        names.append(name)
+        values.append([_cast(getattr(defaults, name), v.strip()) for v in raw.split(",") if v.strip()])
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)] or [{}]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="replay lidar logs through AutonomyController + parameter sweep")
+    ap.add_argument("logs", nargs="+", help="*.bin scan recordings and/or *.jsonl sector logs")
+    ap.add_argument("-p", "--param", action="append", default=[], help="name=v1,v2,... (repeatable)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--filter-depth", type=int, default=3)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--json", default=None, help="write the full ranked result list here")
+    args = ap.parse_args()
+
+    combos = parse_grid(args.param)
+    t0 = time.perf_counter()
+    if args.workers <= 1 or len(combos) == 1:
+        _init_worker(args.logs, args.filter_depth)
+        results = [_run_combo(c) for c in combos]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.logs, args.filter_depth),
+        ) as pool:
+            results = list(pool.map(_run_combo, combos, chunksize=max(1, len(combos) // (4 * args.workers))))
+    wall = time.perf_counter() - t0
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    log_s = results[0]["metrics"]["ticks"] / CONTROL_HZ if results else 0.0
+    print(f"{len(combos)} combos x {len(args.logs)} logs ({log_s:.0f} s of data) in {wall:.1f} s "
+          f"on {args.workers} workers -> {len(combos) * log_s / max(wall, 1e-9):.0f}x real time")
+
+    names = list(combos[0].keys())
+    hdr = " ".join(f"{n:>12s}" for n in names)
+    print(f"{'#':>3s} {'score':>7s} {'mean_th':>7s} {'minclr':>6s} {'estop':>5s} {'rev':>5s} {hdr}")
+    for rank, r in enumerate(results[: args.top], 1):
+        m = r["metrics"]
+        clr = m["min_clear"]
+        vals = " ".join(f"{r['params'][n]!s:>12}" for n in names)
+        print(
+            f"{rank:3d} {r['score']:7.3f} {m['mean_th']:7.3f} "
+            f"{(clr if math.isfinite(clr) else 99.0):6.2f} {m['estops']:5d} {m['reversals']:5d} {vals}"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, default=lambda o: None)
+
+
+if __name__ == "__main__":
+    main()
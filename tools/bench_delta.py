@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# tools/bench_delta.py
+# Serial bandwidth of full "set" commands vs keyframe+delta encoding.
+#
+# Record a session first (config.py: SERIAL_TX_LOG = "/tmp/tx.jsonl"), then:
+#   python3 tools/bench_delta.py /tmp/tx.jsonl --hz 100
+# Without a file a synthetic driving session is used.
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import json
+import math
+
+from messages.delta import DeltaEncoder
+
+BAUDRATE = 115200
+
+
+def load_session(path):
+    out = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except Exception:
+                continue
+            # SerialLink tx_log: {"ts":..,"cmd":{...}}; dashboard "tx" event: {"data":{"cmd":{...}}}
+            cmd = obj.get("cmd") if isinstance(obj.get("cmd"), dict) else (obj.get("data") or {}).get("cmd")
+            ts = obj.get("ts")
+            if isinstance(cmd, dict) and cmd.get("cmd") == "set" and ts is not None:
+                out.append((float(ts), cmd))
+    return out
+
+
+def synthetic_session(hz: float, seconds: float = 60.0):
+    out = []
+    n = int(hz * seconds)
+    for i in range(n):
+        t = i / hz
+        # drive in bursts, turret mostly idle, estop toggled twice
+        driving = (t % 10.0) < 6.0
+        th = 0.5 * math.sin(t * 0.8) if driving else 0.0
+        st = 0.3 * math.sin(t * 1.7) if driving and (t % 3.0) < 1.0 else 0.0
+        out.append((t, {
+            "t": int(t * 1000),
+            "cmd": "set",
+            "mode": "manual",
+            "estop": 20.0 <= t < 22.0 or 45.0 <= t < 46.0,
+            "drive": {"th": th, "st": st},
+            "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
+        }))
+    return out
+
+
+def _nbytes(obj) -> int:
+    return len(json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")) + 1
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("session", nargs="?", help="JSONL recorded with SerialLink(tx_log=...)")
+    ap.add_argument("--hz", type=float, default=100.0, help="control rate to project to")
+    ap.add_argument("--keyframe-s", type=float, default=1.0)
+    args = ap.parse_args()
+
+    session = load_session(args.session) if args.session else synthetic_session(args.hz)
+    if len(session) < 2:
+        print("session too short")
+        return
+
+    enc = DeltaEncoder(keyframe_s=args.keyframe_s)
+    full_b = 0
+    delta_b = 0
+    for ts, cmd in session:
+        full_b += _nbytes(cmd)
+        delta_b += _nbytes(enc.encode(cmd, now=ts))
+
+    n = len(session)
+    dur = max(1e-6, session[-1][0] - session[0][0])
+    cap = BAUDRATE / 10.0  # 8N1
+
+    print(f"session: {n} cmds over {dur:.1f}s ({n / dur:.1f} Hz) src={'file' if args.session else 'synthetic'}")
+    print(f"keyframes={enc.keyframes} deltas={enc.deltas}")
+    print(f"{'fmt':6s} {'B/cmd':>7s} {'B/s rec':>9s} {'B/s @' + str(int(args.hz)) + 'Hz':>11s} {'link %':>7s}")
+    for name, total in (("full", full_b), ("delta", delta_b)):
+        per = total / n
+        proj = per * args.hz
+        print(f"{name:6s} {per:7.1f} {total / dur:9.0f} {proj:11.0f} {100.0 * proj / cap:6.1f}%")
+    print(f"saving: {100.0 * (1.0 - delta_b / max(1, full_b)):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# tools/bench_lidar.py
+# Lidar processing (+ scan-based planners) microbenchmarks on synthetic scans (no lidar needed).
+#   python3 tools/bench_lidar.py --points 500
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from control.autonomy import AutonomyController
+from control.dwa_planner import DWAPlanner
+from control.gap_planner import GapPlanner
+from core.lidar_scan import ScanBins, SectorLayout, TemporalFilter, sector_stats
+from core.occupancy_grid import OccupancyGrid
+from core.obstacle_tracker import ObstacleTracker
+from core.scan_match import ScanMatcher
+
+
+# ---- previous per-point loop (reference) ----
+def _angle_diff(a: float, b: float) -> float:
+    return (a - b + 180.0) % 360.0 - 180.0
+
+
+def _in_sector(angle_deg: float, center_deg: float, half_width_deg: float) -> bool:
+    return abs(_angle_diff(angle_deg, center_deg)) <= half_width_deg
+
+
+def _clean_dist_m(dist_mm):
+    if dist_mm is None:
+        return None
+    try:
+        d_mm = float(dist_mm)
+    except Exception:
+        return None
+    if d_mm <= 0:
+        return None
+    d = d_mm / 1000.0
+    if d < 0.10 or d > 12.0:
+        return None
+    return d
+
+
+def read_sectors_loop(d, mirror_angle=True):
+    front, left, right = [], [], []
+    for a, dist_mm in dict(d).items():
+        try:
+            angle = float(a)
+        except Exception:
+            continue
+        if mirror_angle:
+            angle = (360.0 - angle) % 360.0
+        dist = _clean_dist_m(dist_mm)
+        if dist is None:
+            continue
+        if _in_sector(angle, 0.0, 30.0):
+            front.append(dist)
+        elif _in_sector(angle, 60.0, 30.0):
+            left.append(dist)
+        elif _in_sector(angle, 300.0, 30.0):
+            right.append(dist)
+    min_front = min(front) if front else float("inf")
+    avg_left = (sum(left) / len(left)) if left else 0.0
+    avg_right = (sum(right) / len(right)) if right else 0.0
+    return min_front, avg_left, avg_right
+
+
+def read_sectors_numpy(d, mirror_angle=True):
+    d = dict(d)
+    angles = np.fromiter(d.keys(), dtype=np.float64, count=len(d))
+    dists = np.array(list(d.values()), dtype=np.float64)
+    return sector_stats(angles, dists, mirror=mirror_angle)
+
+
+def make_output_dict(n: int):
+    rnd = random.Random(1)
+    out = {}
+    for i in range(n):
+        a = (i * 360.0 / n + rnd.uniform(-0.2, 0.2)) % 360.0
+        r = 1500.0 + 800.0 * math.sin(math.radians(a) * 3.0) + rnd.uniform(-20, 20)
+        out[round(a, 3)] = 0 if rnd.random() < 0.05 else int(r)
+    return out
+
+
+def make_bins(d) -> ScanBins:
+    bins = ScanBins(mirror=True)
+    for a, dist in d.items():
+        bins.add_point(a, dist, 0.0)
+    bins.publish(0.0)
+    return bins
+
+
+def read_bins(bins: ScanBins):
+    return bins.read(lambda seq, ts, dist: sector_stats(bins.angles_deg, dist))
+
+
+def bench(fn, arg, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def bench_layout(layout: SectorLayout, bins: ScanBins, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        bins.read(lambda seq, ts, dist: layout.reduce(dist))
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def bench_filter(depth: int, mode: str, n: int) -> float:
+    filt = TemporalFilter(depth=depth, mode=mode)
+    rnd = np.random.default_rng(1)
+    revs = rnd.uniform(300, 5000, size=(8, filt.n_bins)).astype(np.float32)
+    revs[rnd.random(revs.shape) < 0.05] = np.nan
+    for r in revs:
+        filt.push(r)
+    t0 = time.perf_counter()
+    for i in range(n):
+        filt.push(revs[i % len(revs)])
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def bench_grid(n: int):
+    grid = OccupancyGrid()
+    bins = make_bins(make_output_dict(500))
+    dist = bins.snapshot().dist_mm
+    t0 = time.perf_counter()
+    for i in range(n):
+        grid.update(dist, ts=i * 0.1)
+    t_upd = (time.perf_counter() - t0) * 1e3 / n
+    t0 = time.perf_counter()
+    for i in range(n):
+        grid.move(0.02, 0.0, 0.01)
+    t_move = (time.perf_counter() - t0) * 1e3 / n
+    t0 = time.perf_counter()
+    for i in range(n):
+        grid.clearance(0.1 * i, 0.35)
+        grid.nearest_in_cone(0.0, 0.5)
+    t_q = (time.perf_counter() - t0) * 1e6 / (2 * n)
+    return t_upd, t_move, t_q
+
+
+def bench_match(n: int, metric: str):
+    # same synthetic scan rotated by 4 bins (2 deg): matcher must recover it
+    m = ScanMatcher(metric=metric)
+    dist = make_bins(make_output_dict(1000)).snapshot().dist_mm
+    prev = m.points(dist)
+    cur = m.points(np.roll(dist, -4))
+    t0 = time.perf_counter()
+    for _ in range(n):
+        res = m.match(prev, cur)
+    ms = (time.perf_counter() - t0) * 1e3 / n
+    return ms, res
+
+
+def bench_tracker(n: int):
+    # synthetic scan + one blob moving 1 m/s toward the robot
+    tr = ObstacleTracker()
+    base = make_bins(make_output_dict(1000)).snapshot().dist_mm.copy()
+    t_total = 0.0
+    for i in range(n):
+        d = base.copy()
+        r = 3000.0 - (i % 20) * 100.0
+        d[355:365] = r
+        t0 = time.perf_counter()
+        tr.update(d, ts=i * 0.1)
+        t_total += time.perf_counter() - t0
+    return t_total * 1e6 / n, len(tr.pos)
+
+
+def make_polar(n_sectors: int = 180) -> np.ndarray:
+    """Synthetic polar min-distance histogram (m): corridor 1.4 m wide + clutter."""
+    rng = np.random.default_rng(3)
+    ang = np.deg2rad(np.arange(n_sectors) * (360.0 / n_sectors))
+    with np.errstate(divide="ignore"):
+        polar = np.minimum(np.abs(0.7 / np.sin(ang)), 4.0)
+    polar[rng.random(n_sectors) < 0.1] = 0.8
+    return polar
+
+
+def bench_gap(n: int, n_sectors: int = 180):
+    """GapPlanner: inflate per revolution, plan / compute_drive per control tick (us)."""
+    polar = make_polar(n_sectors)
+    gp = GapPlanner()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        gp.inflate(polar)
+    t_inf = (time.perf_counter() - t0) / n * 1e6
+    gp.plan(polar)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        gp.plan(polar, 0.1)
+    t_plan = (time.perf_counter() - t0) / n * 1e6
+    auto = AutonomyController()
+    auto.planner = "gap"
+    scan = polar
+    t0 = time.perf_counter()
+    for i in range(n):
+        scan = polar.copy() if i % 5 == 0 else scan  # new revolution every 5th tick (50 Hz / 10 Hz)
+        auto.compute_drive(1.2, 0.7, 0.7, now=i * 0.02, lidar_timestamp=i * 0.02, scan=scan)
+    t_drive = (time.perf_counter() - t0) / n * 1e6
+    return t_inf, t_plan, t_drive
+
+
+def bench_dwa(n: int, n_th: int, n_st: int, n_sectors: int = 180):
+    """DWAPlanner: curvature table per revolution, plan / compute_drive per tick, exact rollout (us)."""
+    polar = make_polar(n_sectors)
+    dwa = DWAPlanner(n_th=n_th, n_st=n_st)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        dwa._table_polar = None
+        dwa.arcs(polar)
+    t_arcs = (time.perf_counter() - t0) / n * 1e6
+    t0 = time.perf_counter()
+    for _ in range(n):
+        dwa.plan(polar, 0.3, 0.0, 0.06, 0.12, 0.6, 1.0)
+    t_plan = (time.perf_counter() - t0) / n * 1e6
+    # exact samples x points rollout (what the curvature table replaces)
+    th, st = dwa.samples(0.3, 0.0, 0.06, 0.12, 0.6, 1.0)
+    v, w = dwa.model(th, st)
+    pts = dwa.points(polar)
+    t0 = time.perf_counter()
+    for _ in range(max(1, n // 10)):
+        dwa.rollout(v, w, pts)
+    t_exact = (time.perf_counter() - t0) / max(1, n // 10) * 1e6
+    auto = AutonomyController()
+    auto.planner = "dwa"
+    auto.dwa = dwa
+    scan = polar
+    t0 = time.perf_counter()
+    for i in range(n):
+        scan = polar.copy() if i % 5 == 0 else scan  # new revolution every 5th tick (50 Hz / 10 Hz)
+        auto.compute_drive(1.2, 0.7, 0.7, now=i * 0.02, lidar_timestamp=i * 0.02, scan=scan)
+    t_drive = (time.perf_counter() - t0) / n * 1e6
+    return len(pts), t_arcs, t_plan, t_exact, t_drive
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--points", type=int, nargs="+", default=[250, 500, 1000])
+    ap.add_argument("--iters", type=int, default=500)
+    args = ap.parse_args()
+
+    print(f"{'points':>7s} {'loop us':>9s} {'numpy us':>9s} {'speedup':>8s} {'bins us':>8s} {'layout us':>9s} {'polar36':>8s}")
+    for n in args.points:
+        d = make_output_dict(n)
+        ref = read_sectors_loop(d)
+        st = read_sectors_numpy(d)
+        assert abs(ref[0] - st["front"]["min"]) < 1e-9
+        assert abs(ref[1] - st["left"]["mean"]) < 1e-9
+        assert abs(ref[2] - st["right"]["mean"]) < 1e-9
+        t_loop = bench(read_sectors_loop, d, args.iters)
+        t_np = bench(read_sectors_numpy, d, args.iters)
+        bins = make_bins(d)
+        t_bins = bench(read_bins, bins, args.iters)
+        t_lay = bench_layout(SectorLayout.named(), bins, args.iters)
+        t_pol = bench_layout(SectorLayout.uniform(36), bins, args.iters)
+        print(f"{n:7d} {t_loop:9.1f} {t_np:9.1f} {t_loop / t_np:7.2f}x {t_bins:8.1f} {t_lay:9.1f} {t_pol:8.1f}")
+
+    print(f"\n{'filter':>10s} {'depth':>6s} {'us/rev':>8s}")
+    for mode in TemporalFilter.MODES:
+        for depth in (3, 5, 9):
+            print(f"{mode:>10s} {depth:6d} {bench_filter(depth, mode, args.iters):8.1f}")
+
+    t_upd, t_move, t_q = bench_grid(args.iters)
+    print(f"\ngrid {OccupancyGrid().n}^2: update {t_upd:.2f} ms  move+rotate {t_move:.2f} ms  query {t_q:.1f} us")
+
+    for metric in ("line", "point"):
+        ms, res = bench_match(max(10, args.iters // 10), metric)
+        dth = "-" if res is None else f"{np.degrees(res.dtheta):.2f}"
+        q = "-" if res is None else f"{res.quality:.2f}"
+        print(f"icp {metric:5s}: {ms:.2f} ms/match  dtheta={dth} deg (true 2.00)  q={q}")
+
+    us, n_tracks = bench_tracker(args.iters)
+    print(f"tracker: {us:.0f} us/rev ({n_tracks} tracks, bounded by max_tracks)")
+
+    t_inf, t_plan, t_drive = bench_gap(args.iters)
+    print(f"gap planner (180 sectors): inflate {t_inf:.0f} us/rev  plan {t_plan:.0f} us  compute_drive {t_drive:.0f} us/tick")
+
+    print(f"\n{'dwa samples':>11s} {'points':>7s} {'arcs us/rev':>11s} {'plan us':>8s} {'exact us':>9s} {'drive us/tick':>13s}")
+    for n_th, n_st in ((5, 9), (7, 15), (9, 21), (11, 31)):
+        n_pts, t_arcs, t_plan, t_exact, t_drive = bench_dwa(max(10, args.iters // 5), n_th, n_st)
+        print(f"{n_th * n_st:11d} {n_pts:7d} {t_arcs:11.0f} {t_plan:8.0f} {t_exact:9.0f} {t_drive:13.0f}")
+
+
+if __name__ == "__main__":
+    main()
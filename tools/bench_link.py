@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# tools/bench_link.py
+# Control-loop throughput, Pi-side CPU and serial RTT against the virtual
+# Arduino (tools/virtual_arduino.py) - no hardware needed.
+#
+#   python3 tools/bench_link.py --rates 20 100 500 --seconds 5 --proto json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import multiprocessing as mp
+import time
+
+from comm.serial_link import SerialLink
+from tools.virtual_arduino import VirtualArduino
+
+
+def _arduino_proc(conn, kwargs):
+    # runs in its own process so its CPU doesn't count against the Pi side
+    va = VirtualArduino(**kwargs).start()
+    conn.send(va.port)
+    try:
+        conn.recv()  # wait for "stop"
+    except EOFError:
+        pass
+    conn.send({"rx_cmds": va.rx_cmds, "rx_bad": va.rx_bad, "resyncs": va.resyncs, "tx_records": va.tx_records})
+    va.close()
+
+
+def run_rate(hz: float, seconds: float, args) -> dict:
+    parent, child = mp.Pipe()
+    kwargs = dict(
+        telem_hz=args.telem_hz or hz,
+        delay_s=args.delay_ms / 1000.0,
+        drop_rate=args.drop,
+        corrupt_rate=args.corrupt,
+        baud=args.baud,
+        binary=(args.proto != "json"),
+    )
+    proc = mp.Process(target=_arduino_proc, args=(child, kwargs), daemon=True)
+    proc.start()
+    port = parent.recv()
+
+    link = SerialLink(port, args.baud or 115200, protocol=args.proto, async_write=args.async_write, delta=args.delta)
+    link.open()
+    link.reset_stats()
+    rx_seq0 = link.rx_seq
+    tx_bytes0 = link.tx_bytes
+
+    dt = 1.0 / hz
+    ticks = 0
+    late = 0
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    next_tick = t0
+    while True:
+        now = time.perf_counter()
+        if now - t0 >= seconds:
+            break
+        link.send({
+            "t": int((now - t0) * 1000),
+            "cmd": "set",
+            "mode": "manual",
+            "estop": False,
+            "drive": {"th": 0.3, "st": 0.1 if (ticks // 50) % 2 else -0.1},
+            "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
+        })
+        link.recv_latest()
+        ticks += 1
+
+        next_tick += dt
+        sleep_s = next_tick - time.perf_counter()
+        if sleep_s > 0:
+            time.sleep(sleep_s)
+        else:
+            late += 1
+            next_tick = time.perf_counter()
+    wall = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+
+    st = link.stats()
+    link.close()
+    parent.send("stop")
+    ard = parent.recv()
+    proc.join(timeout=2.0)
+
+    return {
+        "hz": hz,
+        "proto": st["proto"],
+        "loop_hz": ticks / wall,
+        "late": late,
+        "cpu_pct": 100.0 * cpu / wall,
+        "telem_hz": (st["rx_seq"] - rx_seq0) / wall,
+        "rtt": st["rtt_ms"],
+        "rx_jit": st["rx_jitter_ms"],
+        "tx_Bps": (st["tx_bytes"] - tx_bytes0) / wall,
+        "ard": ard,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rates", type=float, nargs="+", default=[20.0, 100.0, 500.0])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--proto", choices=("json", "bin", "auto"), default="json")
+    ap.add_argument("--delta", action="store_true")
+    ap.add_argument("--async-write", action="store_true")
+    ap.add_argument("--telem-hz", type=float, default=0.0, help="0 = same as control rate")
+    ap.add_argument("--delay-ms", type=float, default=1.0)
+    ap.add_argument("--drop", type=float, default=0.0)
+    ap.add_argument("--corrupt", type=float, default=0.0)
+    ap.add_argument("--baud", type=int, default=115200)
+    args = ap.parse_args()
+
+    print(f"proto={args.proto} delta={args.delta} async_write={args.async_write} baud={args.baud}")
+    print(f"{'Hz':>5s} {'loop Hz':>8s} {'late':>5s} {'cpu%':>6s} {'telem Hz':>8s} {'tx B/s':>7s} "
+          f"{'rtt p50':>8s} {'p99':>7s} {'max':>7s} {'jit p99':>8s} {'link':>5s}")
+    for hz in args.rates:
+        r = run_rate(hz, args.seconds, args)
+        rtt = r["rtt"]
+        print(
+            f"{r['hz']:5.0f} {r['loop_hz']:8.1f} {r['late']:5d} {r['cpu_pct']:6.1f} {r['telem_hz']:8.1f} "
+            f"{r['tx_Bps']:7.0f} {rtt['p50'] or 0:8.2f} {rtt['p99'] or 0:7.2f} {rtt['max'] or 0:7.2f} "
+            f"{r['rx_jit']['p99'] or 0:8.2f} {r['proto']:>5s}"
+            + ("  <- no telemetry, nothing measured" if r["telem_hz"] <= 0 else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# tools/bench_nav.py
+# Replan latency per revolution: A* from scratch vs D* Lite repair
+# (control/navigator.py) on a synthetic lattice. Every "revolution" the robot
+# advances along the path and `--flicker` cells near it flip (scan noise /
+# new obstacles), like the grid diff Navigator.update() sees.
+#   python3 tools/bench_nav.py --sizes 120 200 --revs 40
+# Closed loop (real grid diffs): python3 -m sim.runner --nav dstar -p planner=dwa
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import time
+
+import numpy as np
+
+from control.navigator import DStarLite, astar
+
+
+def make_lattice(n: int, rng: np.random.Generator) -> np.ndarray:
+    """Padded bool[n + 2, n + 2] with wall-like boxes; border blocked."""
+    occ = np.zeros((n, n), dtype=bool)
+    for _ in range(n // 3):
+        y, x = rng.integers(0, n, 2)
+        occ[y:y + rng.integers(2, max(3, n // 6)), x:x + rng.integers(2, 6)] = True
+    b = np.ones((n + 2, n + 2), dtype=bool)
+    b[1:-1, 1:-1] = occ
+    return b
+
+
+def bench(n: int, revs: int, flicker: int, radius: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    w = n + 2
+    b = make_lattice(n, rng)
+    start, goal = 5 * w + 5, (n - 4) * w + (n - 4)
+    b.flat[start] = b.flat[goal] = False
+    blocked = b.ravel().tolist()
+
+    t0 = time.perf_counter()
+    ds = DStarLite(blocked, w, start, goal)
+    ds.compute(10 ** 7)
+    t_full = time.perf_counter() - t0
+
+    t_astar = t_dstar = 0.0
+    n_revs = mismatch = 0
+    for _ in range(revs):
+        path = ds.path()
+        if not path or len(path) < 3:
+            break
+        start = path[2]  # ~2 cells per revolution (0.2 m at 10 Hz = 2 m/s worst case)
+        sy, sx = divmod(start, w)
+        ys = np.clip(sy + rng.integers(-radius, radius + 1, flicker), 1, n)
+        xs = np.clip(sx + rng.integers(-radius, radius + 1, flicker), 1, n)
+        cells = {int(c) for c in ys * w + xs} - {start, goal}
+        for c in cells:
+            b.flat[c] = not b.flat[c]
+        blocked = b.ravel().tolist()
+
+        t0 = time.perf_counter()
+        pa = astar(blocked, w, start, goal, 10 ** 7)
+        t_astar += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ds.move_start(start)
+        ds.update_cells(blocked, sorted(cells))
+        ds.compute(10 ** 7)
+        pd = ds.path()
+        t_dstar += time.perf_counter() - t0
+
+        n_revs += 1
+        mismatch += (pa is None) != (pd is None)
+    k = max(1, n_revs)
+    return t_full * 1e3, t_astar / k * 1e3, t_dstar / k * 1e3, n_revs, mismatch
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[80, 120, 200], help="lattice cells per side")
+    ap.add_argument("--revs", type=int, default=40)
+    ap.add_argument("--flicker", type=int, default=80, help="cells flipped per revolution")
+    ap.add_argument("--radius", type=int, default=25, help="flicker window around the robot (cells)")
+    args = ap.parse_args()
+
+    print(f"{'lattice':>9s} {'full ms':>8s} {'A* ms/rev':>10s} {'D*Lite ms/rev':>14s} {'speedup':>8s} {'revs':>5s}")
+    for n in args.sizes:
+        t_full, t_a, t_d, revs, bad = bench(n, args.revs, args.flicker, args.radius)
+        print(f"{n:>4d}x{n:<4d} {t_full:8.1f} {t_a:10.2f} {t_d:14.2f} {t_a / max(t_d, 1e-9):7.1f}x {revs:5d}"
+              + (f"  ({bad} reachability mismatches!)" if bad else ""))
+
+
+if __name__ == "__main__":
+    main()
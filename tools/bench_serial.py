@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# tools/bench_serial.py
+# Compare JSON-line vs binary frame encoding for the serial link.
+# No hardware needed:  python3 tools/bench_serial.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import json
+import time
+
+from messages import frame
+from messages.pack import loads_line
+
+BAUDRATE = 115200
+
+CMD = {
+    "t": 123456,
+    "cmd": "set",
+    "mode": "manual",
+    "estop": False,
+    "drive": {"th": 0.3712345678, "st": -0.1298765432},
+    "turret": {"rx": 0.05234, "ry": -0.21, "fire": False, "mode": 0},
+}
+
+STAT = {
+    "type": "stat",
+    "t": 123456,
+    "mode": "manual",
+    "estop": False,
+    "drive": {"th": 0.37, "st": -0.13},
+    "rx_act": 0.0523,
+    "ry_act": -0.2101,
+    "yaw_deg": 12.5,
+    "pitch_deg": -3.25,
+}
+
+
+def _time_us(fn, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / n
+
+
+def main():
+    n = 20000
+
+    def json_enc():
+        return (json.dumps(CMD, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+
+    json_line = json_enc()
+    stat_line = (json.dumps(STAT, separators=(",", ":")) + "\n").encode("utf-8")
+
+    def json_dec():
+        return loads_line(stat_line.decode("utf-8").strip())
+
+    bin_cmd = frame.pack_set(CMD, 1)
+    bin_stat = frame.pack_stat(STAT, 1)[:-1]
+
+    def bin_enc():
+        return frame.pack_set(CMD, 1)
+
+    def bin_dec():
+        return frame.parse_frame(bin_stat)
+
+    rows = [
+        ("json", len(json_line), len(stat_line), _time_us(json_enc, n), _time_us(json_dec, n)),
+        ("bin", len(bin_cmd), len(bin_stat) + 1, _time_us(bin_enc, n), _time_us(bin_dec, n)),
+    ]
+
+    # 8N1 => 10 bits per byte on the wire
+    bytes_per_s = BAUDRATE / 10.0
+    print(f"link: {BAUDRATE} baud (~{bytes_per_s:.0f} B/s)")
+    print(f"{'fmt':6s} {'tx B/tick':>10s} {'rx B/rec':>9s} {'enc us':>8s} {'dec us':>8s} {'max tx Hz':>10s}")
+    for name, tx_b, rx_b, enc_us, dec_us in rows:
+        print(f"{name:6s} {tx_b:10d} {rx_b:9d} {enc_us:8.2f} {dec_us:8.2f} {bytes_per_s / tx_b:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
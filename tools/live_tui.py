@@ -94,9 +94,32 @@ class LiveTUI:
         )
         stdscr.addnstr(4, 0, autoline, w - 1)
 
+        # LINK latency summary (from cmd.meta.link, if present)
+        link = (meta.get("link") or {}) if isinstance(meta, dict) else {}
+        rtt = link.get("rtt_ms") or {}
+        jit = link.get("rx_jitter_ms") or {}
+        if link:
+            linkline = (
+                f"LINK: {link.get('proto', '-')} | "
+                f"rtt p50={_fmt(rtt.get('p50'))} p95={_fmt(rtt.get('p95'))} "
+                f"p99={_fmt(rtt.get('p99'))} max={_fmt(rtt.get('max'))} ms | "
+                f"rx jitter p95={_fmt(jit.get('p95'))} ms | "
+                f"drop={link.get('rx_dropped', '-')} coal={link.get('tx_coalesced', '-')}"
+            )
+            stdscr.addnstr(5, 0, linkline, w - 1)
+
+        # Per-stage loop timing (from cmd.meta.timing), worst max first
+        timing = (meta.get("timing") or {}) if isinstance(meta, dict) else {}
+        stages = [(k, v) for k, v in (timing.get("stages") or {}).items() if v.get("n")]
+        if stages:
+            stages.sort(key=lambda kv: -(kv[1].get("max") or 0.0))
+            timeline = f"TIME ms p99(max) / {timing.get('window_s', '-')}s: " + " ".join(
+                f"{k}={_fmt(v.get('p99'))}({_fmt(v.get('max'))})" for k, v in stages
+            )
+            stdscr.addnstr(6, 0, timeline, w - 1)
 
         # Telemetry area
-        y = 6
+        y = 7
         stdscr.addnstr(y, 0, "OUT (latest):", w - 1, curses.A_UNDERLINE)
         y += 1
 
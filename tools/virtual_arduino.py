@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# tools/virtual_arduino.py
+# Hardware-free stand-in for the Arduino on a pseudo-terminal.
+#
+# Speaks the same protocol as the firmware:
+#   Pi -> {"cmd":"set",...} / {"cmd":"d","s":..} (delta) / {"cmd":"hello",...}
+#   Arduino -> {"type":"stat","t":ms,"ack":seq,...} at telem_hz
+# Optional binary frames (messages/frame.py) after the hello handshake.
+#
+# Usage:
+#   python3 tools/virtual_arduino.py --telem-hz 100 --delay-ms 2 --baud 115200
+#   UG243_SERIAL_PORT=<printed port> python3 main.py
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import json
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+from typing import Any, Dict, Optional
+
+from comm.rx_buffer import FrameReader
+from messages import delta as delta_codec
+from messages import frame
+
+
+class VirtualArduino:
+    """
+    Pty-backed virtual Arduino.
+    - port: slave device path (give it to SerialLink / config.SERIAL_PORT)
+    - telem_hz: telemetry rate
+    - delay_s: time between receiving a command and "acting" on it (ack)
+    - drop_rate / corrupt_rate: per-byte probability, both directions
+    - baud: throttles both directions to ~baud/10 bytes/s (0 = unthrottled)
+    - binary: answer the hello handshake and switch to binary frames
+    """
+
+    def __init__(
+        self,
+        telem_hz: float = 50.0,
+        delay_s: float = 0.0,
+        drop_rate: float = 0.0,
+        corrupt_rate: float = 0.0,
+        baud: int = 115200,
+        binary: bool = False,
+        failsafe_s: float = 0.5,
+        boot_banner: bool = True,
+        seed: Optional[int] = None,
+    ):
+        self.telem_hz = telem_hz
+        self.delay_s = delay_s
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.baud = baud
+        self.binary = binary
+        self.failsafe_s = failsafe_s
+        self.boot_banner = boot_banner
+        self._rng = random.Random(seed)
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._wlock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._tx_free_at = 0.0
+
+        self._proto = "json"
+        self._pending: "deque[tuple]" = deque()  # (apply_at, seq, cmd)
+
+        # applied state (what the "firmware" is doing)
+        self.state: Dict[str, Any] = {
+            "mode": "safe",
+            "estop": True,
+            "drive": {"th": 0.0, "st": 0.0},
+            "turret": {"rx": 0.0, "ry": 0.0, "fire": False, "mode": 0},
+        }
+        self._ack = 0
+        self._last_cmd_ts = 0.0
+        self._delta_seq: Optional[int] = None
+        self._delta_ok = False
+        self._rx_act = 0.0
+        self._ry_act = 0.0
+        self._tx_seq = 0
+
+        # counters
+        self.rx_cmds = 0
+        self.rx_bad = 0
+        self.resyncs = 0
+        self.tx_records = 0
+        self.tx_bytes = 0
+
+    # ---------- lifecycle ----------
+    def start(self) -> "VirtualArduino":
+        for fn in (self._rx_loop, self._telem_loop):
+            t = threading.Thread(target=fn, daemon=True)
+            t.start()
+            self._threads.append(t)
+        if self.boot_banner:
+            self._write_json({"type": "boot", "fw": "virtual"})
+        return self
+
+    def close(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _ms(self) -> int:
+        return int((time.monotonic() - self._t0) * 1000) & 0xFFFFFFFF
+
+    # ---------- byte level ----------
+    def _mangle(self, data: bytes) -> bytes:
+        if self.drop_rate <= 0 and self.corrupt_rate <= 0:
+            return data
+        out = bytearray()
+        for b in data:
+            r = self._rng.random()
+            if r < self.drop_rate:
+                continue
+            if r < self.drop_rate + self.corrupt_rate:
+                b ^= 1 << self._rng.randrange(8)
+            out.append(b)
+        return bytes(out)
+
+    def _pace(self, nbytes: int):
+        """Block like a UART would at `baud` (8N1 -> 10 bits per byte)."""
+        if self.baud <= 0:
+            return
+        now = time.monotonic()
+        start = max(now, self._tx_free_at)
+        self._tx_free_at = start + nbytes * 10.0 / self.baud
+        sleep_s = self._tx_free_at - now
+        if sleep_s > 0:
+            time.sleep(sleep_s)
+
+    def _write(self, data: bytes):
+        data = self._mangle(data)
+        with self._wlock:
+            self._pace(len(data))
+            try:
+                os.write(self._master, data)
+            except OSError:
+                return
+            self.tx_bytes += len(data)
+
+    def _write_json(self, obj: Dict[str, Any]):
+        self._write((json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    # ---------- RX (Pi -> Arduino) ----------
+    def _rx_loop(self):
+        reader = FrameReader(b"\n")
+        while not self._stop.is_set():
+            try:
+                r, _, _ = select.select([self._master], [], [], 0.05)
+                if not r:
+                    continue
+                raw = os.read(self._master, 256)
+            except OSError:
+                break
+            if not raw:
+                continue
+            if self.baud > 0:
+                time.sleep(len(raw) * 10.0 / self.baud)
+            reader.feed(self._mangle(raw))
+            while True:
+                data = reader.next_frame()
+                if data is None:
+                    break
+                if not data:
+                    continue
+                if self._proto == "bin":
+                    self._on_bin(data)
+                else:
+                    self._on_line(data)
+                    if self._proto == "bin":
+                        reader.delim = b"\x00"
+
+    def _on_bin(self, data: bytes):
+        try:
+            parsed = frame.parse_frame(data)
+        except ValueError:
+            self.rx_bad += 1
+            return
+        if parsed is None:
+            return
+        seq, cmd = parsed
+        self._queue(seq, cmd)
+
+    def _on_line(self, data: bytes):
+        try:
+            obj = json.loads(data.decode("utf-8", errors="ignore").strip())
+        except Exception:
+            self.rx_bad += 1
+            return
+        if not isinstance(obj, dict):
+            return
+        c = obj.get("cmd")
+        if c == "hello":
+            if self.binary and frame.PROTO_NAME in (obj.get("proto") or []):
+                self._write_json({"type": "hello", "proto": frame.PROTO_NAME})
+                self._proto = "bin"
+            return
+        seq = obj.get("s")
+        if c == "set":
+            self._delta_seq = seq
+            self._delta_ok = True
+            self._queue(seq, obj)
+        elif c == "d":
+            expected = None if self._delta_seq is None else (self._delta_seq + 1) & 0xFFFF
+            self._delta_seq = seq
+            if not self._delta_ok or seq != expected:
+                # missed something: ignore deltas until the next keyframe
+                self._delta_ok = False
+                self.resyncs += 1
+                self._write_json({"type": "resync", "s": seq})
+                return
+            self._queue(seq, obj)
+
+    def _queue(self, seq, cmd: Dict[str, Any]):
+        self.rx_cmds += 1
+        self._pending.append((time.monotonic() + self.delay_s, seq, cmd))
+
+    def _apply_due(self, now: float):
+        while self._pending and self._pending[0][0] <= now:
+            _, seq, cmd = self._pending.popleft()
+            delta_codec.apply(self.state, cmd)
+            if isinstance(seq, int):
+                self._ack = seq
+            self._last_cmd_ts = now
+
+    # ---------- TX (Arduino -> Pi) ----------
+    def _telem_loop(self):
+        period = 1.0 / max(1e-6, self.telem_hz)
+        next_t = time.monotonic()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            self._apply_due(now)
+
+            st = self.state
+            drive = st.get("drive") or {}
+            turret = st.get("turret") or {}
+            stale = (now - self._last_cmd_ts) > self.failsafe_s
+            estop = bool(st.get("estop")) or stale
+            th = 0.0 if estop else float(drive.get("th", 0.0))
+            sd = 0.0 if estop else float(drive.get("st", 0.0))
+
+            # turret follows command (rate mode integrates, pos mode tracks)
+            rx = float(turret.get("rx", 0.0))
+            ry = float(turret.get("ry", 0.0))
+            if int(turret.get("mode", 0)) == 1:
+                self._rx_act, self._ry_act = rx, ry
+            else:
+                self._rx_act = max(-1.0, min(1.0, self._rx_act + rx * period))
+                self._ry_act = max(-1.0, min(1.0, self._ry_act + ry * period))
+
+            rec = {
+                "type": "stat",
+                "t": self._ms(),
+                "ack": self._ack,
+                "mode": "safe" if stale else st.get("mode", "safe"),
+                "estop": estop,
+                "drive": {"th": th, "st": sd},
+                "rx_act": round(self._rx_act, 4),
+                "ry_act": round(self._ry_act, 4),
+                "yaw_deg": round(self._rx_act * 90.0, 2),
+                "pitch_deg": round(self._ry_act * 45.0, 2),
+            }
+            if self._proto == "bin":
+                self._tx_seq = (self._tx_seq + 1) & 0xFFFF
+                self._write(frame.pack_stat(rec, self._tx_seq))
+            else:
+                self._write_json(rec)
+            self.tx_records += 1
+
+            next_t += period
+            sleep_s = next_t - time.monotonic()
+            if sleep_s > 0:
+                time.sleep(sleep_s)
+            else:
+                next_t = time.monotonic()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="virtual Arduino on a pty")
+    ap.add_argument("--telem-hz", type=float, default=50.0)
+    ap.add_argument("--delay-ms", type=float, default=0.0)
+    ap.add_argument("--drop", type=float, default=0.0, help="per-byte drop probability")
+    ap.add_argument("--corrupt", type=float, default=0.0, help="per-byte bit-flip probability")
+    ap.add_argument("--baud", type=int, default=115200, help="0 = unthrottled")
+    ap.add_argument("--binary", action="store_true", help="accept the binary protocol handshake")
+    args = ap.parse_args()
+
+    va = VirtualArduino(
+        telem_hz=args.telem_hz,
+        delay_s=args.delay_ms / 1000.0,
+        drop_rate=args.drop,
+        corrupt_rate=args.corrupt,
+        baud=args.baud,
+        binary=args.binary,
+    ).start()
+    print(f"virtual Arduino on {va.port}")
+    print(f"  UG243_SERIAL_PORT={va.port} python3 main.py")
+    try:
+        while True:
+            time.sleep(1.0)
+            print(
+                f"rx_cmds={va.rx_cmds} rx_bad={va.rx_bad} resyncs={va.resyncs} "
+                f"tx_records={va.tx_records} ack={va._ack} mode={va.state.get('mode')}"
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        va.close()
+
+
+if __name__ == "__main__":
+    main()